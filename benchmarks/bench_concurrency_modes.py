@@ -0,0 +1,81 @@
+"""
+Transaction create throughput under contention: pessimistic vs optimistic concurrency mode.
+
+Each worker thread has its own database connection and posts small (0.1%) transactions
+through the API against a few hot properties. Meaningful numbers need PostgreSQL; SQLite
+serializes every writer on the database file.
+
+    python -m benchmarks.bench_concurrency_modes --threads 8 --requests 50 --properties 1
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from .common import benchmark_database, setup_django
+
+
+def run_mode(mode, threads, requests_per_thread, properties):
+    from django.db import connection
+    from django.test import override_settings
+    from django.utils.timezone import now
+    from rest_framework.test import APIClient
+    from realestate.models import Property, User
+
+    owner = User.objects.create(username=f"owner_{mode}")
+    hot = [Property.objects.create(title=f"Hot {mode} {i}", district="Limassol", estimated_value=100000, user=owner)
+           for i in range(properties)]
+    users = User.objects.bulk_create([User(username=f"{mode}_worker_{i}", password="!") for i in range(threads)])
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    base_date = now() - timedelta(days=1)
+
+    def worker(index):
+        client = APIClient(raise_request_exception=False)  # count server errors as 500s
+        client.force_authenticate(user=users[index])
+        try:
+            for request_number in range(requests_per_thread):
+                payload = {
+                    "property": hot[request_number % properties].id, "percentage": "0.10", "price": 100000,
+                    "transaction_date": (base_date + timedelta(microseconds=request_number)).isoformat(),
+                }
+                start = time.perf_counter()
+                response = client.post("/transactions/", payload, format="json")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] += 1
+        finally:
+            connection.close()
+
+    with override_settings(TRANSACTION_CONCURRENCY_MODE=mode):
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{mode:>12} {statuses[201] / wall:>10,.1f} {statistics.median(latencies) * 1000:>9.1f} "
+          f"{p99 * 1000:>9.1f}  {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help="requests per thread")
+    parser.add_argument('--properties', type=int, default=1, help="number of hot properties")
+    args = parser.parse_args()
+    setup_django()
+    with benchmark_database():
+        print(f"{'mode':>12} {'created/s':>10} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+        for mode in ('pessimistic', 'optimistic'):
+            run_mode(mode, args.threads, args.requests, args.properties)
+
+
+if __name__ == '__main__':
+    main()
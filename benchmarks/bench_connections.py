@@ -0,0 +1,114 @@
+"""
+Request latency per database connection mode, against the configured (local Postgres) database.
+
+``per-request`` opens and closes a connection for every request (CONN_MAX_AGE=0, the Django
+default), ``persistent`` keeps one per thread (CONN_MAX_AGE=None with health checks) and ``pool``
+checks connections out of Django's psycopg 3 pool (OPTIONS["pool"], skipped when psycopg 3 is not
+installed). Each thread serves ``--requests`` reads of ``/districts/`` (one query), so the
+difference is the cost of setting connections up.
+
+    python -m benchmarks.bench_connections --threads 8 --requests 200
+    python -m benchmarks.bench_connections --mode per-request --mode pool --pool-size 4
+"""
+import argparse
+import threading
+import time
+
+from .common import benchmark_database, setup_django
+
+MODES = ['per-request', 'persistent', 'pool']
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def pool_supported():
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def configure(mode, pool_size):
+    """Point the ``default`` alias at ``mode``; connections opened from now on (new threads) use it."""
+    from django.db import connections
+
+    settings_dict = connections.settings['default']
+    options = settings_dict.setdefault('OPTIONS', {})
+    options.pop('pool', None)
+    settings_dict['CONN_MAX_AGE'] = None if mode == 'persistent' else 0
+    settings_dict['CONN_HEALTH_CHECKS'] = mode == 'persistent'
+    if mode == 'pool':
+        options['pool'] = {'min_size': pool_size, 'max_size': pool_size, 'timeout': 10}
+
+
+def run_mode(mode, threads, requests_per_thread, pool_size, user):
+    from django.db import connection, connections
+    from rest_framework.test import APIClient
+
+    configure(mode, pool_size)
+    latencies, errors, lock = [], [], threading.Lock()
+
+    def worker():
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=user)
+        timings = []
+        try:
+            for _ in range(requests_per_thread):
+                start = time.perf_counter()
+                response = client.get("/districts/")
+                timings.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(timings)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - start
+    if mode == 'pool':
+        # The pool keeps connections to the benchmark database open, which would block dropping it
+        connections['default'].close_pool()
+    configure('per-request', pool_size)
+
+    latencies.sort()
+    print(f"{mode:>12} {len(latencies) / wall:>9,.1f} {sum(latencies) / len(latencies) * 1000:>9.2f} "
+          f"{percentile(latencies, 0.5) * 1000:>9.2f} {percentile(latencies, 0.99) * 1000:>9.2f}"
+          f"{f'  errors: {len(errors)}' if errors else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="requests per thread")
+    parser.add_argument('--pool-size', type=int, default=None, help="pool min and max size (default: --threads)")
+    parser.add_argument('--mode', choices=MODES, action='append', help="connection mode(s) to run (default: all)")
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+    from realestate.models import User
+
+    modes = args.mode or MODES
+    if 'pool' in modes and not (connection.vendor == 'postgresql' and pool_supported()):
+        print("skipping pool: Django's connection pool needs PostgreSQL and psycopg 3 (poetry install --with pool)")
+        modes = [mode for mode in modes if mode != 'pool']
+
+    configure('per-request', args.pool_size or args.threads)
+    with benchmark_database():
+        user = User.objects.create_user(username="bench_connections", password="!")
+        connection.close()
+        print(f"{connection.vendor} at {connection.settings_dict['HOST'] or 'localhost'}, "
+              f"{args.threads} threads x {args.requests} requests")
+        print(f"{'mode':>12} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for mode in modes:
+            run_mode(mode, args.threads, args.requests, args.pool_size or args.threads, user)
+
+
+if __name__ == '__main__':
+    main()
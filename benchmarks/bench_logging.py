@@ -0,0 +1,125 @@
+"""
+Cost of the transaction write's log calls to the request thread.
+
+Replays the records a transaction create logs while it holds the property lock (lock acquired,
+validation input and ownership totals at DEBUG, the CREATE audit line at INFO) ``--iterations``
+times and reports the time spent in the log calls per write:
+
+- ``eager``: f-string messages and a ``StreamHandler`` writing the plain format, as before;
+- ``queued``: %-style messages on ``QueuedHandler`` with the JSON formatter, formatting and
+  writing on the listener thread;
+- ``queued, sampled``: the same with ``--sample-rate`` of the writes keeping their DEBUG records;
+- ``queued, INFO``: the same at LOG_LEVEL=INFO, where the DEBUG calls return right away.
+
+``drain ms`` is how long the listener took afterwards to write what was still queued.
+``--sink`` picks where the records go: a temporary file (flushed on every record, the default),
+``/dev/null``, or stderr.
+
+    python -m benchmarks.bench_logging --iterations 20000 --sink file
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from realestate.log import JSONFormatter, QueuedHandler, RequestContextFilter, log_context
+
+VERBOSE = logging.Formatter('{levelname} {asctime} {module} {message}', style='{')
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def eager_calls(logger, user_id, property_id, percentage, price, date):
+    logger.debug(f"Lock acquired for property {property_id} by user {user_id}")
+    logger.debug(f"[VALIDATION] user={user_id}, property={property_id}, "
+                 f"percentage={percentage}, price={price}, date={date}")
+    logger.debug(f"[VALIDATION] Ownership totals: total={percentage * 3}, user_total={percentage}")
+    logger.info(f"[CREATE] Transaction ID={property_id} by User ID={user_id}")
+
+
+def lazy_calls(logger, user_id, property_id, percentage, price, date):
+    logger.debug("Lock acquired for property %s by user %s", property_id, user_id,
+                 extra={"property_id": property_id, "user_id": user_id})
+    logger.debug("[VALIDATION] user=%s, property=%s, percentage=%s, price=%s, date=%s",
+                 user_id, property_id, percentage, price, date)
+    logger.debug("[VALIDATION] Ownership totals: total=%s, user_total=%s", percentage * 3, percentage)
+    logger.info("[%s] %s ID=%s by User ID=%s", "CREATE", "Transaction", property_id, user_id,
+                extra={"action": "create", "model": "Transaction", "object_id": property_id, "user_id": user_id})
+
+
+def open_sink(sink):
+    if sink == 'stderr':
+        return sys.stderr
+    if sink == 'null':
+        return open(os.devnull, 'w')
+    return tempfile.TemporaryFile('w')
+
+
+def run(name, sink, iterations, calls, handler, level=logging.DEBUG, sample_rate=1.0):
+    logger = logging.getLogger(f"bench_logging.{name}")
+    logger.propagate = False
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    date, price = datetime(2024, 1, 1), Decimal("250000.00")
+    timings = []
+    try:
+        for index in range(iterations):
+            with log_context(sample_rate=sample_rate):
+                start = time.perf_counter()
+                calls(logger, index % 50, index, Decimal(10), price, date)
+                timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        handler.flush()
+        drain = time.perf_counter() - start
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+        if sink is not sys.stderr:
+            sink.close()
+    dropped = getattr(handler, 'dropped', 0)
+    timings.sort()
+    print(f"{name:>16} {sum(timings) / len(timings) * 1e6:>9.1f} {percentile(timings, 0.5) * 1e6:>9.1f} "
+          f"{percentile(timings, 0.99) * 1e6:>9.1f} {drain * 1000:>9.1f}"
+          f"{f'  dropped: {dropped}' if dropped else ''}", file=sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20_000, help="transaction writes to replay")
+    parser.add_argument('--sink', choices=['file', 'null', 'stderr'], default='file')
+    parser.add_argument('--sample-rate', type=float, default=0.05, help="LOG_DEBUG_SAMPLE_RATE of the sampled run")
+    args = parser.parse_args()
+
+    def queued(sink):
+        # Large enough that nothing is dropped: the comparison is about the request thread's cost
+        handler = QueuedHandler(sink, queue_size=args.iterations * 4)
+        handler.setFormatter(JSONFormatter())
+        handler.addFilter(RequestContextFilter())
+        return handler
+
+    def eager(sink):
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(VERBOSE)
+        return handler
+
+    print(f"{args.iterations} transaction writes, 4 log calls each, sink: {args.sink}")
+    print(f"{'mode':>16} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'drain ms':>9}")
+    runs = [
+        ('eager', eager_calls, eager, {}),
+        ('queued', lazy_calls, queued, {}),
+        ('queued, sampled', lazy_calls, queued, {'sample_rate': args.sample_rate}),
+        ('queued, INFO', lazy_calls, queued, {'level': logging.INFO}),
+    ]
+    for name, calls, make_handler, options in runs:
+        sink = open_sink(args.sink)
+        run(name, sink, args.iterations, calls, make_handler(sink), **options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Login throughput: ``POST /auth/token/`` under a login storm, per PASSWORD_VERIFY_POOL mode.
+
+Login threads hammer the token endpoint while one probe thread keeps reading ``/districts/``.
+The probe latency shows how much the password checks starve the other requests of the
+process; ``none`` hashes on the request threads, ``thread``/``process`` bound the number of
+concurrent hashes to ``--workers`` (logins that wait longer than PASSWORD_VERIFY_TIMEOUT get a 503).
+The hasher and its cost come from the settings (PASSWORD_HASHER, PASSWORD_PBKDF2_ITERATIONS, ...).
+
+    python -m benchmarks.bench_login --threads 16 --logins 10 --workers 2
+    python -m benchmarks.bench_login --mode none --mode process
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+from .common import benchmark_database, setup_django
+
+PASSWORD = "Bench-Login-Pass-1"
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run_mode(mode, threads, logins_per_thread, workers, users):
+    from django.db import connection
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    statuses, latencies, probes, lock = Counter(), [], [], threading.Lock()
+    done = threading.Event()
+
+    def login_worker(index):
+        client = APIClient(raise_request_exception=False)
+        try:
+            for number in range(logins_per_thread):
+                username = users[(index * logins_per_thread + number) % len(users)].username
+                start = time.perf_counter()
+                response = client.post("/auth/token/", {"username": username, "password": PASSWORD}, format="json")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    statuses[response.status_code] += 1
+                    latencies.append(elapsed)
+        finally:
+            connection.close()
+
+    def probe():
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=users[0])
+        try:
+            while not done.is_set():
+                start = time.perf_counter()
+                client.get("/districts/")
+                probes.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    with override_settings(PASSWORD_VERIFY_POOL=mode, PASSWORD_VERIFY_WORKERS=workers):
+        prober = threading.Thread(target=probe)
+        logins = [threading.Thread(target=login_worker, args=(i,)) for i in range(threads)]
+        prober.start()
+        start = time.perf_counter()
+        for thread in logins:
+            thread.start()
+        for thread in logins:
+            thread.join()
+        wall = time.perf_counter() - start
+        done.set()
+        prober.join()
+
+    latencies.sort()
+    probes.sort()
+    print(f"{mode:>8} {statuses[200] / wall:>9,.1f} {percentile(latencies, 0.5) * 1000:>9.1f} "
+          f"{percentile(latencies, 0.99) * 1000:>9.1f} {percentile(probes, 0.5) * 1000:>10.1f} "
+          f"{percentile(probes, 0.99) * 1000:>10.1f}  {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=16, help="concurrent login threads")
+    parser.add_argument('--logins', type=int, default=10, help="logins per thread")
+    parser.add_argument('--workers', type=int, default=2, help="PASSWORD_VERIFY_WORKERS for the pooled modes")
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--mode', choices=['none', 'thread', 'process'], action='append',
+                        help="PASSWORD_VERIFY_POOL mode(s) to run (default: all)")
+    args = parser.parse_args()
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from realestate.models import User
+
+    with benchmark_database():
+        # Every user gets the same (freshly made, so up to date) hash: logins never rehash
+        encoded = make_password(PASSWORD)
+        users = User.objects.bulk_create([User(username=f"bench_login_{i}", password=encoded)
+                                          for i in range(args.users)])
+        print(f"hasher {settings.PASSWORD_HASHER}, {args.threads} threads x {args.logins} logins")
+        print(f"{'mode':>8} {'logins/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'probe p50':>10} {'probe p99':>10}  statuses")
+        for mode in args.mode or ['none', 'thread', 'process']:
+            run_mode(mode, args.threads, args.logins, args.workers, users)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Concurrent-connection capacity of the WSGI and ASGI deployments.
+
+Seeds a throwaway database, then starts the API under gunicorn's sync workers (``config.wsgi``)
+and under uvicorn workers (``config.asgi``, async read views) with the same number of workers.
+For each ``--connections`` level, that many clients keep requesting ``--path`` for ``--duration``
+seconds. ``--slow-clients`` extra connections send their request headers one line per second,
+like clients on a slow network: each of them holds a sync worker for as long as it takes, an
+async worker keeps serving the others. Reports req/s, p50/p99 latency and failed requests
+(timeouts, refused or reset connections, non-200 responses) per server and level.
+
+Run it against a local Postgres (the servers connect to the benchmark database through
+POSTGRES_DB); the ASGI server needs ``poetry install --with asgi``. The response cache is
+disabled unless ``--cache`` is given, so every request reaches the database.
+
+    python -m benchmarks.bench_servers --connections 10 100 --slow-clients 4 --duration 10
+    python -m benchmarks.bench_servers --server wsgi --workers 2 --path "/properties/?page_size=50"
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from .common import benchmark_database, seed_transactions, setup_django
+
+SERVERS = {
+    'wsgi': ['config.wsgi:application'],
+    'asgi': ['config.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(server, workers, port, database, cache):
+    env = {**os.environ, 'POSTGRES_DB': database, 'DJANGO_ALLOWED_HOSTS': '127.0.0.1', 'DJANGO_DEBUG': 'False'}
+    if not cache:
+        env['API_CACHE_TIMEOUT'] = '0'
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *SERVERS[server], '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{server} server exited with code {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{server} server did not start listening on port {port}")
+
+
+async def fetch(port, request, timeout):
+    """Send one request on a new connection and return the response status (``Connection: close``)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1]) if response else 0
+
+
+async def client(port, request, timeout, deadline, latencies, failures):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            status = await fetch(port, request, timeout)
+        except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+            status = None
+        if status == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            failures.append(status)
+            await asyncio.sleep(0.05)
+
+
+async def slow_client(port, deadline):
+    """Trickle an endless request head, one header line per second, reconnecting if the server drops it."""
+    while time.monotonic() < deadline:
+        writer = None
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"GET /districts/ HTTP/1.1\r\nHost: 127.0.0.1\r\n")
+            while time.monotonic() < deadline:
+                await asyncio.sleep(1)
+                writer.write(b"X-Slow-Client: 1\r\n")
+                await writer.drain()
+        except OSError:
+            await asyncio.sleep(0.1)
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+async def load(port, path, token, connections, slow_clients, duration, timeout):
+    request = (f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+               f"Connection: close\r\n\r\n").encode()
+    latencies, failures = [], []
+    deadline = time.monotonic() + duration
+    slow = [asyncio.create_task(slow_client(port, deadline)) for _ in range(slow_clients)]
+    await asyncio.sleep(0.5 if slow_clients else 0)  # let the slow clients take their workers first
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, request, timeout, deadline, latencies, failures)
+                           for _ in range(connections)))
+    wall = time.perf_counter() - start
+    await asyncio.gather(*slow)
+    return latencies, failures, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, nargs='+', default=[10, 100], help="concurrent clients")
+    parser.add_argument('--slow-clients', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=2, help="server processes of each server")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per level")
+    parser.add_argument('--timeout', type=float, default=10, help="seconds before a request counts as failed")
+    parser.add_argument('--path', default="/transactions/?page_size=20")
+    parser.add_argument('--rows', type=int, default=10_000, help="transactions to seed")
+    parser.add_argument('--cache', action='store_true', help="keep the response cache enabled")
+    parser.add_argument('--server', choices=list(SERVERS), action='append', help="server(s) to run (default: both)")
+    args = parser.parse_args()
+    setup_django()
+
+    from django.db import connection
+    from realestate.models import User
+    from realestate.serializers.user import ClaimsTokenObtainPairSerializer
+
+    servers = args.server or list(SERVERS)
+    if 'asgi' in servers and importlib.util.find_spec('uvicorn_worker') is None:
+        print("skipping asgi: uvicorn workers are not installed (pip install uvicorn-worker)")
+        servers = [server for server in servers if server != 'asgi']
+
+    with benchmark_database():
+        seed_transactions(args.rows)
+        user = User.objects.create_user(username="bench_servers", password="!")
+        token = str(ClaimsTokenObtainPairSerializer.get_token(user).access_token)
+        database = connection.settings_dict['NAME']
+        connection.close()
+
+        print(f"GET {args.path}, {args.workers} workers per server, {args.slow_clients} slow clients, "
+              f"{args.duration:g}s per level")
+        print(f"{'server':>6} {'conns':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}")
+        for server in servers:
+            port = free_port()
+            process = start_server(server, args.workers, port, database, args.cache)
+            try:
+                for connections in args.connections:
+                    latencies, failures, wall = asyncio.run(load(
+                        port, args.path, token, connections, args.slow_clients, args.duration, args.timeout))
+                    latencies.sort()
+                    print(f"{server:>6} {connections:>6} {len(latencies) / wall:>9,.1f} "
+                          f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} "
+                          f"{len(failures):>7}")
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == '__main__':
+    main()
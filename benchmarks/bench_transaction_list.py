@@ -0,0 +1,48 @@
+"""
+Transaction list encoding throughput: TransactionSerializer vs the RowEncoder fast path.
+
+    python -m benchmarks.bench_transaction_list --rows 10000 100000
+"""
+import argparse
+
+from .common import benchmark_database, seed_transactions, setup_django, timed
+
+
+def run(row_counts):
+    from rest_framework.renderers import JSONRenderer
+    from realestate.models import Transaction
+    from realestate.serializers.transaction import TransactionSerializer
+    from realestate.views.transaction import TransactionViewSet
+
+    ordering = (*TransactionViewSet.ordering, 'id')
+    encoder = TransactionViewSet.row_encoder
+    renderer = JSONRenderer()
+
+    def serializer_path():
+        queryset = TransactionViewSet.queryset.order_by(*ordering)
+        return renderer.render(TransactionSerializer(queryset, many=True).data)
+
+    def encoder_path():
+        queryset = encoder.values(TransactionViewSet.queryset.order_by(*ordering))
+        return renderer.render([encoder.encode(row) for row in queryset])
+
+    print(f"{'rows':>8} {'serializer rows/s':>18} {'row encoder rows/s':>19} {'speedup':>8}")
+    for rows in sorted(row_counts):
+        seed_transactions(rows - Transaction.objects.count())
+        slow, slow_seconds = timed(serializer_path)
+        fast, fast_seconds = timed(encoder_path)
+        assert slow == fast, "RowEncoder output differs from TransactionSerializer output"
+        print(f"{rows:>8} {rows / slow_seconds:>18,.0f} {rows / fast_seconds:>19,.0f} {slow_seconds / fast_seconds:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    args = parser.parse_args()
+    setup_django()
+    with benchmark_database():
+        run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run the scripts from the repository root, e.g. ``python -m benchmarks.bench_transaction_list``.
+They create (and afterwards destroy) a throwaway test database on the configured backend,
+so they never touch the data of the development database.
+"""
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+
+def setup_django(sqlite=False):
+    """Configure Django; ``sqlite=True`` swaps the configured database for a SQLite file in a temporary directory."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    if sqlite:
+        from django.conf import settings
+
+        directory = tempfile.mkdtemp(prefix='realestate-bench-')
+        settings.DATABASES['default'] = {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(directory, 'bench.sqlite3'),
+            # A file, not the in-memory default, so that worker threads share the test database
+            'TEST': {'NAME': os.path.join(directory, 'test_bench.sqlite3')},
+        }
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def row_count(text):
+    """Command line row count with an optional k/M suffix: ``"10k"`` -> 10000."""
+    multipliers = {'k': 1_000, 'm': 1_000_000}
+    text = text.strip().lower()
+    try:
+        return int(float(text[:-1]) * multipliers[text[-1]] if text[-1:] in multipliers else int(text))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a row count: {text!r}")
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def seed_transactions(count, seed=0, batch_size=5000):
+    """Insert ``count`` valid transactions (10 x 10% per property) with ``bulk_create``."""
+    from django.utils.timezone import now
+    from realestate.models import Property, Transaction, User
+
+    rng = random.Random(seed)
+    offset = User.objects.count()
+    users = User.objects.bulk_create(
+        [User(username=f"bench_user_{offset + i}", password="!") for i in range(10)]
+    )
+    properties = Property.objects.bulk_create(
+        [Property(title=f"Bench {i}", district=rng.choice(Property.DISTRICT_CHOICES)[0],
+                  estimated_value=Decimal(rng.randrange(100_000, 1_000_000)), user=users[0])
+         for i in range((count + 9) // 10)],
+        batch_size=batch_size,
+    )
+    base_date = now() - timedelta(days=3650)
+    transactions = []
+    for index in range(count):
+        prop = properties[index // 10]
+        transactions.append(Transaction(
+            user=users[index % 10], property=prop, percentage=Decimal('10.00'),
+            price=(prop.estimated_value * Decimal(rng.uniform(0.5, 1.5))).quantize(Decimal('0.01')),
+            transaction_date=base_date + timedelta(minutes=index),
+        ))
+    Transaction.objects.bulk_create(transactions, batch_size=batch_size)
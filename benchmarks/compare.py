@@ -0,0 +1,70 @@
+"""
+Compare two ``benchmarks.suite`` result files, e.g. of a base commit and a branch.
+
+Prints every metric of the scenarios both files ran with its relative change. A change is
+flagged when it is worse than ``--threshold`` percent: higher for times (``*_ms``,
+``seconds``), query counts and errors, lower for throughputs (``*_per_s``). With ``--fail``
+the exit status is 1 when any metric is flagged.
+
+    python -m benchmarks.compare benchmarks/results/abc1234-postgresql-100000.json after.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+HIGHER_IS_BETTER = ('_per_s',)
+INFORMATIONAL = ('rows', 'threads', 'bytes')
+
+
+def metrics(results):
+    return {(scenario, case, name): value
+            for scenario, cases in results["scenarios"].items()
+            for case, values in cases.items()
+            for name, value in values.items()}
+
+
+def regression(name, before, after, threshold):
+    """Percent change of ``after`` from ``before``, and whether it is a regression beyond ``threshold``."""
+    if not before:
+        return None, bool(after) and name == 'errors'
+    change = (after - before) / before * 100
+    if name in INFORMATIONAL:
+        return change, False
+    worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+    return change, worse > threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help="percent change flagged as a regression")
+    parser.add_argument('--fail', action='store_true', help="exit with status 1 on any regression")
+    args = parser.parse_args()
+
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    for label, results in (("before", before), ("after", after)):
+        environment, dataset = results["environment"], results["dataset"]
+        print(f"{label:>6}: {environment['commit']}{' (dirty)' if environment['dirty'] else ''} "
+              f"on {environment['database']}, {dataset['transactions']:,} transactions (seed {dataset['seed']})")
+    if (before["dataset"]["transactions"], before["dataset"]["seed"]) != (after["dataset"]["transactions"],
+                                                                          after["dataset"]["seed"]):
+        print("warning: the results were measured on different datasets")
+
+    before_metrics, after_metrics = metrics(before), metrics(after)
+    regressions = 0
+    print(f"\n{'metric':<60} {'before':>12} {'after':>12} {'change':>9}")
+    for key in sorted(before_metrics.keys() & after_metrics.keys()):
+        change, regressed = regression(key[-1], before_metrics[key], after_metrics[key], args.threshold)
+        regressions += regressed
+        shown = f"{change:+.1f}%" if change is not None else "n/a"
+        print(f"{'.'.join(key):<60} {before_metrics[key]:>12} {after_metrics[key]:>12} {shown:>9}"
+              f"{'  REGRESSION' if regressed else ''}")
+    print(f"\n{regressions} regression(s) beyond {args.threshold:g}%")
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Deterministic synthetic dataset for the benchmark suite.
+
+``generate(transactions, seed)`` loads users, properties spread over the six districts and
+``transactions`` transactions that pass every rule the API enforces: each property is sold to
+1-9 distinct buyers for at most 100% in total, no buyer holds more than 80% of a property,
+prices stay within 55%-145% of the estimated value (inside the 50%-150% band, with room for
+revaluations) and above the minimum amount, and dates are distinct and in the past. The same
+``(transactions, seed)`` always gives the same rows, ids included, so results of different
+commits are measured on identical data.
+
+Rows are streamed, never held in memory all at once, and inserted in batches: with ``COPY``
+on PostgreSQL and ``bulk_create`` elsewhere. The ownership ledger and the analytics summaries
+are then rebuilt from the loaded transactions, as ``rebuild_ownership_ledger`` does.
+
+The same rows can be written out as input files of ``manage.py import_realestate``, ids
+numbered from 1, for an empty (flushed) database:
+
+    python -m benchmarks.datagen extracts/ --transactions 1000000
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_DOWN, Decimal
+
+PASSWORD = "Bench-Suite-Pass-1"
+MAX_BUYERS = 9
+# Fixed, so the generated dates do not depend on when the suite runs; 30s apart keeps 10M rows in the past
+EPOCH = datetime(2015, 1, 1, tzinfo=timezone.utc)
+CENT = Decimal('0.01')
+
+
+@dataclass
+class Ids:
+    """The primary key before the first generated row of each table."""
+    user: int
+    property: int
+    transaction: int
+
+
+@dataclass
+class Dataset:
+    seed: int
+    users: int
+    properties: int
+    transactions: int
+    load_seconds: float = 0.0
+
+
+def user_count(transactions):
+    return max(MAX_BUYERS * 2, transactions // 10)
+
+
+def plan(transactions, seed):
+    """Yield ``(property_number, owner_number, district, estimated_value, buyers)`` until ``transactions`` are planned.
+
+    Users and properties are numbered from 1; ``Ids`` turns the numbers into primary keys.
+    """
+    from realestate.models import Property
+
+    rng = random.Random(seed)
+    districts = [district for district, _ in Property.DISTRICT_CHOICES]
+    users = user_count(transactions)
+    number, remaining = 0, transactions
+    while remaining:
+        number += 1
+        buyers = min(rng.randint(1, MAX_BUYERS), remaining)
+        remaining -= buyers
+        yield (number, rng.randint(1, users), rng.choice(districts),
+               Decimal(rng.randrange(100_000, 2_000_000)), buyers)
+
+
+def shares(rng, buyers):
+    """Percentages of ``buyers`` distinct buyers: at most 100 together, each at most 80 and at least 0.01."""
+    total = rng.randint(1000, 8000 if buyers == 1 else 10000)  # hundredths of a percent
+    weights = [rng.uniform(1, 2) for _ in range(buyers)]
+    scale = total / sum(weights)
+    # Each weight is at most twice any other, so with two buyers or more no share exceeds 2/3 of the total
+    return [Decimal(int(weight * scale)) / 100 for weight in weights]
+
+
+def users(transactions, ids, encoded_password):
+    from realestate.models import User
+
+    joined = EPOCH - timedelta(days=1)
+    for number in range(1, user_count(transactions) + 1):
+        yield User(id=ids.user + number, username=f"bench_{number}", password=encoded_password,
+                   email=f"bench_{number}@example.com", date_joined=joined)
+
+
+def properties(transactions, ids, seed):
+    from realestate.models import Property
+
+    for number, owner, district, value, _ in plan(transactions, seed):
+        yield Property(id=ids.property + number, title=f"Bench property {number}", district=district,
+                       estimated_value=value, user_id=ids.user + owner)
+
+
+def transactions_for(transactions, ids, seed):
+    from realestate.models import Transaction
+
+    rng = random.Random(seed + 1)
+    users = user_count(transactions)
+    number = 0
+    for property_number, _, _, value, buyers in plan(transactions, seed):
+        for buyer, percentage in zip(rng.sample(range(1, users + 1), buyers), shares(rng, buyers)):
+            number += 1
+            price = (value * Decimal(rng.uniform(0.55, 1.45))).quantize(CENT, rounding=ROUND_DOWN)
+            yield Transaction(id=ids.transaction + number, user_id=ids.user + buyer,
+                              property_id=ids.property + property_number, percentage=percentage, price=price,
+                              transaction_date=EPOCH + timedelta(seconds=30 * number))
+
+
+def generate(transactions, seed=0, batch_size=None, progress=None):
+    """Load the dataset into a freshly migrated database and rebuild the ledger and summaries. Returns a ``Dataset``."""
+    import time
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from django.db.models import Max
+    from realestate.analytics import rebuild_summaries
+    from realestate.bulkload import BULK_LOAD_CHUNK_SIZE, insert, reset_sequences
+    from realestate.ledger import rebuild_ledger
+    from realestate.models import Property, Transaction, User
+
+    start = time.perf_counter()
+    # One hash for everyone: the login scenario can sign in as any user, and hashing stays out of the load
+    encoded = make_password(PASSWORD)
+    counts = {}
+    with transaction.atomic():
+        # Rows the migrations created (the default admin) keep their ids
+        ids = Ids(*(model.objects.aggregate(last=Max('id'))['last'] or 0 for model in (User, Property, Transaction)))
+        for model, rows in ((User, users(transactions, ids, encoded)), (Property, properties(transactions, ids, seed)),
+                            (Transaction, transactions_for(transactions, ids, seed))):
+            counts[model] = insert(model, rows, batch_size or BULK_LOAD_CHUNK_SIZE)
+            if progress:
+                progress(f"{counts[model]:,} {model.__name__} rows in {time.perf_counter() - start:.1f}s")
+        reset_sequences([User, Property, Transaction])
+        rebuild_ledger()
+        rebuild_summaries()
+    if progress:
+        progress(f"ledger and summaries rebuilt in {time.perf_counter() - start:.1f}s")
+    return Dataset(seed=seed, users=counts[User], properties=counts[Property], transactions=counts[Transaction],
+                   load_seconds=time.perf_counter() - start)
+
+
+def write_files(transactions, seed, directory, file_format='csv'):
+    """Write the dataset as ``import_realestate`` input files (users, properties, transactions) in ``directory``."""
+    from django.contrib.auth.hashers import make_password
+    from realestate.bulkload import IMPORT_FIELDS
+    from realestate.imports import write_rows
+    from realestate.models import Property, Transaction, User
+
+    directory.mkdir(parents=True, exist_ok=True)
+    ids = Ids(0, 0, 0)
+    for name, model, rows in (("users", User, users(transactions, ids, make_password(PASSWORD))),
+                              ("properties", Property, properties(transactions, ids, seed)),
+                              ("transactions", Transaction, transactions_for(transactions, ids, seed))):
+        fields = IMPORT_FIELDS[model]
+        with (directory / f"{name}.{file_format}").open('w', newline='') as target:
+            write_rows(({field: _text(getattr(obj, field)) for field in fields} for obj in rows), target,
+                       file_format, fields)
+
+
+def _text(value):
+    return value.isoformat() if isinstance(value, datetime) else value if isinstance(value, (bool, int)) else str(value)
+
+
+def main():
+    import argparse
+    from pathlib import Path
+    from .common import row_count, setup_django
+
+    parser = argparse.ArgumentParser(description="Write the synthetic dataset as import_realestate input files.")
+    parser.add_argument('directory', type=Path)
+    parser.add_argument('--transactions', type=row_count, default=10_000, help="e.g. 100k, 10M")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    args = parser.parse_args()
+    setup_django()
+    write_files(args.transactions, args.seed, args.directory, args.format)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Concurrency stress run of the transaction write path (see ``realestate.tests.stress``).
+
+N workers (threads, or forked processes with ``--processes``), each with its own database
+connection and its own user, fire creates and PATCHes through the API against one or many
+properties. Afterwards the ownership invariants are checked against the raw transactions and
+throughput, p50/p99 latency and the time spent waiting on other writers are reported. The
+exit status is non-zero if an invariant was violated or a request failed unexpectedly.
+
+    python -m benchmarks.stress_transactions --workers 8 --operations 50 --properties 1
+    python -m benchmarks.stress_transactions --processes --mode optimistic
+"""
+import argparse
+import sys
+
+from realestate.tests.stress import StressResult, run_stress
+
+from .common import benchmark_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=50, help="requests per worker")
+    parser.add_argument('--properties', type=int, default=1, help="number of contended properties")
+    parser.add_argument('--patch-ratio', type=float, default=0.3, help="share of requests that PATCH an own transaction")
+    parser.add_argument('--processes', action='store_true', help="fork worker processes instead of threads")
+    parser.add_argument('--mode', choices=['pessimistic', 'optimistic'], action='append',
+                        help="concurrency mode(s) to run (default: both)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    setup_django()
+
+    ok = True
+    with benchmark_database():
+        print(StressResult.REPORT_HEADER)
+        for mode in args.mode or ['pessimistic', 'optimistic']:
+            result = run_stress(args.workers, args.operations, args.properties, args.patch_ratio,
+                                args.processes, mode, args.seed)
+            print(result.report())
+            for violation in result.violations:
+                print(f"  INVARIANT VIOLATED: {violation}")
+            if result.unexpected_statuses:
+                print(f"  UNEXPECTED STATUSES: {result.unexpected_statuses}")
+            ok = ok and result.ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
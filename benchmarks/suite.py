@@ -0,0 +1,254 @@
+"""
+Reproducible benchmark suite: seeds a synthetic dataset (``benchmarks.datagen``), runs the
+scenarios below against it and writes the results as JSON, to compare commits with
+``python -m benchmarks.compare``.
+
+  list        GET of the transaction list (filtered and ordered) and the property list (response cache off)
+  contention  transaction creates from concurrent threads against one hot property
+  revaluation single PATCH revaluations, then a batch through apply_revaluations
+  login       sequential JWT logins (POST /auth/token/) with the configured password hasher
+
+The dataset depends only on ``--transactions`` and ``--seed``. It is loaded into a throwaway
+test database on the configured backend (PostgreSQL, where it is loaded with COPY), or on a
+temporary SQLite file with ``--sqlite``. Sizes take k/M suffixes, from 1k up to 10M.
+
+    python -m benchmarks.suite --transactions 100k --output before.json
+    python -m benchmarks.suite --sqlite --transactions 1k --scenario list --scenario login
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from .common import benchmark_database, row_count, setup_django
+
+SCENARIOS = ('list', 'contention', 'revaluation', 'login')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def latency_stats(latencies):
+    return {
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def server_timing(response, metric):
+    """A ``dur`` of the response's Server-Timing header, in seconds (0 when the header is off)."""
+    for entry in response.get('Server-Timing', '').split(', '):
+        name, *params = entry.split(';')
+        if name == metric:
+            return float(dict(param.split('=', 1) for param in params)['dur']) / 1000
+    return 0.0
+
+
+def client_for(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient(raise_request_exception=False)
+    client.force_authenticate(user=user)
+    return client
+
+
+def scenario_list(args, dataset, user):
+    from django.db import connection
+    from django.test import override_settings
+    from django.test.utils import CaptureQueriesContext
+    from realestate.models import Property
+
+    hot = Property.objects.filter(title__startswith="Bench property").order_by('id').values_list('id', flat=True)[
+        dataset.properties // 2]
+    requests = {
+        "transactions": "/transactions/",
+        "transactions_by_property": f"/transactions/?property_id={hot}&ordering=-price",
+        "transactions_by_district_recent": "/transactions/?district=Limassol&ordering=-transaction_date",
+        "transactions_price_range": "/transactions/?min_price=500000&max_price=600000",
+        "properties": "/properties/",
+    }
+    client, results = client_for(user), {}
+    with override_settings(API_CACHE_TIMEOUT=0):
+        for name, url in requests.items():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+            query_count = len(queries)  # the next request resets the connection's query log
+            latencies = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                client.get(url)
+                latencies.append(time.perf_counter() - start)
+            results[name] = {**latency_stats(latencies), "queries": query_count, "bytes": len(response.content)}
+    return results
+
+
+def scenario_contention(args, dataset, user):
+    from django.db import connection
+    from realestate.models import Property, User
+
+    hot = Property.objects.create(title="Hot property", district="Limassol", estimated_value=100000, user=user)
+    workers = list(User.objects.filter(username__in=[f"bench_{number}" for number in range(1, args.threads + 1)]))
+    latencies, lock_waits, statuses, lock = [], [], Counter(), threading.Lock()
+    base_date = datetime.now(timezone.utc) - timedelta(days=1)
+
+    def worker(index):
+        client = client_for(workers[index])
+        try:
+            for number in range(args.requests):
+                payload = {"property": hot.id, "percentage": "0.10", "price": 100000,
+                           "transaction_date": (base_date + timedelta(microseconds=number)).isoformat()}
+                start = time.perf_counter()
+                response = client.post("/transactions/", payload, format="json")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    lock_waits.append(server_timing(response, 'lock'))
+                    statuses[response.status_code] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(workers))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return {"create": {
+        "threads": len(workers), "created_per_s": round(statuses[201] / wall, 1), **latency_stats(latencies),
+        "lock_wait_p50_ms": round(percentile(lock_waits, 0.5) * 1000, 3),
+        "lock_wait_p99_ms": round(percentile(lock_waits, 0.99) * 1000, 3),
+        "errors": sum(number for status, number in statuses.items() if status != 201),
+    }}
+
+
+def revalued(value):
+    # +2% (twice) keeps every generated price, 55%-145% of the value, inside the 50%-150% band
+    return str((value * Decimal('1.02')).quantize(Decimal('0.01')))
+
+
+def scenario_revaluation(args, dataset, user):
+    from realestate.models import Property
+    from realestate.revaluation import apply_revaluations
+
+    client, latencies = client_for(user), []
+    generated = Property.objects.filter(title__startswith="Bench property").order_by('id')
+    for property_id, value in generated.values_list('id', 'estimated_value')[:args.iterations]:
+        start = time.perf_counter()
+        response = client.patch(f"/properties/{property_id}/", {"estimated_value": revalued(value)},
+                                format="json")
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, (property_id, response.status_code)
+
+    batch = generated.values_list('id', 'estimated_value')[:args.batch]
+    rows = [(line, {"property_id": property_id, "estimated_value": revalued(value)})
+            for line, (property_id, value) in enumerate(batch, start=1)]
+    start = time.perf_counter()
+    applied, rejects = apply_revaluations(rows, user=user)
+    elapsed = time.perf_counter() - start
+    assert not rejects, rejects[:3]
+    return {"patch": latency_stats(latencies),
+            "batch": {"rows": applied, "seconds": round(elapsed, 3), "rows_per_s": round(applied / elapsed, 1)}}
+
+
+def scenario_login(args, dataset, user):
+    from rest_framework.test import APIClient
+    from .datagen import PASSWORD
+
+    client, latencies, statuses = APIClient(raise_request_exception=False), [], Counter()
+    start = time.perf_counter()
+    for number in range(args.logins):
+        username = f"bench_{number % dataset.users + 1}"
+        request_start = time.perf_counter()
+        response = client.post("/auth/token/", {"username": username, "password": PASSWORD}, format="json")
+        latencies.append(time.perf_counter() - request_start)
+        statuses[response.status_code] += 1
+    wall = time.perf_counter() - start
+    return {"token": {"logins_per_s": round(statuses[200] / wall, 2), **latency_stats(latencies),
+                      "errors": sum(number for status, number in statuses.items() if status != 200)}}
+
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip()
+    try:
+        return git("rev-parse", "--short", "HEAD") or None, bool(git("status", "--porcelain", "--untracked-files=no"))
+    except OSError:
+        return None, False
+
+
+def environment():
+    import django
+    from django.conf import settings
+    from django.db import connection
+
+    commit, dirty = git_revision()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_version()" if connection.vendor == 'sqlite' else "SHOW server_version")
+        version = cursor.fetchone()[0]
+    return {
+        "commit": commit, "dirty": dirty, "date": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "python": platform.python_version(), "django": django.get_version(),
+        "database": f"{connection.vendor} {version}",
+        "settings": {name: getattr(settings, name) for name in
+                     ("TRANSACTION_CONCURRENCY_MODE", "PASSWORD_HASHER", "METRICS_ENABLED")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=row_count, default=10_000, help="dataset size, e.g. 1k, 1M, 10M")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenario', choices=SCENARIOS, action='append', help="scenario(s) to run (default: all)")
+    parser.add_argument('--iterations', type=int, default=50, help="requests per list query and PATCH revaluations")
+    parser.add_argument('--threads', type=int, default=8, help="contention: concurrent writers")
+    parser.add_argument('--requests', type=int, default=25, help="contention: creates per thread")
+    parser.add_argument('--batch', type=int, default=1000, help="revaluation: rows in the apply_revaluations batch")
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--sqlite', action='store_true', help="run on a temporary SQLite database")
+    parser.add_argument('--output', help="JSON results file (default: benchmarks/results/<commit>-<db>-<size>.json)")
+    args = parser.parse_args()
+    setup_django(sqlite=args.sqlite)
+    # Keep the per-request INFO lines and the tracebacks of failed contended writes (counted as errors) off the terminal
+    for name in ('realestate', 'django.request'):
+        logging.getLogger(name).setLevel(logging.CRITICAL)
+
+    from django.db import connection
+    from realestate.models import User
+    from .datagen import generate
+
+    with benchmark_database():
+        print(f"Loading {args.transactions:,} transactions (seed {args.seed}) into {connection.vendor}")
+        dataset = generate(args.transactions, args.seed, progress=lambda message: print(f"  {message}"))
+        admin = User.objects.create(username="bench_admin", password="!", is_staff=True)
+        results = {"environment": environment(), "dataset": vars(dataset), "scenarios": {}}
+        for name in args.scenario or SCENARIOS:
+            print(f"Running {name}")
+            scenario = globals()[f"scenario_{name}"]
+            results["scenarios"][name] = scenario(args, dataset, admin)
+            for case, metrics in results["scenarios"][name].items():
+                print(f"  {case:<32} " + "  ".join(f"{metric}={value}" for metric, value in metrics.items()))
+
+    commit = results["environment"]["commit"] or "unknown"
+    output = Path(args.output or Path(__file__).parent / "results" / f"{commit}-{connection.vendor}-{args.transactions}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, default=str) + "\n")
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
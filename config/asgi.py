@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Serve the read endpoints as async views (see ASYNC_READ_VIEWS in config/settings.py)
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+# Async ORM calls run in a thread per request: persistent connections would pile up, one per thread
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'realestate.log.RequestLogMiddleware',  # first, so everything below logs within the request's context
+    'realestate.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +83,27 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Connections persist for DB_CONN_MAX_AGE seconds ("none": until they fail, 0: one per request) and
+# are checked before reuse when DB_CONN_HEALTH_CHECKS is on. DB_POOL=true uses Django's psycopg 3
+# connection pool instead (requires `poetry install --with pool`); a pooled connection goes back to
+# the pool after each request, so CONN_MAX_AGE is 0 then. DB_POOL_MAX_SIZE should cover the threads
+# of a server process; DB_POOL_TIMEOUT is how long a request waits for a free connection.
+# Under ASGI (config.asgi) connections must not persist: the async views run their queries in a
+# thread per request, each of which would keep its own connection open. config.asgi sets
+# DB_CONN_MAX_AGE to 0 unless the environment sets it; DB_POOL is the way to reuse connections there.
+
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+if DB_POOL:
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            "DB_POOL=True needs psycopg 3 and psycopg_pool: poetry install --with pool "
+            "(or pip install \"psycopg[binary,pool]\")."
+        )
+
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
 
 DATABASES = {
     'default': {
@@ -88,9 +112,113 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'realestate_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'password'),
         'HOST': os.getenv('POSTGRES_HOST', 'db'),
-        'PORT': os.getenv('POSTGRES_PORT', 5432)
+        'PORT': os.getenv('POSTGRES_PORT', 5432),
+        'CONN_MAX_AGE': 0 if DB_POOL else None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            **({'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            }} if DB_POOL else {}),
+        },
+    }
+}
+
+
+# Cache
+# Local memory by default; point DJANGO_CACHE_BACKEND/DJANGO_CACHE_LOCATION at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) when running several workers.
+# Writes invalidate cached responses by bumping version keys in the cache, which a local memory
+# cache only does in the process that made the write: response and statistics caching are off by
+# default on it, and turning it on there with several workers (WEB_CONCURRENCY) is refused.
+
+LOCAL_MEMORY_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', LOCAL_MEMORY_CACHE),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', ''),
     }
 }
+SHARED_CACHE = CACHES['default']['BACKEND'] != LOCAL_MEMORY_CACHE
+
+API_CACHE_ALIAS = 'default'
+# seconds, 0 disables response caching
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 300 if SHARED_CACHE else 0))
+# Rollups of closed statistics buckets are versioned per month, so they can live much longer;
+# like the responses, they are only cached by default on a shared backend. Seconds, 0 disables them
+API_STATS_CACHE_TIMEOUT = int(os.getenv('API_STATS_CACHE_TIMEOUT', 86400 if SHARED_CACHE else 0))
+
+if not SHARED_CACHE and int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+    for name, timeout in (('API_CACHE_TIMEOUT', API_CACHE_TIMEOUT), ('API_STATS_CACHE_TIMEOUT', API_STATS_CACHE_TIMEOUT)):
+        if timeout:
+            raise ImproperlyConfigured(
+                f"{name} needs a shared DJANGO_CACHE_BACKEND when WEB_CONCURRENCY runs several workers: "
+                "with the local memory cache, the other workers keep serving data a write has made stale."
+            )
+
+
+# Async read views
+# Under ASGI (config.asgi turns this on unless the environment sets it), the list/retrieve
+# endpoints of properties, transactions and users run as async views on the async ORM.
+# Under WSGI they stay sync: an async view would only add an event loop per request there.
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False').lower() == 'true'
+
+if ASYNC_READ_VIEWS and DATABASES['default']['CONN_MAX_AGE'] != 0:
+    raise ImproperlyConfigured(
+        "ASYNC_READ_VIEWS needs DB_CONN_MAX_AGE=0: persistent connections leak one per request thread "
+        "under ASGI. Use DB_POOL=True to reuse connections."
+    )
+
+
+# Transaction write concurrency
+# 'pessimistic' locks the property row (SELECT ... FOR UPDATE) for the whole validation.
+# 'optimistic' validates without locks and claims the property's ownership version with a
+# conditional UPDATE, retrying up to TRANSACTION_OPTIMISTIC_RETRIES times on conflicts.
+
+TRANSACTION_CONCURRENCY_MODE = os.getenv('TRANSACTION_CONCURRENCY_MODE', 'pessimistic')
+TRANSACTION_OPTIMISTIC_RETRIES = int(os.getenv('TRANSACTION_OPTIMISTIC_RETRIES', 5))
+
+# Worker processes hashing passwords for bulk user provisioning (1 hashes in the calling process).
+# Each server process starts its own pool on its first large batch and keeps it.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Users per POST /users/bulk/ request. Their passwords are hashed while the request waits (about
+# 0.4s each at the default PBKDF2 cost), so a batch must fit well inside the server's worker
+# timeout (gunicorn: 30s) even on one core; manage.py provision_users takes larger batches.
+BULK_USERS_MAX_BATCH = int(os.getenv('BULK_USERS_MAX_BATCH', 50))
+
+
+# Password hashing (see realestate.hashers)
+# PASSWORD_HASHER picks the algorithm new hashes use: pbkdf2, scrypt or argon2 (needs argon2-cffi).
+# Hashes made by the others, or with other cost parameters, are upgraded on the next login.
+# Tune the costs to a latency budget with: python manage.py tune_password_hasher --target-ms 100
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 1_000_000))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 14))
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.getenv('PASSWORD_SCRYPT_BLOCK_SIZE', 8))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 102400))  # KiB
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'realestate.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'realestate.hashers.ScryptPasswordHasher',
+    'argon2': 'realestate.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Password checks run in a pool of PASSWORD_VERIFY_WORKERS threads or processes (none: on the
+# request thread); a login waits at most PASSWORD_VERIFY_TIMEOUT seconds for a free one, then gets a 503
+PASSWORD_VERIFY_POOL = os.getenv('PASSWORD_VERIFY_POOL', 'none')
+PASSWORD_VERIFY_WORKERS = int(os.getenv('PASSWORD_VERIFY_WORKERS', 2))
+PASSWORD_VERIFY_TIMEOUT = float(os.getenv('PASSWORD_VERIFY_TIMEOUT', 5))
+
+AUTHENTICATION_BACKENDS = ['realestate.backends.PooledHashingBackend']
 
 
 # Password validation
@@ -138,14 +266,25 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'realestate.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'realestate.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
 }
 
+SIMPLE_JWT = {
+    # Adds is_staff/is_active claims so requests are authenticated without loading the user
+    'TOKEN_OBTAIN_SERIALIZER': 'realestate.serializers.user.ClaimsTokenObtainPairSerializer',
+    # Tokens carry a hash of the password hash: changing the password revokes them
+    'CHECK_REVOKE_TOKEN': True,
+}
+# Seconds token-authenticated requests may use a cached is_active/is_staff/password state (0: trust the claims)
+JWT_USER_STATE_TTL = int(os.getenv('JWT_USER_STATE_TTL', 30))
+
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
     'SECURITY_DEFINITIONS': {
@@ -159,6 +298,23 @@ SWAGGER_SETTINGS = {
     'SECURITY': [{'Bearer': []}],
 }
 
+# Request metrics
+# Query count, database, lock-wait and rendering time per request, in the Server-Timing header and
+# as per-route Prometheus histograms at /metrics/ (served only with METRICS_TOKEN set, as a bearer token).
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'True').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Logging
+# The app logger writes structured JSON (LOG_FORMAT=text for the plain format) through a queue,
+# so formatting and I/O happen on a listener thread (see realestate.log). LOG_LEVEL sets the app
+# logger's level; at DEBUG, only LOG_DEBUG_SAMPLE_RATE of the requests (0 to 1) keep their DEBUG records.
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -167,12 +323,25 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'realestate.log.JSONFormatter',
+        },
+    },
+    'filters': {
+        'request_context': {
+            '()': 'realestate.log.RequestContextFilter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'queue': {
+            '()': 'realestate.log.QueuedHandler',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+            'filters': ['request_context'],
+        },
     },
     'loggers': {
         'django': {
@@ -180,9 +349,9 @@ LOGGING = {
             'level': 'INFO',
         },
         'realestate': {  # app-specific logs
-            'handlers': ['console'],
-            'level': 'DEBUG',
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
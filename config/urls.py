@@ -25,6 +25,8 @@ from rest_framework.routers import DefaultRouter
 from realestate.views.property import PropertyViewSet
 from realestate.views.transaction import TransactionViewSet
 from realestate.views.user import UserViewSet
+from realestate.views.analytics import DistrictSummaryViewSet
+from realestate.metrics import metrics_view
 from django.views.generic import TemplateView
 
 
@@ -49,11 +51,13 @@ router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='users')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'properties', PropertyViewSet, basename='property')
+router.register(r'districts', DistrictSummaryViewSet, basename='district')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics/', metrics_view, name='metrics'),
     path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', TemplateView.as_view(template_name='swagger-ui.html'), name='custom-swagger-ui'),
 ]
@@ -0,0 +1,183 @@
+"""
+Analytics summaries: per-district totals and per-user portfolio values.
+
+``DistrictSummary`` and ``PortfolioSummary`` are maintained incrementally from the same write
+paths as the ownership ledger (``realestate.ledger`` and ``realestate.signals``), so the
+analytics endpoints read one row per district or user whatever the number of transactions.
+Per-property totals live on the ledger's ``PropertyAllocation`` row instead.
+
+Unlike ledger rows, a summary row is shared by many properties. Its deltas are therefore applied
+after commit in short autocommit statements, so a busy district never becomes a lock that
+every transaction write in it waits on. Deltas commute, so the order they land in does not
+matter, and rolled back writes never apply theirs. A crash between a commit and its callbacks
+leaves a summary behind; ``rebuild_ownership_ledger --check`` reports it and a rebuild repairs it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from .models import DistrictSummary, OwnershipShare, PortfolioSummary, Property, PropertyAllocation, Transaction
+
+HUNDRED = Decimal('100')
+VALUE_PRECISION = Decimal('0.000001')
+
+
+def _apply_deltas(model, pk, **deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(pk=pk).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **deltas)
+    except IntegrityError:  # created concurrently in the meantime, or its user is gone
+        model.objects.filter(pk=pk).update(**changes)
+
+
+def _apply_many_deltas(model, deltas):
+    """``_apply_deltas`` for ``{pk: {field: delta}}``: one UPDATE for the rows that exist, whatever their number."""
+    deltas = {pk: changes for pk, changes in (
+        (pk, {field: delta for field, delta in changes.items() if delta}) for pk, changes in deltas.items()
+    ) if changes}
+    if len(deltas) <= 1:
+        for pk, changes in deltas.items():
+            _apply_deltas(model, pk, **changes)
+        return
+    # Rows are only ever deleted with their user, so the ones found here are still there for the UPDATE
+    existing = set(model.objects.filter(pk__in=deltas).values_list('pk', flat=True))
+    fields = {field for pk in existing for field in deltas[pk]}
+    if fields:
+        model.objects.filter(pk__in=existing).update(**{
+            field: F(field) + Case(*(When(pk=pk, then=Value(deltas[pk].get(field, 0))) for pk in existing),
+                                   default=Value(0), output_field=model._meta.get_field(field))
+            for field in fields
+        })
+    for pk in deltas.keys() - existing:
+        _apply_deltas(model, pk, **deltas[pk])
+
+
+def record_district_delta(district, properties=0, transactions=0, volume=0):
+    transaction.on_commit(lambda: _apply_deltas(
+        DistrictSummary, district, property_count=properties, transaction_count=transactions, volume=volume
+    ))
+
+
+def record_portfolio_deltas(deltas):
+    """Apply ``{user_id: (owned_properties_delta, value_delta)}`` after commit."""
+    transaction.on_commit(lambda: _apply_many_deltas(PortfolioSummary, {
+        user_id: {'property_count': owned_properties, 'value': value}
+        for user_id, (owned_properties, value) in deltas.items()
+    }))
+
+
+def record_portfolio_delta(user_id, property_id, percentage_delta, owned_properties=0):
+    """Record that a user's share of a property changed by ``percentage_delta`` percent."""
+    estimated_value = Property.objects.filter(pk=property_id).values_list('estimated_value', flat=True).first()
+    value = percentage_delta * (estimated_value or 0) / HUNDRED
+    record_portfolio_deltas({user_id: (owned_properties, value)})
+
+
+def record_revaluations(changes):
+    """Record the portfolio changes of ``{property_id: (old_value, new_value)}`` for every shareholder."""
+    deltas = defaultdict(Decimal)
+    shares = OwnershipShare.objects.filter(property_id__in=changes).values_list('user_id', 'property_id', 'percentage')
+    for user_id, property_id, percentage in shares:
+        old_value, new_value = changes[property_id]
+        deltas[user_id] += percentage * (new_value - old_value) / HUNDRED
+    if deltas:
+        record_portfolio_deltas({user_id: (0, value) for user_id, value in deltas.items()})
+
+
+def record_property_moved(property_id, old_district, new_district):
+    """Move a property's totals to another district. Locks its allocation row until commit."""
+    count, total = (PropertyAllocation.objects.select_for_update().filter(property_id=property_id)
+                    .values_list('transaction_count', 'price_total').first() or (0, 0))
+    record_district_delta(old_district, properties=-1, transactions=-count, volume=-total)
+    record_district_delta(new_district, properties=1, transactions=count, volume=total)
+
+
+def record_property_removal(property_obj):
+    """Take a property that is about to be deleted out of its district and its owners' portfolios."""
+    count, total, district = (PropertyAllocation.objects.filter(property_id=property_obj.pk)
+                              .values_list('transaction_count', 'price_total', 'property__district').first()
+                              or (0, 0, property_obj.district))
+    record_district_delta(district, properties=-1, transactions=-count, volume=-total)
+    shares = OwnershipShare.objects.filter(property_id=property_obj.pk).values_list(
+        'user_id', 'percentage', 'property__estimated_value'
+    )
+    deltas = {user_id: (-1, -percentage * estimated_value / HUNDRED) for user_id, percentage, estimated_value in shares}
+    if deltas:
+        record_portfolio_deltas(deltas)
+
+
+def _empty_district():
+    return {'property_count': 0, 'transaction_count': 0, 'volume': Decimal('0')}
+
+
+def compute_summaries():
+    """Compute the expected summaries from the raw data.
+
+    Returns ``(districts, portfolios)``: district name and user id to a dict of the summary fields.
+    """
+    districts = {district: _empty_district() for district, _ in Property.DISTRICT_CHOICES}
+    for row in Property.objects.values('district').annotate(count=Count('id')).order_by():
+        districts.setdefault(row['district'], _empty_district())['property_count'] = row['count']
+    rows = Transaction.objects.values('property__district').annotate(count=Count('id'), volume=Sum('price')).order_by()
+    for row in rows:
+        districts.setdefault(row['property__district'], _empty_district()).update(
+            transaction_count=row['count'], volume=row['volume']
+        )
+
+    portfolios = defaultdict(lambda: {'property_count': 0, 'value': Decimal('0')})
+    rows = Transaction.objects.values('user_id', 'property_id', 'property__estimated_value').annotate(
+        total=Sum('percentage')
+    ).order_by()
+    for row in rows:
+        if row['total']:
+            portfolio = portfolios[row['user_id']]
+            portfolio['property_count'] += 1
+            portfolio['value'] += row['total'] * row['property__estimated_value'] / HUNDRED
+    return districts, dict(portfolios)
+
+
+def check_summaries():
+    """Return a list of human readable mismatches between the summaries and the raw data."""
+    expected_districts, expected_portfolios = compute_summaries()
+    stored_districts = {
+        district: {'property_count': properties, 'transaction_count': transactions, 'volume': volume}
+        for district, properties, transactions, volume in DistrictSummary.objects.values_list(
+            'district', 'property_count', 'transaction_count', 'volume')
+    }
+    stored_portfolios = {
+        user_id: {'property_count': properties, 'value': value}
+        for user_id, properties, value in PortfolioSummary.objects.values_list('user_id', 'property_count', 'value')
+    }
+
+    mismatches = []
+    for district in expected_districts.keys() | stored_districts.keys():
+        stored = stored_districts.get(district, _empty_district())
+        expected = expected_districts.get(district, _empty_district())
+        if stored != expected:
+            mismatches.append(f"District {district}: summary {stored}, data gives {expected}")
+    empty_portfolio = {'property_count': 0, 'value': Decimal('0')}
+    for user_id in expected_portfolios.keys() | stored_portfolios.keys():
+        stored = stored_portfolios.get(user_id, empty_portfolio)
+        expected = expected_portfolios.get(user_id, empty_portfolio)
+        if (stored['property_count'] != expected['property_count']
+                or stored['value'].quantize(VALUE_PRECISION) != expected['value'].quantize(VALUE_PRECISION)):
+            mismatches.append(f"User {user_id}: portfolio {stored}, data gives {expected}")
+    return mismatches
+
+
+def rebuild_summaries():
+    """Replace the summaries with values recomputed from the raw data."""
+    districts, portfolios = compute_summaries()
+    DistrictSummary.objects.all().delete()
+    PortfolioSummary.objects.all().delete()
+    DistrictSummary.objects.bulk_create(DistrictSummary(district=district, **values)
+                                        for district, values in districts.items())
+    PortfolioSummary.objects.bulk_create(PortfolioSummary(user_id=user_id, **values)
+                                         for user_id, values in portfolios.items())
+    return len(districts), len(portfolios)
@@ -0,0 +1,88 @@
+"""
+Stateless JWT authentication.
+
+simplejwt's ``JWTAuthentication`` loads the user row on every request. ``ClaimsJWTAuthentication``
+builds ``request.user`` from the signed claims instead: a ``ClaimsUser`` carrying the id,
+``is_staff`` and ``is_active`` put into the token at login (``ClaimsTokenObtainPairSerializer``),
+which is all the permissions need.
+
+Deactivation, staff changes and revocation (a password change invalidates the tokens issued
+before it, simplejwt's ``CHECK_REVOKE_TOKEN`` claim) still apply through a small per-user state
+kept in the cache. Saving or deleting a user drops it (see ``realestate.signals``) and it
+expires after ``JWT_USER_STATE_TTL`` seconds, which bounds how long writes that bypass the
+signals, or a per-process cache in another worker, can go unnoticed. A cache hit costs no
+query; a TTL of 0 skips the check and trusts the claims until the token expires.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .cache import get_cache
+from .models import User
+
+
+def _state_key(user_id):
+    return f"realestate:auth:user:{user_id}"
+
+
+def get_user_state(user_id):
+    """Return ``(is_active, is_staff, revoke_claim)`` of a user, or ``None`` if there is no such user."""
+    cache = get_cache()
+    state = cache.get(_state_key(user_id))
+    if state is None:
+        row = User.objects.filter(pk=user_id).values_list('is_active', 'is_staff', 'password').first()
+        # Unknown users are cached too (as False), so a deleted user's tokens cost no query either
+        state = (row[0], row[1], get_md5_hash_password(row[2])) if row else False
+        cache.set(_state_key(user_id), state, settings.JWT_USER_STATE_TTL)
+    return state or None
+
+
+def forget_user_state(user_id):
+    """Drop a user's cached state now and again after commit (concurrent requests may re-read the old row)."""
+    key = _state_key(user_id)
+    get_cache().delete(key)
+    transaction.on_commit(lambda: get_cache().delete(key))
+
+
+class ClaimsUser(TokenUser):
+    """``request.user`` built from token claims: no database row, ``id`` and ``pk`` typed like the model's."""
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def is_active(self):
+        return self.token.get("is_active", True)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user = ClaimsUser(validated_token)
+        try:
+            user.id
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        if settings.JWT_USER_STATE_TTL:
+            state = get_user_state(user.id)
+            if state is None:
+                raise AuthenticationFailed("User not found", code="user_not_found")
+            is_active, is_staff, revoke_claim = state
+            if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revoke_claim:
+                raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+            # The cached state is fresher than the claims
+            user.is_active, user.is_staff = is_active, is_staff
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from .hashers import run_hashing
+import logging
+
+logger = logging.getLogger('realestate')
+UserModel = get_user_model()
+
+
+class PooledHashingBackend(ModelBackend):
+    """
+    ModelBackend that hashes in the pool of realestate.hashers.run_hashing, used by every
+    authenticate() call including the JWT token endpoint. Outdated hashes are upgraded on login.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash once anyway so unknown usernames cannot be told apart by the response time
+            run_hashing(make_password, password)
+            return None
+
+        is_correct, must_update = run_hashing(verify_password, password, user.password)
+        if not is_correct:
+            return None
+        if must_update:
+            user.password = run_hashing(make_password, password)
+            user.save(update_fields=["password"])
+            logger.info("[AUTH] Password hash of User ID=%s upgraded to the configured hasher", user.id)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,235 @@
+"""
+Bulk loading of users, properties and transactions, for restoring production-sized extracts.
+
+Rows are inserted in chunks, bypassing the signals: with ``COPY ... FROM STDIN`` on PostgreSQL
+and ``bulk_create`` elsewhere. On PostgreSQL the plain (non-unique) indexes and the foreign
+keys of tables that are empty when the load starts are dropped first and recreated at the end,
+so each is built, or validated, in one pass instead of row by row. The unique constraints stay
+in place. This takes exclusive locks on those tables until the load commits.
+
+Once the rows are in, the ownership rules the API enforces per write are checked over the
+whole tables in one set-based pass (``check_invariants``). Then the sequences are moved past
+the imported ids, the ownership ledger and the analytics summaries are rebuilt, and the response
+cache versions are bumped. Everything runs in one transaction, so a failed import leaves
+nothing behind.
+"""
+import io
+from contextlib import contextmanager
+from decimal import Decimal
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import DateTimeField, F, Max, Q, Sum
+from django.utils import timezone
+from .analytics import rebuild_summaries
+from .cache import STATS_VERSION, TRANSACTIONS_VERSION, invalidate_versions, property_version_name
+from .ledger import rebuild_ledger
+from .models import Property, Transaction, User
+
+BULK_LOAD_CHUNK_SIZE = 10_000
+# Violations listed per invariant before the import gives up
+MAX_REPORTED_VIOLATIONS = 10
+
+# Columns read from the input files, in load order (the foreign keys point backwards)
+IMPORT_FIELDS = {
+    User: ('id', 'username', 'password', 'email', 'first_name', 'last_name', 'is_staff', 'is_active',
+           'is_superuser', 'date_joined'),
+    Property: ('id', 'title', 'district', 'estimated_value', 'user_id'),
+    Transaction: ('id', 'user_id', 'property_id', 'percentage', 'price', 'transaction_date'),
+}
+
+# Non-unique indexes: the ones that back no constraint
+PLAIN_INDEXES_SQL = """
+    SELECT index_class.relname, pg_get_indexdef(index_class.oid)
+    FROM pg_index JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+    WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisunique AND NOT pg_index.indisprimary
+"""
+FOREIGN_KEYS_SQL = """
+    SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'
+"""
+
+
+class BulkLoadError(Exception):
+    """An input row could not be loaded, or the loaded data breaks an ownership rule."""
+
+
+def build_instances(model, rows, source):
+    """Yield unsaved ``model`` instances from ``(line_number, row)`` pairs read from ``source`` (a file name)."""
+    fields = [(name, model._meta.get_field(name)) for name in IMPORT_FIELDS[model]]
+    for line, row in rows:
+        if row is None:
+            raise BulkLoadError(f"{source}, line {line}: not a JSON object.")
+        values = {}
+        for name, field in fields:
+            value = row.get(name)
+            if value is None or value == '':
+                if name == 'password':
+                    values[name] = make_password(None)
+                elif not field.has_default() and not field.null and not field.blank:
+                    raise BulkLoadError(f"{source}, line {line}: {name} is required.")
+                continue
+            try:
+                value = field.to_python(value)
+            except ValidationError as error:
+                raise BulkLoadError(f"{source}, line {line}: {name}: {' '.join(error.messages)}")
+            if isinstance(field, DateTimeField) and timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            values[name] = value
+        yield model(**values)
+
+
+def _copy_value(value):
+    """``value`` in the text format of ``COPY``."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _copy(model, objects, chunk_size, progress):
+    fields = model._meta.concrete_fields
+    quote = connection.ops.quote_name
+    sql = f"COPY {quote(model._meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) FROM STDIN"
+    count = 0
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        while chunk := list(islice(objects, chunk_size)):
+            buffer = io.StringIO()
+            for obj in chunk:
+                buffer.write("\t".join(_copy_value(field.get_db_prep_save(field.pre_save(obj, True), connection))
+                                       for field in fields) + "\n")
+            if hasattr(raw, 'copy_expert'):  # psycopg2
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+            count += len(chunk)
+            if progress:
+                progress(model, count)
+    return count
+
+
+def insert(model, objects, chunk_size=BULK_LOAD_CHUNK_SIZE, progress=None):
+    """
+    Insert ``objects`` in chunks without sending signals: ``COPY`` on PostgreSQL, ``bulk_create``
+    elsewhere. ``progress(model, rows_so_far)`` is called after each chunk. Returns the row count.
+    """
+    objects = iter(objects)
+    if connection.vendor == 'postgresql':
+        return _copy(model, objects, chunk_size, progress)
+    count = 0
+    while chunk := list(islice(objects, chunk_size)):
+        model.objects.bulk_create(chunk)
+        count += len(chunk)
+        if progress:
+            progress(model, count)
+    return count
+
+
+@contextmanager
+def deferred_indexes(models):
+    """
+    On PostgreSQL, drop the plain indexes and foreign keys of the empty tables among ``models``
+    and recreate them when the block exits without an error (on an error, rolling back the
+    transaction restores them). Yields the names of the deferred indexes and constraints.
+    """
+    deferred, statements = [], []
+    if connection.vendor == 'postgresql':
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in models:
+                if model.objects.exists():
+                    continue  # rebuilding the index would cost more than maintaining it for the new rows
+                table = quote(model._meta.db_table)
+                cursor.execute(FOREIGN_KEYS_SQL, [model._meta.db_table])
+                for name, definition in cursor.fetchall():
+                    cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {quote(name)}")
+                    deferred.append(name)
+                    statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {quote(name)} {definition}")
+                cursor.execute(PLAIN_INDEXES_SQL, [model._meta.db_table])
+                for name, definition in cursor.fetchall():
+                    cursor.execute(f"DROP INDEX {quote(name)}")
+                    deferred.append(name)
+                    # Indexes before the foreign keys, whose validation may use them
+                    statements.insert(0, definition)
+    yield deferred
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def reset_sequences(models):
+    """Move the id sequences of ``models`` past the ids inserted explicitly."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def check_invariants(limit=MAX_REPORTED_VIOLATIONS):
+    """
+    Check the rules the API enforces on each write over all properties and transactions at
+    once, and return up to ``limit`` human readable violations per rule.
+    """
+    violations = []
+    districts = [district for district, _ in Property.DISTRICT_CHOICES]
+    for property_id, district in (Property.objects.exclude(district__in=districts)
+                                  .values_list('id', 'district')[:limit]):
+        violations.append(f"Property {property_id}: unknown district {district!r}")
+    for row in (Transaction.objects.values('property_id').annotate(total=Sum('percentage'))
+                .filter(total__gt=100).order_by('property_id')[:limit]):
+        violations.append(f"Property {row['property_id']}: {row['total']}% sold")
+    for row in (Transaction.objects.values('property_id', 'user_id').annotate(total=Sum('percentage'))
+                .filter(total__gt=80).order_by('property_id', 'user_id')[:limit]):
+        violations.append(f"User {row['user_id']} owns {row['total']}% of property {row['property_id']}")
+
+    value = F('property__estimated_value')
+    broken = Transaction.objects.filter(
+        Q(percentage__lt=Decimal('0.01')) | Q(percentage__gt=100) | Q(price__lt=10000)
+        | Q(price__lt=value * Decimal('0.5')) | Q(price__gt=value * Decimal('1.5'))
+        | Q(transaction_date__gt=timezone.now())
+    ).order_by('id')
+    for transaction_id, percentage, price, estimated_value, transaction_date in broken.values_list(
+            'id', 'percentage', 'price', 'property__estimated_value', 'transaction_date')[:limit]:
+        violations.append(f"Transaction {transaction_id}: percentage {percentage}, price {price} for an estimated "
+                          f"value of {estimated_value}, dated {transaction_date.isoformat()}")
+    return violations
+
+
+def import_rows(sources, chunk_size=BULK_LOAD_CHUNK_SIZE, defer_indexes=True, progress=None):
+    """
+    Load ``{model: instances}`` (users, properties and/or transactions, see ``build_instances``)
+    in one transaction, then validate and rebuild everything derived from them (see the module
+    docstring). Raises ``BulkLoadError`` when the loaded data breaks an ownership rule.
+    Returns ``{model: rows_loaded}``.
+    """
+    models = [model for model in IMPORT_FIELDS if model in sources]
+    counts, touched = {}, set()
+
+    def tracked(transactions):
+        # Properties created before the import may have cached responses that its transactions change
+        for obj in transactions:
+            if obj.property_id <= last_property:
+                touched.add(obj.property_id)
+            yield obj
+
+    with transaction.atomic():
+        last_property = Property.objects.aggregate(last=Max('id'))['last'] or 0
+        if Transaction in sources:
+            sources = {**sources, Transaction: tracked(sources[Transaction])}
+        with deferred_indexes(models if defer_indexes else ()):
+            for model in models:
+                counts[model] = insert(model, sources[model], chunk_size, progress)
+        # Foreign keys are checked at commit on both backends: fail here with the rest of the checks
+        connection.check_constraints(table_names=[model._meta.db_table for model in models])
+        violations = check_invariants()
+        if violations:
+            raise BulkLoadError("The imported data breaks the ownership rules:\n" + "\n".join(violations))
+        reset_sequences(models)
+        rebuild_ledger()
+        rebuild_summaries()
+        invalidate_versions(TRANSACTIONS_VERSION, STATS_VERSION, *map(property_version_name, touched))
+    return counts
@@ -0,0 +1,100 @@
+"""
+Response cache for the read endpoints.
+
+Cached responses are keyed on the view action, the requester's visibility scope, the
+normalized query parameters and one or more version counters. Writes never delete cache
+entries; they bump the counters (see ``realestate.signals``) so every key built from the
+old version is simply never read again and expires on its own:
+
+* ``property:<id>`` is bumped by any write to the property or to one of its transactions,
+* ``transactions`` is bumped by any transaction write and by property writes (district
+  changes move transactions in and out of filtered lists),
+* ``stats:<yyyy-mm>`` is bumped by any transaction write dated in that month and ``stats`` by a
+  property moving to another district; they version the statistics rollups (see ``realestate.stats``).
+
+``realestate.mixins.CachedReadMixin`` serves the views from it. The backend is whatever ``API_CACHE_ALIAS`` points to in ``CACHES``: local memory by
+default and in tests, a shared backend such as Redis in production.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _version_key(name):
+    return f"realestate:version:{name}"
+
+
+def get_versions(*names):
+    """Return the current value of each version counter, in order."""
+    cache = get_cache()
+    keys = [_version_key(name) for name in names]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Seed missing (never bumped or evicted) counters from the clock, see bump_versions
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump_versions(*names):
+    cache = get_cache()
+    for name in names:
+        key = _version_key(name)
+        # Seed from the clock so a counter that was evicted never returns to an already used value
+        if not cache.add(key, time.time_ns(), timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:  # evicted between add() and incr()
+                cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_versions(*names):
+    """Bump the counters now and again once the current transaction commits.
+
+    The first bump hides stale entries from readers inside this transaction; the second one
+    discards entries that concurrent readers cached from pre-commit data in the meantime.
+    """
+    bump_versions(*names)
+    transaction.on_commit(lambda: bump_versions(*names))
+
+
+def property_version_name(property_id):
+    try:
+        property_id = int(property_id)  # URL kwargs arrive as strings, signals pass ints
+    except (TypeError, ValueError):
+        pass
+    return f"property:{property_id}"
+
+
+TRANSACTIONS_VERSION = "transactions"
+STATS_VERSION = "stats"
+
+
+def stats_version_name(value):
+    """Version counter of the statistics rollups for the calendar month of a date or datetime."""
+    if hasattr(value, 'tzinfo'):
+        value = timezone.localtime(value)
+    return f"stats:{value:%Y-%m}"
+
+
+def get_visibility_scope(request):
+    """Requests in the same scope are allowed to see the same read responses."""
+    return "staff" if request.user.is_staff else "user"
+
+
+def build_cache_key(view, request, versions):
+    params = urlencode(sorted((key, value) for key, values in request.query_params.lists() for value in values))
+    lookup = view.kwargs.get(view.lookup_url_kwarg or view.lookup_field, "")
+    raw = "|".join([request.get_host(), view.basename, view.action, str(lookup), get_visibility_scope(request),
+                    ".".join(map(str, versions)), params])
+    return f"realestate:response:{hashlib.sha256(raw.encode()).hexdigest()}"
+
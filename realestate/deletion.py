@@ -0,0 +1,112 @@
+"""
+Set-based deletion of transactions and properties.
+
+Deleting through the ORM sends ``post_delete`` for every transaction that goes with a property
+or a user, and the ledger receivers (``realestate.signals``) then update the allocation, the
+share, the price band and the summaries once per transaction. ``delete_transactions`` and
+``delete_properties`` delete with single statements and take the rows out of the ledger and the
+summaries in one aggregated pass, so deleting a property or a user costs a fixed number of
+queries whatever it owns. Like the other writes that bypass the signals, they keep the ledger,
+the summaries and the response cache in sync themselves. Call them inside a transaction.
+
+The rows are removed with an explicit ``DELETE ... WHERE <column> IN (...)``: ``QuerySet.delete()``
+collects every row and sends the per-row signals whenever receivers are connected, which is
+what this module avoids.
+"""
+from collections import Counter, defaultdict
+from decimal import Decimal
+from django.db import connection
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from .analytics import HUNDRED, record_district_delta, record_portfolio_deltas
+from .cache import TRANSACTIONS_VERSION, invalidate_versions, property_version_name, stats_version_name
+from .models import OwnershipShare, Property, PropertyAllocation, Transaction
+
+
+def _by(model, field, values, *lookups):
+    """``CASE`` giving each row of ``model`` its value in ``values``, keyed on ``lookups`` (0 for the others)."""
+    return Case(*(When(then=Value(value), **dict(zip(lookups, key if len(lookups) > 1 else (key,))))
+                  for key, value in values.items()),
+                default=Value(0), output_field=model._meta.get_field(field))
+
+
+def _delete(model, field, values):
+    """Delete the rows of ``model`` whose ``field`` is in ``values`` in one statement, without signals."""
+    quote = connection.ops.quote_name
+    column = model._meta.get_field(field).column
+    placeholders = ", ".join(["%s"] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})",
+                       list(values))
+        return cursor.rowcount
+
+
+def _price_bound(ordering):
+    return Subquery(Transaction.objects.filter(property_id=OuterRef('property_id')).order_by(ordering)
+                    .values('price')[:1])
+
+
+def delete_transactions(field, values):
+    """
+    Delete the transactions whose ``field`` (``'user_id'`` or ``'property_id'``) is in ``values``
+    and take them out of the ledger and the summaries. Returns the count.
+    """
+    transactions = Transaction.objects.filter(**{f'{field}__in': values})
+    rows = list(transactions.order_by().values('user_id', 'property_id', 'property__district',
+                                                'property__estimated_value')
+                .annotate(percentage=Sum('percentage'), count=Count('id'), volume=Sum('price')))
+    if not rows:
+        return 0
+    months = {stats_version_name(month) for month in transactions.datetimes('transaction_date', 'month')}
+    # The receivers this skips are what the rest of this function does
+    deleted = _delete(Transaction, field, values)
+
+    percentages, counts, volumes = defaultdict(Decimal), defaultdict(int), defaultdict(Decimal)
+    shares, values, districts = {}, defaultdict(Decimal), defaultdict(lambda: [0, Decimal('0')])
+    for row in rows:
+        property_id, user_id = row['property_id'], row['user_id']
+        percentages[property_id] += row['percentage']
+        counts[property_id] += row['count']
+        volumes[property_id] += row['volume']
+        shares[(user_id, property_id)] = row['percentage']
+        values[user_id] -= row['percentage'] * row['property__estimated_value'] / HUNDRED
+        districts[row['property__district']][0] -= row['count']
+        districts[row['property__district']][1] -= row['volume']
+
+    PropertyAllocation.objects.filter(property_id__in=percentages).update(
+        total_percentage=F('total_percentage') - _by(PropertyAllocation, 'total_percentage', percentages, 'property_id'),
+        transaction_count=F('transaction_count') - _by(PropertyAllocation, 'transaction_count', counts, 'property_id'),
+        price_total=F('price_total') - _by(PropertyAllocation, 'price_total', volumes, 'property_id'),
+        min_price=_price_bound('price'),
+        max_price=_price_bound('-price'),
+        version=F('version') + 1,
+    )
+    affected = OwnershipShare.objects.filter(user_id__in={user_id for user_id, _ in shares},
+                                             property_id__in=percentages)
+    affected.update(percentage=F('percentage') - _by(OwnershipShare, 'percentage', shares, 'user_id', 'property_id'))
+    emptied = affected.filter(percentage__lte=0)
+    owned = Counter(emptied.values_list('user_id', flat=True))
+    emptied.delete()
+
+    record_portfolio_deltas({user_id: (-owned[user_id], value) for user_id, value in values.items()})
+    for district, (transaction_count, volume) in districts.items():
+        record_district_delta(district, transactions=transaction_count, volume=volume)
+    invalidate_versions(TRANSACTIONS_VERSION, *(property_version_name(pk) for pk in percentages), *months)
+    return deleted
+
+
+def delete_properties(properties):
+    """Delete a queryset of properties with their transactions and ledger rows. Returns the number of properties."""
+    rows = list(properties.order_by().values_list('id', 'district'))
+    if not rows:
+        return 0
+    ids = [property_id for property_id, _ in rows]
+    delete_transactions('property_id', ids)
+    # The ledger rows are the only other rows that reference a property
+    PropertyAllocation.objects.filter(property_id__in=ids).delete()
+    OwnershipShare.objects.filter(property_id__in=ids).delete()
+    deleted = _delete(Property, 'id', ids)
+
+    for district, count in Counter(district for _, district in rows).items():
+        record_district_delta(district, properties=-count)
+    invalidate_versions(TRANSACTIONS_VERSION, *(property_version_name(pk) for pk in ids))
+    return deleted
@@ -0,0 +1,47 @@
+"""
+Streaming exports.
+
+Rows are read with ``values_list`` from a server-side cursor and encoded straight to text,
+so no model or serializer instance is built per row and memory stays flat whatever the
+result size. Values are rendered by a ``RowEncoder`` exactly like the serializer renders them.
+"""
+import csv
+import io
+import json
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(encoder, queryset):
+    """Yield encoded rows from a server-side cursor."""
+    for row in encoder.values_list(queryset).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield encoder.encode_values(row)
+
+
+def _batched(rows, size=EXPORT_CHUNK_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_ndjson(rows, fields):
+    for batch in _batched(rows):
+        yield "".join(json.dumps(dict(zip(fields, row)), separators=(',', ':')) + "\n" for row in batch)
+
+
+def stream_csv(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in _batched(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():  # header only, no rows
+        yield buffer.getvalue()
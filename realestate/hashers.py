@@ -0,0 +1,185 @@
+"""
+Password hashing: hashers with a configurable cost and a bounded pool to run them in.
+
+The hashers keep Django's algorithm names, so existing hashes keep verifying, and read their
+cost from the settings (``PASSWORD_PBKDF2_ITERATIONS``, ``PASSWORD_SCRYPT_*``,
+``PASSWORD_ARGON2_*``). ``PASSWORD_HASHER`` picks the preferred one. A hash made with another
+algorithm or other parameters is re-hashed on the next successful login (``must_update``), so
+changing the settings upgrades users transparently. ``python manage.py tune_password_hasher``
+measures the cost of the parameters and suggests the ones that fit a latency budget.
+
+``run_hashing`` runs a hashing call in the pool selected by ``PASSWORD_VERIFY_POOL`` (``thread``
+or ``process``, ``PASSWORD_VERIFY_WORKERS`` wide), so no more than that many hashes are computed
+at once per server process and the rest of its requests keep their CPU. A caller that cannot
+get a slot within ``PASSWORD_VERIFY_TIMEOUT`` seconds gets a 503 instead of queueing forever.
+``get_hash_pool`` builds that pool, and the one bulk user provisioning hashes in.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins are in progress, please retry."
+    default_code = "hashing_busy"
+
+
+_pool_lock = threading.Lock()
+_pools = {}  # name: (pid, kind, workers, executor)
+_login_slots = None  # (executor, BoundedSemaphore): the logins hashing in the login pool at once
+
+
+def get_hash_pool(name, workers, kind='process'):
+    """
+    This process's hashing pool ``name``: ``workers`` processes (``kind='process'``) or threads.
+    It is started on first use and kept; after a fork, or for another size or kind, a new one
+    replaces it.
+    """
+    with _pool_lock:
+        pid, pool_kind, pool_workers, executor = _pools.get(name, (None, None, None, None))
+        if (pid, pool_kind, pool_workers) != (os.getpid(), kind, workers):
+            if pid == os.getpid():
+                executor.shutdown(wait=False)
+            if kind == 'process':
+                # Spawned, not forked: forking a process that runs threads (a web server) is unsafe
+                executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                               initializer=django.setup)
+            else:
+                executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hashing')
+            _pools[name] = (os.getpid(), kind, workers, executor)
+        return executor
+
+
+def shutdown_hash_pool(name, executor=None):
+    """Shut down pool ``name`` (if it is still ``executor``, when given); its next use starts a new one."""
+    with _pool_lock:
+        pid, _, _, current = _pools.get(name, (None, None, None, None))
+        if current is None or executor not in (None, current):
+            return
+        del _pools[name]
+    if pid == os.getpid():
+        current.shutdown(wait=False)
+
+
+def _get_pool():
+    global _login_slots
+    workers = settings.PASSWORD_VERIFY_WORKERS
+    executor = get_hash_pool('login', workers, settings.PASSWORD_VERIFY_POOL)
+    with _pool_lock:
+        if _login_slots is None or _login_slots[0] is not executor:
+            _login_slots = (executor, threading.BoundedSemaphore(workers))
+        return _login_slots
+
+
+def shutdown_pool():
+    shutdown_hash_pool('login')
+
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    if setting.startswith('PASSWORD_VERIFY_'):
+        shutdown_pool()
+
+
+def run_hashing(func, *args):
+    """Call ``func(*args)`` (a module level hashing function) in the hashing pool, if one is configured."""
+    if settings.PASSWORD_VERIFY_POOL not in ('thread', 'process'):
+        return func(*args)
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=settings.PASSWORD_VERIFY_TIMEOUT):
+        raise HashingBusy()
+    try:
+        return executor.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def measure(hasher, rounds=3):
+    """Median seconds ``hasher`` takes to hash a password."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.encode("correct horse battery staple", hasher.salt())
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+
+def tune(algorithm, target):
+    """
+    Return ``(settings, seconds)``: the cost settings for ``algorithm`` whose hash takes closest
+    to, without exceeding, ``target`` seconds on this machine, and the measured time. Costs are
+    never lowered below 100,000 PBKDF2 iterations, an scrypt work factor of 2**12 or one argon2 pass.
+    """
+    if algorithm == 'pbkdf2':
+        hasher = hashers.PBKDF2PasswordHasher()
+        hasher.iterations = 100_000
+        # PBKDF2 is linear in the iterations
+        hasher.iterations = max(100_000, int(hasher.iterations * target / measure(hasher)) // 10_000 * 10_000)
+        seconds = measure(hasher)
+        return {'PASSWORD_PBKDF2_ITERATIONS': hasher.iterations}, seconds
+
+    if algorithm == 'scrypt':
+        hasher = hashers.ScryptPasswordHasher()
+        hasher.block_size = settings.PASSWORD_SCRYPT_BLOCK_SIZE
+        work_factor, hasher.work_factor = 2 ** 12, 2 ** 12
+        seconds = measure(hasher)
+        # The work factor must be a power of two; memory use grows with it (128 x N x r bytes)
+        while work_factor < 2 ** 20:
+            hasher.work_factor = work_factor * 2
+            doubled = measure(hasher)
+            if doubled > target:
+                break
+            work_factor, seconds = hasher.work_factor, doubled
+        return {'PASSWORD_SCRYPT_WORK_FACTOR': work_factor, 'PASSWORD_SCRYPT_BLOCK_SIZE': hasher.block_size}, seconds
+
+    if algorithm == 'argon2':
+        hasher = hashers.Argon2PasswordHasher()
+        hasher.memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+        time_cost, hasher.time_cost = 1, 1
+        seconds = measure(hasher)
+        while time_cost < 50:
+            hasher.time_cost = time_cost + 1
+            longer = measure(hasher)
+            if longer > target:
+                break
+            time_cost, seconds = hasher.time_cost, longer
+        return {'PASSWORD_ARGON2_TIME_COST': time_cost, 'PASSWORD_ARGON2_MEMORY_COST': hasher.memory_cost}, seconds
+
+    raise ValueError(f"Unknown password hasher '{algorithm}', "
+                     f"expected one of: {', '.join(settings.PASSWORD_HASHER_CLASSES)}.")
@@ -0,0 +1,50 @@
+"""
+Row files read and written by the batch commands and upload endpoints: CSV with a header row,
+or NDJSON (one JSON object per line). Rejected rows are written back in the input's format.
+"""
+import codecs
+import csv
+import json
+
+FILE_FORMATS = ('csv', 'ndjson')
+FILE_EXTENSIONS = {'csv': 'csv', 'ndjson': 'ndjson', 'jsonl': 'ndjson'}
+
+
+def format_for_name(name):
+    """Infer the file format from a file name's extension, or return ``None``."""
+    return FILE_EXTENSIONS.get(str(name).rsplit('.', 1)[-1].lower())
+
+
+def read_rows(lines, file_format):
+    """Yield ``(line_number, row)`` pairs from text lines; unparsable lines yield ``None`` rows."""
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def read_file(binary_file, file_format):
+    """Read rows from a binary file object (an upload or a file opened with ``'rb'``)."""
+    return read_rows(codecs.iterdecode(binary_file, 'utf-8-sig'), file_format)
+
+
+def write_rows(rows, text_file, file_format, fields):
+    """Write dict rows; in CSV, nested values (e.g. validation errors) are JSON encoded."""
+    if file_format == 'csv':
+        writer = csv.DictWriter(text_file, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({name: json.dumps(value) if isinstance(value, (dict, list)) else value
+                             for name, value in row.items()})
+        return
+    for row in rows:
+        text_file.write(json.dumps({name: row.get(name) for name in fields}, default=str) + "\n")
@@ -0,0 +1,161 @@
+"""
+Ownership ledger: per-property allocated percentage and per-(user, property) shares.
+
+The ledger mirrors ``SUM(Transaction.percentage)``, ``MIN/MAX(Transaction.price)`` and the
+per-property transaction count and price total, so that validation and analytics read a fixed
+number of rows instead of aggregating every transaction of a property. It is kept in sync by
+the signal handlers in ``realestate.signals``; writes that bypass signals (``QuerySet.update``,
+``bulk_create``) must call ``apply_ownership_delta``, ``apply_transaction_stats`` and
+``extend_price_bounds``/``refresh_price_bounds`` themselves; ``realestate.deletion`` applies the
+same changes in aggregate when many transactions are deleted at once.
+``manage.py rebuild_ownership_ledger`` recomputes it from the raw transactions.
+"""
+from decimal import Decimal
+from django.db.models import Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from .analytics import record_district_delta, record_portfolio_delta
+from .models import OwnershipShare, Property, PropertyAllocation, Transaction
+
+
+def apply_ownership_delta(property_id, user_id, delta):
+    """Add ``delta`` percent to a property's allocated total and to the user's share."""
+    if not delta:
+        return
+    updated = PropertyAllocation.objects.filter(property_id=property_id).update(
+        total_percentage=F('total_percentage') + delta, version=F('version') + 1
+    )
+    # Negative deltas come from deletes, where the property may already be gone (cascade)
+    if not updated and delta > 0:
+        PropertyAllocation.objects.create(property_id=property_id, total_percentage=delta)
+
+    shares = OwnershipShare.objects.filter(property_id=property_id, user_id=user_id)
+    if shares.update(percentage=F('percentage') + delta):
+        owned_properties = -shares.filter(percentage__lte=0).delete()[0] if delta < 0 else 0
+    elif delta > 0:
+        OwnershipShare.objects.create(property_id=property_id, user_id=user_id, percentage=delta)
+        owned_properties = 1
+    else:  # the share went away with its property or user (cascade)
+        return
+    record_portfolio_delta(user_id, property_id, delta, owned_properties)
+
+
+def apply_transaction_stats(property_id, count_delta, price_delta):
+    """Add to a property's transaction count and price total (and, after commit, to its district's)."""
+    updated = PropertyAllocation.objects.filter(property_id=property_id).update(
+        transaction_count=F('transaction_count') + count_delta, price_total=F('price_total') + price_delta
+    )
+    # No allocation row: the property is being deleted and record_property_removal took its totals out
+    if updated:
+        district = Property.objects.filter(pk=property_id).values_list('district', flat=True).first()
+        record_district_delta(district, transactions=count_delta, volume=price_delta)
+
+
+def extend_price_bounds(property_id, low, high=None):
+    """Widen a property's transaction price band to include ``low``..``high`` (new transactions)."""
+    high = low if high is None else high
+    PropertyAllocation.objects.filter(property_id=property_id).update(
+        min_price=Least(Coalesce('min_price', Value(low)), Value(low)),
+        max_price=Greatest(Coalesce('max_price', Value(high)), Value(high)),
+    )
+
+
+def refresh_price_bounds(*property_ids):
+    """Recompute the price band after a price was changed or removed; MIN/MAX are index lookups."""
+    for property_id in property_ids:
+        bounds = Transaction.objects.filter(property_id=property_id).aggregate(low=Min('price'), high=Max('price'))
+        PropertyAllocation.objects.filter(property_id=property_id).update(
+            min_price=bounds['low'], max_price=bounds['high']
+        )
+
+
+def price_band_allows(value, min_price, max_price):
+    """Whether every transaction price in ``[min_price, max_price]`` lies within 50%-150% of ``value``."""
+    return min_price is None or (min_price >= Decimal('0.5') * value and max_price <= Decimal('1.5') * value)
+
+
+def get_ownership_totals(property_id, user_id):
+    """Return ``(allocated_total, user_total)`` for a property from the ledger."""
+    total = (PropertyAllocation.objects.filter(property_id=property_id)
+             .values_list('total_percentage', flat=True).first())
+    user_total = (OwnershipShare.objects.filter(property_id=property_id, user_id=user_id)
+                  .values_list('percentage', flat=True).first())
+    return total or Decimal('0'), user_total or Decimal('0')
+
+
+ALLOCATION_FIELDS = ('total_percentage', 'min_price', 'max_price', 'transaction_count', 'price_total')
+
+
+def compute_ledger():
+    """Compute the expected ledger from the raw transactions.
+
+    Returns ``(allocations, shares)`` where ``allocations`` maps property id to a dict of the
+    ``ALLOCATION_FIELDS`` values and ``shares`` maps ``(user_id, property_id)`` to percentage.
+    """
+    allocations = {
+        pk: {'total_percentage': Decimal('0'), 'min_price': None, 'max_price': None,
+             'transaction_count': 0, 'price_total': Decimal('0')}
+        for pk in Property.objects.values_list('id', flat=True)
+    }
+    shares = {}
+    rows = Transaction.objects.values('user_id', 'property_id').annotate(
+        total=Sum('percentage'), low=Min('price'), high=Max('price'), count=Count('id'), price_total=Sum('price')
+    ).order_by()
+    for row in rows:
+        allocation = allocations[row['property_id']]
+        allocation['total_percentage'] += row['total']
+        allocation['transaction_count'] += row['count']
+        allocation['price_total'] += row['price_total']
+        low, high = allocation['min_price'], allocation['max_price']
+        allocation['min_price'] = row['low'] if low is None else min(low, row['low'])
+        allocation['max_price'] = row['high'] if high is None else max(high, row['high'])
+        shares[(row['user_id'], row['property_id'])] = row['total']
+    return allocations, shares
+
+
+def check_ledger():
+    """Return a list of human readable mismatches between the ledger and the transactions."""
+    expected_allocations, expected_shares = compute_ledger()
+    stored_allocations = {
+        values[0]: dict(zip(ALLOCATION_FIELDS, values[1:]))
+        for values in PropertyAllocation.objects.values_list('property_id', *ALLOCATION_FIELDS)
+    }
+    stored_shares = {
+        (user_id, property_id): percentage
+        for user_id, property_id, percentage in OwnershipShare.objects.values_list('user_id', 'property_id', 'percentage')
+        if percentage
+    }
+
+    mismatches = []
+    for property_id, expected in expected_allocations.items():
+        stored = stored_allocations.get(property_id)
+        if stored is None:
+            mismatches.append(f"Property {property_id}: no allocation row")
+            continue
+        for field in ALLOCATION_FIELDS:
+            if stored[field] != expected[field]:
+                mismatches.append(f"Property {property_id}: {field} is {stored[field]}, transactions give {expected[field]}")
+    for key in expected_shares.keys() | stored_shares.keys():
+        stored, expected = stored_shares.get(key, Decimal('0')), expected_shares.get(key, Decimal('0'))
+        if stored != expected:
+            mismatches.append(f"User {key[0]} on property {key[1]}: share {stored}%, transactions sum to {expected}%")
+    return mismatches
+
+
+def rebuild_ledger():
+    """Replace the ledger with values recomputed from the raw transactions. Call inside a transaction."""
+    # Take the same property locks as the API write paths so no transaction is written mid-rebuild
+    list(Property.objects.select_for_update().order_by('id').values_list('id', flat=True))
+    allocations, shares = compute_ledger()
+    # Keep the versions moving forward so in-flight optimistic writes cannot claim a reset value
+    versions = dict(PropertyAllocation.objects.values_list('property_id', 'version'))
+    PropertyAllocation.objects.all().delete()
+    OwnershipShare.objects.all().delete()
+    PropertyAllocation.objects.bulk_create(
+        PropertyAllocation(property_id=property_id, version=versions.get(property_id, 0) + 1, **values)
+        for property_id, values in allocations.items()
+    )
+    OwnershipShare.objects.bulk_create(
+        OwnershipShare(user_id=user_id, property_id=property_id, percentage=percentage)
+        for (user_id, property_id), percentage in shares.items()
+    )
+    return len(allocations), len(shares)
@@ -0,0 +1,165 @@
+"""
+Structured, asynchronous logging.
+
+``QueuedHandler`` puts records on a queue on the calling thread; a listener thread formats and
+writes them, so a log call inside a locked section costs an enqueue and no I/O. Messages take
+%-style arguments, rendered by the listener (pass values, not objects that change after the
+call), and structured fields are passed as ``extra``. ``JSONFormatter`` writes one JSON object
+per record with those fields and the id of the request that logged it.
+
+``RequestLogMiddleware`` gives each request an id (``X-Request-ID``, taken from the request or
+generated) and decides whether its DEBUG records are kept: ``LOG_DEBUG_SAMPLE_RATE`` of the
+requests log at DEBUG, ``RequestContextFilter`` drops the DEBUG records of the others before
+they are queued. Records logged outside a request (management commands) are always kept.
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# (request id, whether the request's DEBUG records are kept)
+_context = contextvars.ContextVar('realestate_log_context', default=None)
+
+# Attributes every LogRecord has; any other attribute came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'taskName'}
+_REQUEST_ID = re.compile(r'^[\w.:-]{1,64}$')
+
+
+@contextmanager
+def log_context(request_id=None, sample_rate=1.0):
+    """Log the enclosed code as one request: records carry ``request_id``, DEBUG is kept with ``sample_rate``."""
+    token = _context.set((request_id or uuid.uuid4().hex, random.random() < sample_rate))
+    try:
+        yield _context.get()[0]
+    finally:
+        _context.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id and drops the DEBUG records of unsampled requests."""
+
+    def filter(self, record):
+        context = _context.get()
+        if context is None:
+            return True
+        record.request_id, debug_sampled = context
+        return debug_sampled or record.levelno > logging.DEBUG
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry["request_id"] = record.request_id
+        entry.update((name, value) for name, value in vars(record).items() if name not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class QueuedHandler(QueueHandler):
+    """
+    Hands records to a listener thread that formats and writes them to ``stream`` (stderr by default).
+
+    The formatter configured for this handler is used by the listener. The queue holds up to
+    ``queue_size`` records; when the listener cannot keep up, further records are dropped (and
+    counted in ``dropped``) rather than blocking requests. The listener starts on the first
+    record of each process, so a handler inherited through a fork gets its own.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Left unformatted for the listener; only a traceback is rendered now, while it is intact
+        if record.exc_info:
+            formatter = self.target.formatter or logging.Formatter()
+            record.exc_text = record.exc_text or formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._listener_pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_listener(self):
+        with self._listener_lock:
+            if self._listener_pid != os.getpid():
+                self._listener = QueueListener(self.queue, self.target)
+                self._listener.start()
+                self._listener_pid = os.getpid()
+
+    def flush(self):
+        """Wait until the queued records are written."""
+        if self._listener_pid == os.getpid():
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                self._listener.stop()
+            self._listener = self._listener_pid = None
+        self.target.close()
+        super().close()
+
+
+class RequestLogMiddleware:
+    """Runs each request in its own log context (see ``log_context``) and returns its id in ``X-Request-ID``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _request_id(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        return request_id if _REQUEST_ID.match(request_id) else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with log_context(self._request_id(request), settings.LOG_DEBUG_SAMPLE_RATE) as request_id:
+            response = self.get_response(request)
+        response['X-Request-ID'] = request_id
+        return response
+
+    async def __acall__(self, request):
+        with log_context(self._request_id(request), settings.LOG_DEBUG_SAMPLE_RATE) as request_id:
+            response = await self.get_response(request)
+        response['X-Request-ID'] = request_id
+        return response
@@ -0,0 +1,70 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from ...bulkload import BULK_LOAD_CHUNK_SIZE, BulkLoadError, build_instances, import_rows
+from ...imports import FILE_FORMATS, format_for_name, read_file
+from ...models import Property, Transaction, User
+
+SOURCES = (('users', User), ('properties', Property), ('transactions', Transaction))
+
+
+class Command(BaseCommand):
+    help = ("Load users, properties and transactions (with their ids) from CSV or NDJSON extracts, then check the "
+            "ownership rules and rebuild the ledger and summaries. Everything is rolled back on an error.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help="id, username, password (hash), email, first_name, last_name, is_staff, "
+                                            "is_active, is_superuser, date_joined")
+        parser.add_argument('--properties', help="id, title, district, estimated_value, user_id")
+        parser.add_argument('--transactions', help="id, user_id, property_id, percentage, price, transaction_date")
+        parser.add_argument('--format', choices=FILE_FORMATS, help="Defaults to each file's extension.")
+        parser.add_argument('--chunk-size', type=int, default=BULK_LOAD_CHUNK_SIZE)
+        parser.add_argument('--keep-indexes', action='store_true',
+                            help="Maintain the indexes during the load instead of rebuilding them afterwards.")
+
+    def handle(self, *args, **options):
+        paths = {model: Path(options[name]) for name, model in SOURCES if options[name]}
+        if not paths:
+            raise CommandError("Pass at least one of --users, --properties and --transactions.")
+        formats = {}
+        for model, path in paths.items():
+            formats[model] = options['format'] or format_for_name(path.name)
+            if formats[model] is None:
+                raise CommandError(f"Cannot infer the format of {path.name}, pass --format.")
+            if not path.is_file():
+                raise CommandError(f"{path} does not exist.")
+
+        start = time.perf_counter()
+        # A table's rate is measured from the end of the previous table's last chunk
+        table = {'model': None, 'start': start, 'last': start}
+
+        def progress(model, rows):
+            now = time.perf_counter()
+            if model is not table['model']:
+                table.update(model=model, start=table['last'])
+            table['last'] = now
+            elapsed = now - table['start']
+            self.stdout.write(f"{model._meta.db_table}: {rows:,} rows ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+        files = {model: path.open('rb') for model, path in paths.items()}
+        try:
+            sources = {model: build_instances(model, read_file(source, formats[model]), paths[model].name)
+                       for model, source in files.items()}
+            counts = import_rows(sources, chunk_size=options['chunk_size'], defer_indexes=not options['keep_indexes'],
+                                 progress=progress if options['verbosity'] else None)
+        except BulkLoadError as error:
+            raise CommandError(f"Import rolled back: {error}")
+        except DatabaseError as error:
+            raise CommandError(f"Import rolled back: {error}".strip())
+        finally:
+            for source in files.values():
+                source.close()
+        elapsed = time.perf_counter() - start
+
+        rows = sum(counts.values())
+        loaded = ", ".join(f"{counts[model]:,} {name}" for name, model in SOURCES if model in counts)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {loaded} in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s); "
+            f"ownership ledger and summaries rebuilt."
+        ))
@@ -0,0 +1,42 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from ...imports import FILE_FORMATS, format_for_name, read_file
+from ...provisioning import PROVISIONING_CHUNK_SIZE, provision_users, write_rejects
+
+
+class Command(BaseCommand):
+    help = ("Create users from a CSV or NDJSON file of (username, password, email, first_name, last_name) rows "
+            "and write the rejected rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with a header row) or NDJSON file.")
+        parser.add_argument('--format', choices=FILE_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--rejects', help="Where to write rejected rows (default: <path>.rejects.<format>).")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: PASSWORD_HASH_WORKERS).")
+        parser.add_argument('--chunk-size', type=int, default=PROVISIONING_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or format_for_name(path.name)
+        if file_format is None:
+            raise CommandError("Cannot infer the format from the file name, pass --format.")
+        if not path.is_file():
+            raise CommandError(f"{path} does not exist.")
+
+        start = time.perf_counter()
+        with path.open('rb') as source:
+            created, rejects = provision_users(read_file(source, file_format), workers=options['workers'],
+                                               chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - start
+
+        if rejects:
+            rejects_path = Path(options['rejects'] or f"{path}.rejects.{file_format}")
+            with rejects_path.open('w', newline='') as target:
+                write_rejects(rejects, target, file_format)
+            self.stderr.write(f"{len(rejects)} rows rejected, see {rejects_path}")
+        rows = len(created) + len(rejects)
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} users ({len(rejects)} rejected) in {elapsed:.2f}s "
+            f"({rows / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
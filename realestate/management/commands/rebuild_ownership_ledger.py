@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from ...analytics import check_summaries, rebuild_summaries
+from ...ledger import check_ledger, rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ownership ledger and analytics summaries from the raw transactions, or check them with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only compare the ledger with the transactions and fail if they differ.",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = check_ledger() + check_summaries()
+            for mismatch in mismatches:
+                self.stderr.write(mismatch)
+            if mismatches:
+                raise CommandError(f"Ownership ledger is out of sync ({len(mismatches)} mismatches).")
+            self.stdout.write(self.style.SUCCESS("Ownership ledger is in sync."))
+            return
+
+        with transaction.atomic():
+            allocations, shares = rebuild_ledger()
+            districts, portfolios = rebuild_summaries()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt ownership ledger: {allocations} properties, {shares} ownership shares; "
+            f"analytics summaries: {districts} districts, {portfolios} portfolios."
+        ))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ...hashers import tune
+
+
+class Command(BaseCommand):
+    help = "Measure password hashing on this machine and suggest cost settings that fit a latency budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=100, help="Time one hash may take (default: 100).")
+        parser.add_argument('--algorithm', choices=list(settings.PASSWORD_HASHER_CLASSES),
+                            help="Defaults to PASSWORD_HASHER.")
+
+    def handle(self, *args, **options):
+        algorithm = options['algorithm'] or settings.PASSWORD_HASHER
+        suggested, seconds = tune(algorithm, options['target_ms'] / 1000)
+        self.stdout.write(f"# {algorithm}: {seconds * 1000:.1f} ms per hash (target {options['target_ms']:.0f} ms)")
+        self.stdout.write(f"PASSWORD_HASHER={algorithm}")
+        for name, value in suggested.items():
+            self.stdout.write(f"{name}={value}")
+        if seconds * 1000 > options['target_ms']:
+            self.stderr.write("The lowest cost this command suggests already exceeds the target on this machine.")
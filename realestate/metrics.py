@@ -0,0 +1,231 @@
+"""
+Per-request performance instrumentation.
+
+``RequestMetricsMiddleware`` measures each request: its duration, the number of queries and
+the time spent in them (``record_query``, installed on every database connection by
+``realestate.signals``), the time spent waiting for row locks (code taking a lock wraps it in
+``timed('lock')``) and the time spent producing the response body (``serialize``: the serializer
+or ``RowEncoder`` building the data, wrapped in ``timed('serialize')`` by the views, and its
+rendering). The figures are returned in the ``Server-Timing`` header and observed in per-route
+histograms, labeled with the viewset and its action (``view="transaction", action="create"``).
+
+``metrics_view`` serves the histograms in the Prometheus text format. They live in the memory
+of the server process: with several workers, each scrape reads the worker that answers it, so
+run the metrics of a multi-worker deployment off one worker or aggregate by instance.
+"""
+import bisect
+import contextvars
+import hmac
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+_timings = contextvars.ContextVar('realestate_request_timings', default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestTimings:
+    __slots__ = ('queries', 'db', 'lock', 'serialize', 'locked')
+
+    def __init__(self):
+        self.queries, self.db, self.lock, self.serialize, self.locked = 0, 0.0, 0.0, 0.0, False
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper: counts and times the queries of the current request."""
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - start
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the enclosed code to the current request's ``phase`` (``lock`` or ``serialize``)."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, phase, getattr(timings, phase) + time.perf_counter() - start)
+        if phase == 'lock':
+            timings.locked = True
+
+
+class Histogram:
+    """A Prometheus histogram with labels; ``observe`` is thread safe."""
+
+    def __init__(self, name, documentation, buckets, labels=('view', 'action')):
+        self.name, self.documentation, self.buckets, self.labels = name, documentation, buckets, labels
+        # label values -> [count per bucket (the last one is +Inf), sum]
+        self._series = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series[label_values]
+            series[0][index] += 1
+            series[1] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, list(counts), total) for values, (counts, total) in sorted(self._series.items())]
+        for values, counts, total in series:
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, values))
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labels):
+        self.name, self.documentation, self.labels = name, documentation, labels
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._values[label_values] += 1
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+REQUESTS = Counter("realestate_requests_total", "Requests served.", ('view', 'action', 'status'))
+DURATION = Histogram("realestate_request_duration_seconds", "Time to serve a request.", DURATION_BUCKETS)
+QUERIES = Histogram("realestate_request_queries", "Database queries per request.", QUERY_BUCKETS)
+DB_TIME = Histogram("realestate_request_db_seconds", "Time per request spent in database queries.", DURATION_BUCKETS)
+LOCK_WAIT = Histogram("realestate_request_lock_wait_seconds",
+                      "Time spent acquiring row locks, for the requests that take one.", DURATION_BUCKETS)
+SERIALIZE = Histogram("realestate_request_serialize_seconds", "Time per request spent serializing and rendering the response body.",
+                      DURATION_BUCKETS)
+METRICS = (REQUESTS, DURATION, QUERIES, DB_TIME, LOCK_WAIT, SERIALIZE)
+
+
+def route_labels(request):
+    """``(view, action)`` of the view that served ``request``: the viewset basename and action, else the view name."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return "unmatched", request.method.lower()
+    view = getattr(match.func, 'cls', match.func)
+    actions = getattr(match.func, 'actions', None) or {}
+    basename = getattr(match.func, 'initkwargs', {}).get('basename')
+    return basename or view.__name__, actions.get(request.method.lower(), request.method.lower())
+
+
+def observe(request, response, timings, duration):
+    labels = route_labels(request)
+    REQUESTS.inc(*labels, str(response.status_code))
+    DURATION.observe(duration, *labels)
+    QUERIES.observe(timings.queries, *labels)
+    DB_TIME.observe(timings.db, *labels)
+    SERIALIZE.observe(timings.serialize, *labels)
+    if timings.locked:
+        LOCK_WAIT.observe(timings.lock, *labels)
+
+
+def server_timing(timings, duration):
+    return (f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries", '
+            f'lock;dur={timings.lock * 1000:.1f}, serialize;dur={timings.serialize * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}')
+
+
+class RequestMetricsMiddleware:
+    """Measures each request (see the module docstring); ``METRICS_ENABLED=False`` removes it."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_template_response = self._aprocess_template_response
+
+    def process_template_response(self, request, response):
+        timings = _timings.get()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.serialize += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    async def _aprocess_template_response(self, request, response):
+        return self.process_template_response(request, response)
+
+    def _finish(self, request, response, timings, start):
+        duration = time.perf_counter() - start
+        observe(request, response, timings, duration)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(timings, duration)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, start = RequestTimings(), time.perf_counter()
+        token = _timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self._finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        timings, start = RequestTimings(), time.perf_counter()
+        token = _timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self._finish(request, response, timings, start)
+
+
+def metrics_view(request):
+    """The metrics in the Prometheus text format, for ``Authorization: Bearer <METRICS_TOKEN>``."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode()):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    lines = [line for metric in METRICS for line in metric.expose()]
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8")
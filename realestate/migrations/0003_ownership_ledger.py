@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_ledger(apps, schema_editor):
+    Property = apps.get_model('realestate', 'Property')
+    Transaction = apps.get_model('realestate', 'Transaction')
+    PropertyAllocation = apps.get_model('realestate', 'PropertyAllocation')
+    OwnershipShare = apps.get_model('realestate', 'OwnershipShare')
+
+    totals = {pk: 0 for pk in Property.objects.values_list('id', flat=True)}
+    shares = []
+    for row in Transaction.objects.values('user_id', 'property_id').annotate(total=Sum('percentage')).order_by():
+        totals[row['property_id']] += row['total']
+        shares.append(OwnershipShare(user_id=row['user_id'], property_id=row['property_id'], percentage=row['total']))
+
+    PropertyAllocation.objects.bulk_create(
+        PropertyAllocation(property_id=pk, total_percentage=total) for pk, total in totals.items()
+    )
+    OwnershipShare.objects.bulk_create(shares)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0002_create_default_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyAllocation',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='allocation', serialize=False, to='realestate.property')),
+                ('total_percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OwnershipShare',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('percentage', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ownership_shares', to='realestate.property')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ownership_shares', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'property')},
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0003_ownership_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='property',
+            name='district',
+            field=models.CharField(choices=[('Famagusta', 'Famagusta'), ('Kyrenia', 'Kyrenia'), ('Larnaca', 'Larnaca'), ('Limassol', 'Limassol'), ('Nicosia', 'Nicosia'), ('Paphos', 'Paphos')], db_index=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['property', 'price', 'transaction_date'], name='tx_property_price_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['price', 'transaction_date'], name='tx_price_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['transaction_date'], name='tx_date_idx'),
+        ),
+    ]
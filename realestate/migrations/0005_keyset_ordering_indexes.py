@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0004_transaction_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='tx_property_price_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='tx_price_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['property', 'price', 'transaction_date', 'id'], name='tx_property_price_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['price', 'transaction_date', 'id'], name='tx_price_date_id_idx'),
+        ),
+    ]
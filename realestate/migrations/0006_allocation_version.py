@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0005_keyset_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyallocation',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
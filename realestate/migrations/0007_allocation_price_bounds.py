@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:14
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def backfill_price_bounds(apps, schema_editor):
+    Transaction = apps.get_model('realestate', 'Transaction')
+    PropertyAllocation = apps.get_model('realestate', 'PropertyAllocation')
+    rows = Transaction.objects.values('property_id').annotate(low=Min('price'), high=Max('price')).order_by()
+    for row in rows.iterator():
+        PropertyAllocation.objects.filter(property_id=row['property_id']).update(min_price=row['low'], max_price=row['high'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0006_allocation_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyallocation',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True),
+        ),
+        migrations.AddField(
+            model_name='propertyallocation',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True),
+        ),
+        migrations.RunPython(backfill_price_bounds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import defaultdict
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_summaries(apps, schema_editor):
+    Property = apps.get_model('realestate', 'Property')
+    Transaction = apps.get_model('realestate', 'Transaction')
+    PropertyAllocation = apps.get_model('realestate', 'PropertyAllocation')
+    DistrictSummary = apps.get_model('realestate', 'DistrictSummary')
+    PortfolioSummary = apps.get_model('realestate', 'PortfolioSummary')
+
+    for row in Transaction.objects.values('property_id').annotate(count=Count('id'), total=Sum('price')).order_by():
+        PropertyAllocation.objects.filter(property_id=row['property_id']).update(
+            transaction_count=row['count'], price_total=row['total']
+        )
+
+    districts = {district: DistrictSummary(district=district) for district, _ in Property._meta.get_field('district').choices}
+    for row in Property.objects.values('district').annotate(count=Count('id')).order_by():
+        districts.setdefault(row['district'], DistrictSummary(district=row['district'])).property_count = row['count']
+    for row in Transaction.objects.values('property__district').annotate(count=Count('id'), volume=Sum('price')).order_by():
+        summary = districts.setdefault(row['property__district'], DistrictSummary(district=row['property__district']))
+        summary.transaction_count, summary.volume = row['count'], row['volume']
+    DistrictSummary.objects.bulk_create(districts.values())
+
+    portfolios = defaultdict(lambda: {'property_count': 0, 'value': Decimal('0')})
+    rows = Transaction.objects.values('user_id', 'property_id', 'property__estimated_value').annotate(
+        total=Sum('percentage')
+    ).order_by()
+    for row in rows:
+        if row['total']:
+            portfolios[row['user_id']]['property_count'] += 1
+            portfolios[row['user_id']]['value'] += row['total'] * row['property__estimated_value'] / 100
+    PortfolioSummary.objects.bulk_create(PortfolioSummary(user_id=user_id, **values) for user_id, values in portfolios.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0007_allocation_price_bounds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistrictSummary',
+            fields=[
+                ('district', models.CharField(choices=[('Famagusta', 'Famagusta'), ('Kyrenia', 'Kyrenia'), ('Larnaca', 'Larnaca'), ('Limassol', 'Limassol'), ('Nicosia', 'Nicosia'), ('Paphos', 'Paphos')], max_length=20, primary_key=True, serialize=False)),
+                ('property_count', models.PositiveIntegerField(default=0)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='portfolio', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('property_count', models.PositiveIntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=6, default=0, max_digits=30)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='propertyallocation',
+            name='price_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=24),
+        ),
+        migrations.AddField(
+            model_name='propertyallocation',
+            name='transaction_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
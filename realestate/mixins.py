@@ -1,6 +1,28 @@
+import hashlib
+import inspect
 import logging
+from functools import update_wrapper
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from .cache import build_cache_key, get_cache, get_versions
+from .metrics import timed
+from .serializers.rows import encode_datetime
 logger = logging.getLogger('realestate')
 
+
+async def _resolve(value):
+    """Await ``value`` if it is awaitable: async views accept sync and async response builders."""
+    return await value if inspect.isawaitable(value) else value
+
+
 class LoggingMixin:
     """
     Logs CRUD actions and assigns request.user automatically if the model supports it.
@@ -8,21 +30,322 @@ class LoggingMixin:
     def perform_create(self, serializer):
         # Only set `user` if the serializer has that field
         if 'user' in serializer.fields:
-            instance = serializer.save(user=self.request.user)
+            # By id: request.user may be a token-backed user without a database row
+            instance = serializer.save(user_id=self.request.user.id)
         else:
             instance = serializer.save()
-
-        user_id = getattr(self.request.user, 'id', 'Anonymous')
-        logger.info(f"[CREATE] {instance.__class__.__name__} ID={instance.id} by User ID={user_id}")
+        self.log_action(logging.INFO, "CREATE", instance)
         return instance
 
     def perform_update(self, serializer):
         instance = serializer.save()
-        user_id = getattr(self.request.user, 'id', 'Anonymous')
-        logger.info(f"[UPDATE] {instance.__class__.__name__} ID={instance.id} by User ID={user_id}")
+        self.log_action(logging.INFO, "UPDATE", instance)
         return instance
 
     def perform_destroy(self, instance):
-        user_id = getattr(self.request.user, 'id', 'Anonymous')
-        logger.warning(f"[DELETE] {instance.__class__.__name__} ID={instance.id} by User ID={user_id}")
-        return super().perform_destroy(instance)
\ No newline at end of file
+        self.log_action(logging.WARNING, "DELETE", instance)
+        return super().perform_destroy(instance)
+
+    def log_action(self, level, action, instance):
+        model, user_id = type(instance).__name__, getattr(self.request.user, 'id', 'Anonymous')
+        logger.log(level, "[%s] %s ID=%s by User ID=%s", action, model, instance.pk, user_id,
+                   extra={"action": action.lower(), "model": model, "object_id": instance.pk, "user_id": user_id})
+
+
+class OwnerScopedWriteMixin:
+    """
+    Looks objects up for writes with the ownership check in SQL.
+
+    For non-staff users, update/partial_update/destroy fetch the object filtered on
+    ``owner_field = request.user.id`` and without the queryset's joins, so the write costs one
+    lookup query and no related rows; object permissions then compare ids (``is_owner``). A row
+    that exists but belongs to someone else still answers 403, at the cost of one EXISTS query
+    on that rejected path only.
+    """
+    owner_field = 'user_id'
+    owner_scoped_actions = ('update', 'partial_update', 'destroy')
+
+    def get_object(self):
+        if self.action not in self.owner_scoped_actions or self.request.user.is_staff:
+            return super().get_object()
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = get_object_or_404(queryset.filter(**{self.owner_field: self.request.user.id}), **filter_kwargs)
+        except Http404:
+            if queryset.filter(**filter_kwargs).exists():
+                logger.warning("[FORBIDDEN] %s %s %s by User ID=%s", self.action, queryset.model.__name__,
+                               filter_kwargs[self.lookup_field], self.request.user.id)
+                self.permission_denied(self.request)
+            raise
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class CachedReadMixin:
+    """
+    Serves read actions from the response cache (see realestate.cache). Views call cached_response
+    with the names of the version counters their response depends on and a callable building it.
+    """
+    cached_headers = ('ETag', 'Last-Modified')
+
+    def cached_response(self, request, version_names, build_response):
+        timeout = settings.API_CACHE_TIMEOUT
+        if not timeout:
+            return build_response()
+
+        # Read the versions before building, so a write racing with the build bumps past this key
+        key = build_cache_key(self, request, get_versions(*version_names))
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is not None:
+            return self._cache_hit_response(request, entry)
+
+        response = build_response()
+        if response.status_code == 200:
+            cache.set(key, self._cache_entry(response), timeout)
+            response["X-Cache"] = "MISS"
+        return response
+
+    async def acached_response(self, request, version_names, build_response):
+        """``cached_response`` for async views; ``build_response`` may return an awaitable."""
+        timeout = settings.API_CACHE_TIMEOUT
+        if not timeout:
+            return await _resolve(build_response())
+
+        key = build_cache_key(self, request, await sync_to_async(get_versions)(*version_names))
+        cache = get_cache()
+        entry = await cache.aget(key)
+        if entry is not None:
+            return self._cache_hit_response(request, entry)
+
+        response = await _resolve(build_response())
+        if response.status_code == 200:
+            await cache.aset(key, self._cache_entry(response), timeout)
+            response["X-Cache"] = "MISS"
+        return response
+
+    def _cache_entry(self, response):
+        headers = {name: response[name] for name in self.cached_headers if response.has_header(name)}
+        return {'data': response.data, 'headers': headers}
+
+    @staticmethod
+    def _cache_hit_response(request, entry):
+        headers = dict(entry['headers'])
+        # Conditional requests are answered from the cached validators without touching the database
+        if 'ETag' in headers:
+            last_modified = parse_http_date_safe(headers.get('Last-Modified', ''))
+            not_modified = get_conditional_response(request, etag=headers['ETag'], last_modified=last_modified)
+            if not_modified is not None:
+                for name, value in headers.items():
+                    not_modified[name] = value
+                return not_modified
+        return Response(entry['data'], headers={**headers, "X-Cache": "HIT"})
+
+
+class ConditionalRequestMixin:
+    """
+    Strong ETag / Last-Modified support driven by TimestampedModel.updated_at.
+
+    Detail validators come from the row's own updated_at. Paginated list validators come from
+    the count, ids and MAX(updated_at) of the rows fetched for the page (so no extra full-table
+    aggregate is needed), unpaginated lists use one MAX(updated_at)/COUNT(*) aggregate. Matching If-None-Match /
+    If-Modified-Since requests get a 304 before anything is serialized, and If-Match /
+    If-Unmodified-Since on PUT/PATCH are checked against the locked row (412 on mismatch).
+    """
+    def _make_etag(self, *parts):
+        # The negotiated format is part of the representation, so it is part of a strong ETag
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        raw = ":".join(str(part) for part in (*parts, getattr(renderer, 'format', '')))
+        return quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+    def get_object_validators(self, pk, updated_at):
+        model = self.get_queryset().model
+        etag = self._make_etag(model._meta.label, pk, encode_datetime(updated_at))
+        return etag, int(updated_at.timestamp())
+
+    def get_page_validators(self, page):
+        """Validators of one page of a paginated list, from the rows already fetched for it."""
+        ids, last_modified = [], None
+        for row in page:
+            pk, updated_at = (row['id'], row['updated_at']) if isinstance(row, dict) else (row.pk, row.updated_at)
+            ids.append(pk)
+            last_modified = updated_at if last_modified is None else max(last_modified, updated_at)
+        params = sorted(self.request.query_params.lists())
+        etag = self._make_etag(self.get_queryset().model._meta.label, len(ids),
+                               last_modified.isoformat() if last_modified else '', ids,
+                               self.paginator.get_next_link(), self.paginator.get_previous_link(), params)
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def get_list_validators(self, queryset):
+        return self._list_validators(queryset, queryset.order_by().aggregate(
+            last_modified=Max('updated_at'), count=Count('pk')))
+
+    async def aget_list_validators(self, queryset):
+        return self._list_validators(queryset, await queryset.order_by().aaggregate(
+            last_modified=Max('updated_at'), count=Count('pk')))
+
+    def _list_validators(self, queryset, stats):
+        last_modified = stats['last_modified']
+        params = sorted(self.request.query_params.lists())
+        etag = self._make_etag(queryset.model._meta.label, stats['count'],
+                               last_modified.isoformat() if last_modified else '', params)
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def conditional_response(self, request, validators, build_response):
+        response = get_conditional_response(request, etag=validators[0], last_modified=validators[1])
+        if response is None:
+            response = build_response()
+            if response.status_code != 200:
+                return response
+        return self._set_validators(response, validators)
+
+    async def aconditional_response(self, request, validators, build_response):
+        """``conditional_response`` for async views; ``build_response`` may return an awaitable."""
+        response = get_conditional_response(request, etag=validators[0], last_modified=validators[1])
+        if response is None:
+            response = await _resolve(build_response())
+            if response.status_code != 200:
+                return response
+        return self._set_validators(response, validators)
+
+    @staticmethod
+    def _set_validators(response, validators):
+        etag, last_modified = validators
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def _validators_row(self):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.get_queryset().filter(pk=lookup).values_list('pk', 'updated_at')
+
+    def conditional_retrieve(self, request, build_response):
+        """Answer a detail read, short-circuiting on the row's updated_at."""
+        row = self._validators_row().first()
+        if row is None:
+            return build_response()  # let the regular path raise the 404
+        return self.conditional_response(request, self.get_object_validators(*row), build_response)
+
+    async def aconditional_retrieve(self, request, build_response):
+        row = await self._validators_row().afirst()
+        if row is None:
+            return await _resolve(build_response())
+        return await self.aconditional_response(request, self.get_object_validators(*row), build_response)
+
+    @staticmethod
+    def has_write_preconditions(request):
+        return 'HTTP_IF_MATCH' in request.META or 'HTTP_IF_UNMODIFIED_SINCE' in request.META
+
+    def check_write_preconditions(self, request, instance):
+        """Return a 412 response if If-Match / If-Unmodified-Since does not match the locked row, else None.
+
+        Must be called inside a transaction: the row stays locked until the update commits.
+        """
+        if not self.has_write_preconditions(request):
+            return None
+        updated_at = (type(instance).objects.select_for_update().filter(pk=instance.pk)
+                      .values_list('updated_at', flat=True).get())
+        etag, last_modified = self.get_object_validators(instance.pk, updated_at)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            logger.warning("[PRECONDITION FAILED] %s ID=%s by User ID=%s", type(instance).__name__, instance.pk,
+                           request.user.id)
+        return response
+
+    def set_object_validators(self, response):
+        """Expose the validators of a just-written object so clients can chain If-Match requests."""
+        if response.status_code == 200 and 'id' in response.data and 'updated_at' in response.data:
+            etag = self._make_etag(self.get_queryset().model._meta.label, response.data['id'], response.data['updated_at'])
+            response['ETag'] = etag
+        return response
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            # Without preconditions the object is left for UpdateModelMixin to fetch, once
+            if self.has_write_preconditions(request):
+                precondition = self.check_write_preconditions(request, self.get_object())
+                if precondition is not None:
+                    return precondition
+            return self.set_object_validators(super().update(request, *args, **kwargs))
+
+
+class AsyncReadMixin:
+    """
+    Serves list and retrieve as async views when ``ASYNC_READ_VIEWS`` is on (the ASGI entry point,
+    ``config.asgi``, turns it on).
+
+    GET and HEAD requests on those routes are dispatched to ``alist``/``aretrieve``, which read
+    with the async ORM, so a request waiting on the database or on a slow client does not hold a
+    worker thread. Authentication, permissions and throttling run in a thread, as they may query.
+    The other methods of the same URL (the locking writes) go to the regular sync view through
+    ``sync_to_async``. The defaults below mirror ListModelMixin / RetrieveModelMixin; views with
+    their own list/retrieve override the async twins too.
+    """
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_READ_VIEWS or actions.get('get') not in cls.async_actions:
+            return view
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_view(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = {'head': actions['get'], **actions}
+            for method, action in self.action_map.items():
+                setattr(self, method, getattr(self, action))
+            self.request, self.args, self.kwargs = request, args, kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Keeps the attributes DRF and Django read off the view (cls, actions, csrf_exempt, ...)
+        return update_wrapper(async_view, view)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """``APIView.dispatch`` for the async actions."""
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await getattr(self, f"a{self.action}")(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            with timed('serialize'):
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        objects = [obj async for obj in queryset]
+        with timed('serialize'):
+            return Response(self.get_serializer(objects, many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        with timed('serialize'):
+            return Response(self.get_serializer(instance).data)
@@ -25,13 +25,19 @@ class Property(TimestampedModel):
         ("Paphos", "Paphos"),
     ]
     title = models.CharField(max_length=256)
-    district = models.CharField(max_length=20, choices=DISTRICT_CHOICES)
+    district = models.CharField(max_length=20, choices=DISTRICT_CHOICES, db_index=True)
     estimated_value = models.DecimalField(max_digits=15, decimal_places=2)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="properties")
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted values the analytics summaries depend on (see realestate.analytics)
+        instance._summary_state = (instance.__dict__.get('district'), instance.__dict__.get('estimated_value'))
+        return instance
 
 
 class Transaction(TimestampedModel):
@@ -46,8 +52,74 @@ class Transaction(TimestampedModel):
 
     class Meta:
         unique_together = ("user", "property", "transaction_date")
+        # Match the TransactionFilter lookups and the default ['price', 'transaction_date', 'id'] keyset ordering
+        indexes = [
+            models.Index(fields=["property", "price", "transaction_date", "id"], name="tx_property_price_date_id_idx"),
+            models.Index(fields=["price", "transaction_date", "id"], name="tx_price_date_id_idx"),
+            models.Index(fields=["transaction_date"], name="tx_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.property} ({self.percentage}%)"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the persisted ownership state so the ledger can apply deltas on save/delete
+        instance._ledger_state = (instance.__dict__.get('user_id'), instance.__dict__.get('property_id'),
+                                  instance.__dict__.get('percentage'), instance.__dict__.get('price'),
+                                  instance.__dict__.get('transaction_date'))
+        return instance
 
+
+class PropertyAllocation(models.Model):
+    """Denormalized total percentage already sold for a property (see realestate.ledger)."""
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, primary_key=True, related_name="allocation")
+    total_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # Bumped by every ownership or valuation change; claimed by optimistic transaction writes
+    version = models.PositiveBigIntegerField(default=0)
+    # Price band of the property's transactions (NULL when there are none), checked on revaluation
+    min_price = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    transaction_count = models.PositiveIntegerField(default=0)
+    price_total = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.property} ({self.total_percentage}%)"
+
+
+class OwnershipShare(models.Model):
+    """Denormalized percentage of a property owned by a user (see realestate.ledger)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ownership_shares")
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name="ownership_shares")
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("user", "property")
+
+    def __str__(self):
+        return f"{self.user} - {self.property} ({self.percentage}%)"
+
+
+
+
+class DistrictSummary(models.Model):
+    """Per-district property and transaction totals (see realestate.analytics)."""
+    district = models.CharField(max_length=20, choices=Property.DISTRICT_CHOICES, primary_key=True)
+    property_count = models.PositiveIntegerField(default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    volume = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.district} ({self.transaction_count} transactions)"
+
+
+class PortfolioSummary(models.Model):
+    """Per-user number of properties owned and SUM(share percentage x estimated value) (see realestate.analytics)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="portfolio")
+    property_count = models.PositiveIntegerField(default=0)
+    # percentage (2 dp) x estimated value (2 dp) / 100 is exact with 6 decimal places
+    value = models.DecimalField(max_digits=30, decimal_places=6, default=0)
+
+    def __str__(self):
+        return f"{self.user} ({self.value})"
@@ -0,0 +1,138 @@
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the full ordering of the view (including ``OrderingFilter``).
+
+    Unlike DRF's ``CursorPagination``, which positions on the first ordering field and falls back
+    to OFFSET for ties, the cursor stores the values of every ordering field and the ordering is
+    always completed with ``id``. Each page is then a single ``WHERE (a, b, id) > (...) LIMIT n``
+    style query that the composite indexes can serve, so its cost does not depend on the depth.
+    No COUNT query is issued.
+
+    The cursor also records the ordering it was issued for: a cursor replayed with another
+    ``?ordering``, or whose values do not parse as the ordering fields, is rejected with a 404.
+    """
+    ordering = ('id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not {'id', 'pk'} & {field.lstrip('-') for field in ordering}:
+            # A unique tie breaker, in the direction of the last field so one index can serve the sort
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views: the page is fetched with the async ORM."""
+        queryset = self._get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([row async for row in queryset])
+
+    def _get_page_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        ordering = _reverse_ordering(self.ordering) if self._reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if self._position is not None:
+            queryset = queryset.filter(self._get_keyset_filter(ordering, self._decode_position(self._position)))
+        # Fetch one extra row to know whether another page follows
+        return queryset[:self.page_size + 1]
+
+    @property
+    def _reverse(self):
+        return bool(self.cursor and self.cursor.reverse)
+
+    @property
+    def _position(self):
+        return self.cursor.position if self.cursor else None
+
+    def _set_page(self, results):
+        reverse, position = self._reverse, self._position
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.display_page_controls = self.has_previous or self.has_next
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = (self._get_position_from_instance(self.page[-1], self.ordering) if self.page
+                    else self.cursor.position)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (self._get_position_from_instance(self.page[0], self.ordering) if self.page
+                    else self.cursor.position)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _decode_position(self, position):
+        """The ordering field values of a cursor position, parsed; a 404 if they do not fit this request."""
+        try:
+            position = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, dict) or position.get('ordering') != list(self.ordering)
+                or not isinstance(position.get('values'), list) or len(position['values']) != len(self.ordering)):
+            # Malformed, or issued for a different ordering
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [self._ordering_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(self.ordering, position['values'])]
+        except (FieldDoesNotExist, ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _ordering_field(self, name):
+        model = self.model
+        for part in name.split('__'):
+            field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+            model = field.related_model
+        return field
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(str(value))
+        return json.dumps({'ordering': list(ordering), 'values': values}, separators=(',', ':'))
+
+    @staticmethod
+    def _get_keyset_filter(ordering, values):
+        """Expand ``(f1, f2, ...) > (v1, v2, ...)`` into ORed equality prefixes, honouring each direction."""
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            prefix = {prev.lstrip('-'): value for prev, value in zip(ordering[:index], values[:index])}
+            condition |= Q(**prefix, **{f"{name}__{lookup}": values[index]})
+        return condition
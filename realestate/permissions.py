@@ -1,4 +1,13 @@
 from rest_framework import permissions
+from .models import User
+
+
+def is_owner(user, obj):
+    """Whether ``obj`` is ``user`` or belongs to them. Compares ids, so no related row is loaded
+    and token-backed users (realestate.authentication.ClaimsUser) work as well as model instances."""
+    if isinstance(obj, User):
+        return obj.pk == user.id
+    return getattr(obj, "user_id", None) == user.id
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -10,6 +19,13 @@ class IsAdminOrReadOnly(permissions.BasePermission):
             return request.user and request.user.is_authenticated
         return request.user and request.user.is_staff
 
+class IsSelfOrAdmin(permissions.BasePermission):
+    """
+    Access to a user's own record only, or to admins.
+    """
+    def has_object_permission(self, request, view, obj):
+        return request.user and (request.user.is_staff or is_owner(request.user, obj))
+
 class IsOwnerOrAdminOrReadOnly(permissions.BasePermission):
     """
     Read for everyone.
@@ -18,8 +34,4 @@ class IsOwnerOrAdminOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return request.user and (
-                request.user.is_staff or
-                obj == request.user or  # if obj is a User instance
-                getattr(obj, "user", None) == request.user  # if obj has a .user field
-        )
\ No newline at end of file
+        return request.user and (request.user.is_staff or is_owner(request.user, obj))
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Bulk user provisioning.
+
+Hashing a password (PBKDF2 by default) is deliberately expensive and dominates the cost of
+creating a user. ``provision_users`` validates a chunk of rows first, hashes the passwords of
+the valid ones in a pool of worker processes and inserts them with one ``bulk_create``.
+Usernames that already exist or repeat within the batch are rejected per row; the rest of the
+batch is still created.
+
+The pool (``realestate.hashers.get_hash_pool``) is started by the first batch big enough to
+need it and kept for the life of the process, so its workers (each running ``django.setup()``)
+start once per server process, not once per request.
+"""
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from .hashers import get_hash_pool, shutdown_hash_pool
+from .imports import write_rows
+from .models import User
+from .serializers.user import UserBulkItemSerializer
+
+PROVISIONING_CHUNK_SIZE = 1000
+# Below this many passwords, starting the worker processes costs more than it saves
+PARALLEL_HASH_MIN_BATCH = 8
+DUPLICATE_USERNAME = "A user with that username already exists."
+
+
+def hash_passwords(passwords, workers=None):
+    """``make_password`` of each password, in the process's pool of ``workers`` processes for big batches."""
+    workers = settings.PASSWORD_HASH_WORKERS if workers is None else workers
+    if workers <= 1 or len(passwords) < PARALLEL_HASH_MIN_BATCH:
+        return [make_password(password) for password in passwords]
+    pool = get_hash_pool('provisioning', workers)
+    try:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    except BrokenProcessPool:
+        # A worker died: the next batch starts a new pool
+        shutdown_hash_pool('provisioning', pool)
+        raise
+
+
+def provision_users(rows, workers=None, chunk_size=PROVISIONING_CHUNK_SIZE):
+    """
+    Create users from ``(key, row)`` pairs, where ``key`` is a row index or a file line number
+    and ``row`` a dict of UserSerializer fields (``None`` for an unparsable line).
+
+    Returns ``(created, rejects)``: ``[(key, user), ...]`` and ``[(key, row, errors), ...]``.
+    """
+    created, rejects, seen = [], [], set()
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        valid = []
+        for key, row in chunk:
+            if row is None:
+                rejects.append((key, row, {"non_field_errors": ["Line is not a JSON object."]}))
+                continue
+            serializer = UserBulkItemSerializer(data=row)
+            if not serializer.is_valid():
+                rejects.append((key, row, serializer.errors))
+                continue
+            data = dict(serializer.validated_data)
+            data['username'] = User.normalize_username(data['username'])
+            data['email'] = User.objects.normalize_email(data.get('email', ''))
+            if data['username'] in seen:
+                rejects.append((key, row, {"username": [DUPLICATE_USERNAME]}))
+                continue
+            seen.add(data['username'])
+            valid.append((key, row, data))
+
+        taken = set(User.objects.filter(username__in=[data['username'] for _, _, data in valid])
+                    .values_list('username', flat=True))
+        for key, row, data in valid:
+            if data['username'] in taken:
+                rejects.append((key, row, {"username": [DUPLICATE_USERNAME]}))
+        valid = [entry for entry in valid if entry[2]['username'] not in taken]
+
+        hashes = hash_passwords([data['password'] for _, _, data in valid], workers)
+        pending = [(key, row, User(**{**data, 'password': hashed}))
+                   for (key, row, data), hashed in zip(valid, hashes)]
+        while pending:
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user for _, _, user in pending], batch_size=chunk_size)
+                break
+            except IntegrityError:
+                # Some usernames were taken concurrently since the check: reject them and retry the rest
+                taken = set(User.objects.filter(username__in=[user.username for _, _, user in pending])
+                            .values_list('username', flat=True))
+                if not taken:
+                    raise
+                for key, row, user in pending:
+                    if user.username in taken:
+                        rejects.append((key, row, {"username": [DUPLICATE_USERNAME]}))
+                pending = [entry for entry in pending if entry[2].username not in taken]
+        created.extend((key, user) for key, _, user in pending)
+    rejects.sort(key=lambda reject: reject[0])
+    return created, rejects
+
+
+def write_rejects(rejects, text_file, file_format):
+    """Write rejects in the format of the input file, with the line number and the errors (never the password)."""
+    write_rows(({"line": line, "username": (row or {}).get("username"), "errors": errors}
+                for line, row, errors in rejects), text_file, file_format, ["line", "username", "errors"])
@@ -0,0 +1,113 @@
+"""
+Property revaluation.
+
+A new estimated value is only valid if every transaction of the property stays within
+50%-150% of it, which the ledger's per-property price band (``PropertyAllocation.min_price``
+/ ``max_price``) answers without reading the transactions.
+
+Locks are taken in the order the transaction write paths use: the property row first, with
+``FOR NO KEY UPDATE`` so that transaction inserts (whose foreign key check takes a key-share
+lock on the property) are not blocked behind it, then the allocation row. Pessimistic
+transaction writes wait on the property row, optimistic ones on the allocation row, and the
+allocation version is bumped so in-flight optimistic writes retry against the new value.
+
+``apply_revaluations`` processes files of ``(property_id, estimated_value)`` rows in chunks,
+with a fixed number of queries per chunk: lock the properties, claim their allocations, read
+their price bands, then one ``bulk_update`` of the valid rows.
+"""
+from itertools import islice
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import now
+from .analytics import record_revaluations
+from .cache import TRANSACTIONS_VERSION, invalidate_versions, property_version_name
+from .imports import write_rows
+from .ledger import price_band_allows
+from .metrics import timed
+from .models import Property, PropertyAllocation
+from .serializers.property import OUT_OF_BAND_MESSAGE, PropertyRevaluationSerializer
+
+REVALUATION_CHUNK_SIZE = 1000
+
+
+def lock_for_revaluation(property_ids):
+    """Lock properties (in id order) and their allocations.
+
+    Call inside a transaction. Returns ``{property_id: (owner_id, estimated_value, min_price,
+    max_price)}``; properties that do not exist are missing from the result.
+    """
+    with timed('lock'):
+        properties = {
+            property_id: (owner_id, estimated_value) for property_id, owner_id, estimated_value in
+            Property.objects.select_for_update(no_key=True).filter(id__in=property_ids).order_by('id')
+            .values_list('id', 'user_id', 'estimated_value')
+        }
+    PropertyAllocation.objects.filter(property_id__in=properties).update(version=F('version') + 1)
+    bands = {
+        property_id: (min_price, max_price) for property_id, min_price, max_price in
+        PropertyAllocation.objects.filter(property_id__in=properties).values_list('property_id', 'min_price', 'max_price')
+    }
+    return {property_id: (*owner_and_value, *bands.get(property_id, (None, None)))
+            for property_id, owner_and_value in properties.items()}
+
+
+def apply_revaluations(rows, user=None, chunk_size=REVALUATION_CHUNK_SIZE):
+    """
+    Apply ``(line_number, row)`` revaluations and return ``(applied, rejects)``.
+
+    Each reject is ``{"line", "property_id", "estimated_value", "error"}``. When ``user`` is
+    given and is not staff, rows for properties owned by someone else are rejected.
+    """
+    applied, rejects, seen = 0, [], set()
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        valid = {}
+        for line, row in chunk:
+            error = None
+            if row is None:
+                error = "Line is not a JSON object."
+            else:
+                serializer = PropertyRevaluationSerializer(data=row)
+                if not serializer.is_valid():
+                    error = serializer.errors
+                elif serializer.validated_data['property_id'] in seen:
+                    error = "Property appears more than once in the batch."
+            if error is not None:
+                rejects.append(_reject(line, row, error))
+                continue
+            seen.add(serializer.validated_data['property_id'])
+            valid[serializer.validated_data['property_id']] = (line, row, serializer.validated_data['estimated_value'])
+
+        with transaction.atomic():
+            locked = lock_for_revaluation(list(valid))
+            updated_at, updates, changes = now(), [], {}
+            for property_id, (line, row, value) in valid.items():
+                if property_id not in locked:
+                    rejects.append(_reject(line, row, "Property does not exist."))
+                    continue
+                owner_id, old_value, min_price, max_price = locked[property_id]
+                if user is not None and not user.is_staff and owner_id != user.id:
+                    rejects.append(_reject(line, row, "You do not have permission to revalue this property."))
+                elif not price_band_allows(value, min_price, max_price):
+                    rejects.append(_reject(line, row, OUT_OF_BAND_MESSAGE))
+                else:
+                    updates.append(Property(id=property_id, estimated_value=value, updated_at=updated_at))
+                    changes[property_id] = (old_value, value)
+            Property.objects.bulk_update(updates, ['estimated_value', 'updated_at'], batch_size=chunk_size)
+            # bulk_update sends no post_save signals
+            record_revaluations(changes)
+            invalidate_versions(TRANSACTIONS_VERSION, *(property_version_name(prop.id) for prop in updates))
+        applied += len(updates)
+    rejects.sort(key=lambda reject: reject['line'])
+    return applied, rejects
+
+
+def _reject(line, row, error):
+    row = row or {}
+    return {"line": line, "property_id": row.get("property_id"), "estimated_value": row.get("estimated_value"),
+            "error": error}
+
+
+def write_rejects(rejects, text_file, file_format):
+    """Write rejects in the format of the input file, with the line number and the reason."""
+    write_rows(rejects, text_file, file_format, ["line", "property_id", "estimated_value", "error"])
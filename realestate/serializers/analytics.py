@@ -0,0 +1,38 @@
+from decimal import Decimal
+from rest_framework import serializers
+from ..models import DistrictSummary, PortfolioSummary
+
+
+class DistrictSummarySerializer(serializers.ModelSerializer):
+    average_price = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DistrictSummary
+        fields = ["district", "property_count", "transaction_count", "volume", "average_price"]
+
+    def get_average_price(self, obj):
+        if not obj.transaction_count:
+            return None
+        return str((obj.volume / obj.transaction_count).quantize(Decimal('0.01')))
+
+
+class PortfolioSummarySerializer(serializers.ModelSerializer):
+    value = serializers.DecimalField(max_digits=30, decimal_places=2)
+
+    class Meta:
+        model = PortfolioSummary
+        fields = ["user", "property_count", "value"]
+
+
+class CapTableEntrySerializer(serializers.Serializer):
+    user = serializers.IntegerField(source='user_id')
+    percentage = serializers.DecimalField(max_digits=5, decimal_places=2)
+    value = serializers.DecimalField(max_digits=30, decimal_places=2)
+
+
+class CapTableSerializer(serializers.Serializer):
+    property = serializers.IntegerField(source='property_id')
+    estimated_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+    allocated_percentage = serializers.DecimalField(max_digits=5, decimal_places=2)
+    available_percentage = serializers.DecimalField(max_digits=5, decimal_places=2)
+    owners = CapTableEntrySerializer(many=True)
@@ -1,7 +1,12 @@
 from rest_framework import serializers
-from ..models import Property
-from django.db.models import Q
-from decimal import Decimal
+from ..imports import FILE_FORMATS, format_for_name
+from ..ledger import price_band_allows
+from ..models import Property, PropertyAllocation
+
+OUT_OF_BAND_MESSAGE = (
+    "Updating estimated value would make one or more transactions fall outside the 50%-150% price range."
+)
+
 class PropertySerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -12,11 +17,29 @@ class PropertySerializer(serializers.ModelSerializer):
 
     def validate_estimated_value(self, value):
         if self.instance:  # Only on update
-            invalid_exists = self.instance.transactions.filter(
-                Q(price__lt=(Decimal('0.5') * value)) | Q(price__gt=(Decimal('1.5') * value))
-            ).exists()
-            if invalid_exists:
-                raise serializers.ValidationError(
-                    "Updating estimated value would make one or more transactions fall outside the 50%-150% price range."
-                )
-        return value
\ No newline at end of file
+            # The view passes the price band read under lock; it mirrors MIN/MAX(transaction.price)
+            band = self.context.get('locked_price_band')
+            if band is None:
+                band = (PropertyAllocation.objects.filter(property=self.instance)
+                        .values_list('min_price', 'max_price').first() or (None, None))
+            if not price_band_allows(value, *band):
+                raise serializers.ValidationError(OUT_OF_BAND_MESSAGE)
+        return value
+
+
+class PropertyRevaluationSerializer(serializers.Serializer):
+    """One ``(property_id, estimated_value)`` row of a batch revaluation."""
+    property_id = serializers.IntegerField(min_value=1)
+    estimated_value = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class PropertyRevaluationUploadSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=FILE_FORMATS, required=False)
+
+    def validate(self, data):
+        if 'file_format' not in data:
+            data['file_format'] = format_for_name(data['file'].name)
+            if data['file_format'] is None:
+                raise serializers.ValidationError({"file_format": "Cannot infer the format from the file name."})
+        return data
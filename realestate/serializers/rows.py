@@ -0,0 +1,69 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+def encode_datetime(value):
+    """Render a datetime the way DRF's ``DateTimeField`` does (ISO 8601, ``Z`` for UTC)."""
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class RowEncoder:
+    """
+    Encodes raw ``values_list`` rows into the representation a ModelSerializer would produce.
+
+    The serializer's readable fields are compiled once into ``(name, column, converter)``
+    triples, so encoding a row is a tuple walk instead of a DRF field tree per object.
+    Only the field types the read serializers use are supported.
+    """
+
+    def __init__(self, serializer_class):
+        self.names, self.columns, self.converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            column, converter = self._compile(field)
+            self.names.append(name)
+            self.columns.append(column)
+            self.converters.append(converter)
+        self._plan = list(zip(self.names, self.columns, self.converters))
+
+    @staticmethod
+    def _compile(field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            return f"{field.source}_id", None
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if (isinstance(field, serializers.DecimalField) and coerce_to_string
+                and not field.localize and not field.normalize_output):
+            return field.source, f"{{:.{field.decimal_places}f}}".format
+        datetime_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if (isinstance(field, serializers.DateTimeField) and datetime_format
+                and datetime_format.lower() == 'iso-8601' and not hasattr(field, 'timezone')):
+            return field.source, encode_datetime
+        if isinstance(field, (serializers.IntegerField, serializers.CharField, serializers.BooleanField,
+                              serializers.ChoiceField)):
+            return field.source, None
+        raise ImproperlyConfigured(f"RowEncoder cannot compile {field.__class__.__name__} '{field.field_name}'.")
+
+    def values(self, queryset):
+        return queryset.select_related(None).values(*self.columns)
+
+    def values_list(self, queryset):
+        return queryset.select_related(None).values_list(*self.columns)
+
+    def encode(self, row):
+        """Encode a ``values`` dict into a dict keyed and ordered like the serializer output."""
+        result = {}
+        for name, column, converter in self._plan:
+            value = row[column]
+            result[name] = value if converter is None or value is None else converter(value)
+        return result
+
+    def encode_values(self, row):
+        """Encode a ``values_list`` tuple into a list ordered like ``names``."""
+        return [value if converter is None or value is None else converter(value)
+                for converter, value in zip(self.converters, row)]
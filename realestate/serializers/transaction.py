@@ -1,13 +1,44 @@
 from rest_framework import serializers
 from ..models import Transaction
 from django.utils.timezone import now
-from django.db.models import Sum
-from django.db.models import Q
+from ..ledger import get_ownership_totals
 from decimal import Decimal
 import logging
 
 logger = logging.getLogger('realestate')
 
+def check_transaction_date(transaction_date):
+    """Reject transactions dated in the future."""
+    if transaction_date > now():
+        logger.debug("[VALIDATION FAILED] Future transaction date: %s", transaction_date)
+        raise serializers.ValidationError({"transaction_date":"Transaction date cannot be in the future."})
+
+
+def check_ownership_and_price(property_obj, percentage, price, existing_percentage, user_percentage):
+    """Apply the ownership and price rules given the percentages already allocated on the property."""
+    # 2. Total ownership validation
+    if existing_percentage + percentage > 100:
+        logger.debug("[VALIDATION FAILED] Total ownership would exceed 100%%: %s", existing_percentage + percentage)
+        raise serializers.ValidationError({"percentage":"Total ownership percentage exceeds 100%."})
+
+    # 3. User ownership limit
+    if user_percentage + percentage > 80:
+        logger.debug("[VALIDATION FAILED] User ownership would exceed 80%%: %s", user_percentage + percentage)
+        raise serializers.ValidationError({"percentage":"User cannot own more than 80% of a property."})
+
+    # 4. Price validation: within ±50% of estimated value
+    min_price = property_obj.estimated_value * Decimal('0.5')
+    max_price = property_obj.estimated_value * Decimal('1.5')
+    if not (min_price <= price <= max_price):
+        logger.debug("[VALIDATION FAILED] Price %s outside range (%s - %s)", price, min_price, max_price)
+        raise serializers.ValidationError({"price":"Price must be between 50% and 150% of property's estimated value."})
+
+    # 4. Price validation: minimum value of 10000
+    if price < 10000:
+        logger.debug("[VALIDATION FAILED] Price %s below minimum threshold", price)
+        raise serializers.ValidationError({"price":"Minimum transaction amount is €10,000."})
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     transaction_date = serializers.DateTimeField()
@@ -20,53 +51,48 @@ class TransactionSerializer(serializers.ModelSerializer):
     def validate(self, data):
         request = self.context.get('request')
         instance = getattr(self, "instance", None)
-        user_obj = getattr(instance, 'user', getattr(request, 'user', None))
+        user_id = instance.user_id if instance else getattr(getattr(request, 'user', None), 'id', None)
         property_obj = self.context.get('locked_property')
         percentage = data.get('percentage', getattr(instance, 'percentage', None))
         price = data.get('price', getattr(instance, 'price', None))
         transaction_date = data.get('transaction_date', getattr(instance, 'transaction_date', None))
 
-        logger.debug(
-            f"[VALIDATION] user={getattr(user_obj, 'id', None)}, property={getattr(property_obj, 'id', None)}, "
-            f"percentage={percentage}, price={price}, date={transaction_date}"
-        )
+        logger.debug("[VALIDATION] user=%s, property=%s, percentage=%s, price=%s, date=%s",
+                     user_id, getattr(property_obj, 'id', None), percentage, price, transaction_date)
 
         # 1. Date validation
-        if transaction_date > now():
-            logger.debug(f"[VALIDATION FAILED] Future transaction date: {transaction_date}")
-            raise serializers.ValidationError({"transaction_date":"Transaction date cannot be in the future."})
-
-        results = (Transaction.objects.filter(property=property_obj).
-        exclude(id=getattr(instance, "id", None)). #this is to not recalculate the instance being updated since it is added later
-        aggregate(
-            total=Sum('percentage'),
-            user_total=Sum('percentage', filter=Q(user=user_obj))
-        ))
-
-        existing_percentage = results['total'] or 0
-        user_percentage = results['user_total'] or 0
-        logger.debug(f"[VALIDATION] Ownership totals: total={existing_percentage}, user_total={user_percentage}")
-
-        # 2. Total ownership validation
-        if existing_percentage + percentage > 100:
-            logger.debug(f"[VALIDATION FAILED] Total ownership would exceed 100%: {existing_percentage + percentage}")
-            raise serializers.ValidationError({"percentage":"Total ownership percentage exceeds 100%."})
-
-        # 3. User ownership limit
-        if user_percentage + percentage > 80:
-            logger.debug(f"[VALIDATION FAILED] User ownership would exceed 80%: {user_percentage + percentage}")
-            raise serializers.ValidationError({"percentage":"User cannot own more than 80% of a property."})
-
-        # 4. Price validation: within ±50% of estimated value
-        min_price = property_obj.estimated_value * Decimal('0.5')
-        max_price = property_obj.estimated_value * Decimal('1.5')
-        if not (min_price <= price <= max_price):
-            logger.debug(f"[VALIDATION FAILED] Price {price} outside range ({min_price} - {max_price})")
-            raise serializers.ValidationError({"price":"Price must be between 50% and 150% of property's estimated value."})
-
-        # 4. Price validation: minimum value of 10000
-        if price < 10000:
-            logger.debug(f"[VALIDATION FAILED] Price {price} below minimum threshold")
-            raise serializers.ValidationError({"price":"Minimum transaction amount is €10,000."})
+        check_transaction_date(transaction_date)
+
+        existing_percentage, user_percentage = get_ownership_totals(property_obj.id, user_id)
+        if instance:  # this is to not recalculate the instance being updated since it is added later
+            existing_percentage -= instance.percentage
+            user_percentage -= instance.percentage
+        logger.debug("[VALIDATION] Ownership totals: total=%s, user_total=%s", existing_percentage, user_percentage)
 
+        check_ownership_and_price(property_obj, percentage, price, existing_percentage, user_percentage)
         return data
+
+
+class TransactionBulkItemSerializer(TransactionSerializer):
+    """Parses one row of a bulk payload; ownership rules are checked cumulatively by the bulk action."""
+    property = serializers.IntegerField(source='property_id', min_value=1)
+
+    class Meta(TransactionSerializer.Meta):
+        validators = []  # (user, property, transaction_date) uniqueness is checked set-based by the bulk action
+
+    def validate(self, data):
+        check_transaction_date(data['transaction_date'])
+        return data
+
+
+class TransactionBulkSerializer(serializers.Serializer):
+    MODE_ATOMIC = "atomic"
+    MODE_PARTIAL = "partial"
+
+    transactions = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=5000)
+    mode = serializers.ChoiceField(choices=[MODE_ATOMIC, MODE_PARTIAL], default=MODE_ATOMIC)
+
+
+class TransactionStatsQuerySerializer(serializers.Serializer):
+    bucket = serializers.ChoiceField(choices=["day", "week", "month"], default="month")
+    group_by = serializers.ChoiceField(choices=["district", "property"], required=False)
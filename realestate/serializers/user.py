@@ -1,4 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from ..models import User
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,8 +12,36 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "is_staff", "updated_at"]
 
     def create(self, validated_data):
-        password = validated_data.pop("password")
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # create_user hashes the password before its single INSERT
+        return User.objects.create_user(**validated_data)
+
+
+class UserBulkItemSerializer(UserSerializer):
+    """One row of a bulk provisioning batch; username uniqueness is checked for the whole batch at once."""
+
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {"username": {"validators": [User.username_validator]}}
+
+
+class UserBulkSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+    def validate_users(self, users):
+        # Passwords are hashed while the request waits (see BULK_USERS_MAX_BATCH in config/settings.py)
+        if len(users) > settings.BULK_USERS_MAX_BATCH:
+            raise serializers.ValidationError(
+                f"At most {settings.BULK_USERS_MAX_BATCH} users per request; "
+                "load larger batches with `manage.py provision_users`."
+            )
+        return users
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Puts the flags the permissions check into the token (see realestate.authentication)."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["is_staff"] = user.is_staff
+        token["is_active"] = user.is_active
+        return token
@@ -0,0 +1,152 @@
+from decimal import Decimal
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .cache import (
+    STATS_VERSION, TRANSACTIONS_VERSION, get_cache, invalidate_versions, property_version_name, stats_version_name
+)
+from .analytics import record_district_delta, record_property_moved, record_property_removal, record_revaluations
+from .authentication import forget_user_state
+from .metrics import record_query
+from .ledger import apply_ownership_delta, apply_transaction_stats, extend_price_bounds, refresh_price_bounds
+from .models import Property, PropertyAllocation, Transaction, User
+
+
+@receiver(pre_save, sender=Property)
+def load_property_summary_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or hasattr(instance, '_summary_state'):
+        return
+    instance._summary_state = Property.objects.filter(pk=instance.pk).values_list('district', 'estimated_value').first()
+
+
+@receiver(post_save, sender=Property)
+def create_property_allocation(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        PropertyAllocation.objects.get_or_create(property=instance)
+    else:
+        # The price band depends on estimated_value: make in-flight optimistic writes retry
+        PropertyAllocation.objects.filter(property=instance).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=Property)
+def invalidate_stats_on_property_move(sender, instance, created, raw=False, **kwargs):
+    # Connected before sync_summaries_on_property_save, which replaces the snapshot
+    previous = None if raw or created else getattr(instance, '_summary_state', None)
+    if previous is not None and previous[0] != instance.district:
+        # Statistics group and filter transactions by their property's district
+        invalidate_versions(STATS_VERSION)
+
+
+@receiver(post_save, sender=Property)
+def sync_summaries_on_property_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_summary_state', None)
+    current = (instance.district, Decimal(str(instance.estimated_value)))
+    if previous is None:
+        if created:
+            record_district_delta(instance.district, properties=1)
+    else:
+        if previous[0] != current[0]:
+            record_property_moved(instance.pk, previous[0], current[0])
+        if previous[1] != current[1]:
+            record_revaluations({instance.pk: (previous[1], current[1])})
+    instance._summary_state = current
+
+
+@receiver(pre_delete, sender=Property)
+def remove_property_from_summaries(sender, instance, **kwargs):
+    record_property_removal(instance)
+
+
+@receiver(pre_save, sender=Transaction)
+def load_transaction_ledger_state(sender, instance, raw=False, **kwargs):
+    # Instances that were not loaded through the ORM (e.g. built with an explicit pk) have no snapshot
+    if raw or instance._state.adding or hasattr(instance, '_ledger_state'):
+        return
+    instance._ledger_state = (
+        Transaction.objects.filter(pk=instance.pk).values_list('user_id', 'property_id', 'percentage', 'price',
+                                                               'transaction_date').first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def sync_ledger_on_transaction_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_ledger_state', None)
+    current = (instance.user_id, instance.property_id, Decimal(str(instance.percentage)), Decimal(str(instance.price)),
+               instance.transaction_date)
+    if previous and previous[:2] == current[:2]:
+        apply_ownership_delta(instance.property_id, instance.user_id, current[2] - previous[2])
+    else:
+        if previous:
+            apply_ownership_delta(previous[1], previous[0], -previous[2])
+        apply_ownership_delta(instance.property_id, instance.user_id, current[2])
+
+    if not previous:
+        apply_transaction_stats(instance.property_id, 1, current[3])
+        extend_price_bounds(instance.property_id, current[3])
+    elif previous[1] != current[1] or previous[3] != current[3]:
+        if previous[1] == current[1]:
+            apply_transaction_stats(instance.property_id, 0, current[3] - previous[3])
+        else:
+            apply_transaction_stats(previous[1], -1, -previous[3])
+            apply_transaction_stats(current[1], 1, current[3])
+        refresh_price_bounds(*{previous[1], current[1]})
+    instance._previous_property_id = previous[1] if previous else None
+    instance._previous_transaction_date = previous[4] if previous else None
+    instance._ledger_state = current
+
+
+@receiver(post_delete, sender=Transaction)
+def sync_ledger_on_transaction_delete(sender, instance, **kwargs):
+    user_id, property_id, percentage, price, _ = getattr(instance, '_ledger_state', (
+        instance.user_id, instance.property_id, instance.percentage, instance.price, instance.transaction_date
+    ))
+    apply_ownership_delta(property_id, user_id, -percentage)
+    apply_transaction_stats(property_id, -1, -price)
+    refresh_price_bounds(property_id)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_reads(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_versions(property_version_name(instance.pk), TRANSACTIONS_VERSION)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_transaction_reads(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Connected after the ledger receivers, which record the property and date the transaction was moved from
+    property_ids = {instance.property_id, getattr(instance, '_previous_property_id', None)} - {None}
+    dates = {instance.transaction_date, getattr(instance, '_previous_transaction_date', None)} - {None}
+    invalidate_versions(TRANSACTIONS_VERSION, *(property_version_name(pk) for pk in property_ids),
+                        *{stats_version_name(date) for date in dates})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_authentication_state(sender, instance, raw=False, **kwargs):
+    # Deactivation, staff and password changes reach token-authenticated requests at once
+    if not raw:
+        forget_user_state(instance.pk)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    # Counts and times the queries of each request (see realestate.metrics); a reconnect keeps the wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(post_migrate)
+def clear_response_cache(sender, **kwargs):
+    # migrate and flush rewrite data without model signals; cached responses may describe rows that are gone
+    get_cache().clear()
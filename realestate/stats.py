@@ -0,0 +1,150 @@
+"""
+Time-bucketed transaction statistics.
+
+Buckets are computed by the database: ``transaction_date`` is truncated to the day, the ISO week
+(starting on Monday) or the month in the current time zone and count, sum, min, max and average
+of the price and the percentage sold are aggregated per bucket and, optionally, per district or
+per property.
+
+A closed bucket (it ended before now and lies entirely inside the requested date range) cannot
+gain transactions except through a backdated write, so its rows are cached as a rollup. The key
+carries the ``stats:<yyyy-mm>`` counter of every month the bucket touches and the ``stats``
+counter (see ``realestate.cache``): a backdated write only discards the rollups of its own month,
+and a request only aggregates the buckets that are open or missing from the cache.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from .cache import STATS_VERSION, get_cache, get_versions, stats_version_name
+from .serializers.rows import encode_datetime
+
+BUCKET_SIZES = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+GROUP_FIELDS = {'district': 'property__district', 'property': 'property_id'}
+CENT = Decimal('0.01')
+
+
+def bucket_start(value, size):
+    """Return the local date a datetime's bucket starts on."""
+    day = timezone.localtime(value).date()
+    if size == 'week':
+        return day - timedelta(days=day.weekday())
+    if size == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, size):
+    if size == 'week':
+        return day + timedelta(days=7)
+    if size == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_datetime(day):
+    """The aware datetime a bucket starting on ``day`` begins at."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def iter_buckets(first, last, size):
+    """Yield the start date of every bucket from the one holding ``first`` to the one holding ``last``."""
+    day, end = bucket_start(first, size), bucket_start(last, size)
+    while day <= end:
+        yield day
+        day = next_bucket(day, size)
+
+
+def _month_version_names(start, end):
+    names, day = [], start.replace(day=1)
+    while day < end:
+        names.append(stats_version_name(day))
+        day = next_bucket(day, 'month')
+    return names
+
+
+def _encode_row(day, group_by, row):
+    encoded = {"bucket": encode_datetime(bucket_datetime(day))}
+    if group_by:
+        encoded[group_by] = row[GROUP_FIELDS[group_by]]
+    encoded.update(
+        count=row['count'],
+        volume=f"{row['volume']:.2f}",
+        min_price=f"{row['min_price']:.2f}",
+        max_price=f"{row['max_price']:.2f}",
+        avg_price=f"{Decimal(str(row['avg_price'])).quantize(CENT):.2f}",
+        percentage_sold=f"{row['percentage_sold']:.2f}",
+    )
+    return encoded
+
+
+def aggregate_buckets(queryset, size, group_by, start, end):
+    """Aggregate the transactions dated in ``[start, end)``; return ``{bucket start date: [rows]}``."""
+    group_field = GROUP_FIELDS.get(group_by)
+    rows = (queryset.select_related(None).order_by()
+            .filter(transaction_date__gte=bucket_datetime(start), transaction_date__lt=bucket_datetime(end))
+            .annotate(bucket=BUCKET_SIZES[size]('transaction_date'))
+            .values('bucket', *([group_field] if group_field else []))
+            .annotate(count=Count('id'), volume=Sum('price'), min_price=Min('price'), max_price=Max('price'),
+                      avg_price=Avg('price'), percentage_sold=Sum('percentage')))
+    buckets = {}
+    for row in rows:
+        day = timezone.localtime(row['bucket']).date()
+        buckets.setdefault(day, []).append(_encode_row(day, group_by, row))
+    for bucket_rows in buckets.values():
+        if group_field:
+            bucket_rows.sort(key=lambda row: row[group_by])
+    return buckets
+
+
+def _rollup_key(params, size, group_by, day, versions):
+    raw = "|".join([size, group_by or "", day.isoformat(), ".".join(map(str, versions)), params])
+    return f"realestate:stats:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+def compute_stats(queryset, buckets, size, group_by=None, date_from=None, date_to=None, filter_params=()):
+    """
+    Return the rows of ``buckets`` (consecutive bucket start dates) for an already filtered queryset.
+
+    ``filter_params`` are the ``(name, value)`` filters applied to the queryset apart from the date
+    range; together with the bucket they identify a rollup. Closed buckets are read from and stored
+    in the rollup cache, everything else is aggregated in one query.
+    """
+    if not buckets:
+        return []
+    timeout = settings.API_STATS_CACHE_TIMEOUT
+    current = timezone.now()
+    ends = {day: next_bucket(day, size) for day in buckets}
+
+    def is_closed(day):
+        start, end = bucket_datetime(day), bucket_datetime(ends[day])
+        return (timeout and end <= current and (date_from is None or date_from <= start)
+                and (date_to is None or end - timedelta(microseconds=1) <= date_to))
+
+    keys = {}
+    closed = [day for day in buckets if is_closed(day)]
+    if closed:
+        names = _month_version_names(closed[0], ends[closed[-1]])
+        epoch, *counters = get_versions(STATS_VERSION, *names)
+        month_versions = dict(zip(names, counters))
+        params = urlencode(sorted(filter_params))
+        for day in closed:
+            versions = [epoch] + [month_versions[name] for name in _month_version_names(day, ends[day])]
+            keys[day] = _rollup_key(params, size, group_by, day, versions)
+
+    cache = get_cache()
+    cached = cache.get_many(list(keys.values())) if keys else {}
+    results = {day: cached[key] for day, key in keys.items() if key in cached}
+    missing = [day for day in buckets if day not in results]
+    if missing:
+        computed = aggregate_buckets(queryset, size, group_by, missing[0], ends[missing[-1]])
+        for day in missing:
+            results[day] = computed.get(day, [])
+        rollups = {keys[day]: results[day] for day in missing if day in keys}
+        if rollups:
+            cache.set_many(rollups, timeout)
+    return [row for day in buckets for row in results[day]]
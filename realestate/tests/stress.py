@@ -0,0 +1,242 @@
+"""
+Concurrency stress harness for the transaction write path, shared by the race condition tests
+and ``benchmarks.stress_transactions``.
+
+N workers (threads, or forked processes), each with its own database connection and its own
+user, fire creates and PATCHes through the API against one or many properties. Afterwards the
+ownership invariants are checked against the raw transactions, and ``StressResult`` reports
+throughput, p50/p99 latency and the time spent waiting on other writers.
+
+Lock wait is the time spent in ``_lock_property`` (pessimistic) or ``_claim_property_version``
+(optimistic). On SQLite writers queue at ``BEGIN IMMEDIATE`` instead, so the wait shows up
+in the latency; use a file based test database there.
+
+Django models are imported inside the functions, so the benchmark can import this module
+before it configures Django.
+"""
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+ESTIMATED_VALUE = Decimal('100000')
+PERCENTAGES = ('1.00', '2.00', '5.00', '10.00')
+EXPECTED_STATUSES = {200, 201, 400, 409}
+
+_lock_waits = threading.local()
+
+
+@contextmanager
+def sqlite_immediate_transactions(connection):
+    """
+    Make SQLite writers queue on the busy timeout instead of failing with "database is locked".
+
+    A deferred SQLite transaction that upgrades to a write lock fails at once under contention;
+    ``BEGIN IMMEDIATE`` takes the write lock up front, much like ``SELECT ... FOR UPDATE``.
+    Applies to connections opened inside the block (i.e. the workers'). No-op on other backends.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    options = connection.settings_dict.setdefault('OPTIONS', {})
+    saved = dict(options)
+    options.setdefault('transaction_mode', 'IMMEDIATE')
+    options.setdefault('timeout', 30)
+    try:
+        yield
+    finally:
+        options.clear()
+        options.update(saved)
+
+
+@contextmanager
+def measure_lock_waits():
+    """Accumulate the time each request spends waiting on other writers into ``_lock_waits.total``."""
+    from realestate.views.transaction import TransactionViewSet
+
+    originals = {name: TransactionViewSet.__dict__[name] for name in ('_lock_property', '_claim_property_version')}
+
+    def timed(method):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                _lock_waits.total = getattr(_lock_waits, 'total', 0.0) + time.perf_counter() - start
+        return wrapper
+
+    for name, method in originals.items():
+        setattr(TransactionViewSet, name, timed(method))
+    try:
+        yield
+    finally:
+        for name, method in originals.items():
+            setattr(TransactionViewSet, name, method)
+
+
+def run_worker(index, user_id, property_ids, operations, patch_ratio, seed, barrier):
+    """Run one worker's requests and return ``[(status, latency, lock_wait), ...]``."""
+    from django.db import connection
+    from django.utils.timezone import now
+    from rest_framework.test import APIClient
+    from realestate.models import User
+
+    rng = random.Random(seed * 1_000_003 + index)
+    client = APIClient(raise_request_exception=False)  # unhandled errors become 500 samples
+    base_date = now() - timedelta(days=365)
+    created, samples = [], []
+    try:
+        client.force_authenticate(user=User.objects.get(pk=user_id))
+        barrier.wait()
+        for number in range(operations):
+            if created and rng.random() < patch_ratio:
+                request = client.patch
+                url, payload = f"/transactions/{rng.choice(created)}/", {"percentage": rng.choice(PERCENTAGES)}
+            else:
+                request = client.post
+                url, payload = "/transactions/", {
+                    "property": rng.choice(property_ids),
+                    "percentage": rng.choice(PERCENTAGES),
+                    "price": str(ESTIMATED_VALUE),
+                    "transaction_date": (base_date + timedelta(seconds=index * operations + number)).isoformat(),
+                }
+            _lock_waits.total = 0.0
+            start = time.perf_counter()
+            response = request(url, payload, format="json")
+            samples.append((response.status_code, time.perf_counter() - start, _lock_waits.total))
+            if response.status_code == 201:
+                created.append(response.data["id"])
+    finally:
+        connection.close()
+    return samples
+
+
+def _run_threads(jobs):
+    barrier = threading.Barrier(len(jobs))
+    results = [None] * len(jobs)
+
+    def target(index, args):
+        try:
+            results[index] = run_worker(*args, barrier=barrier)
+        except BaseException as e:
+            results[index] = RuntimeError(f"worker {index} failed: {e!r}")
+            barrier.abort()
+
+    threads = [threading.Thread(target=target, args=(index, args)) for index, args in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _process_target(queue, index, args, barrier):
+    try:
+        queue.put((index, run_worker(*args, barrier=barrier)))
+    except BaseException as e:
+        barrier.abort()
+        queue.put((index, RuntimeError(f"worker {index} failed: {e!r}")))
+
+
+def _run_processes(jobs):
+    from django.db import connections
+
+    # Forked children must not inherit (and share) the parent's open connections
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    barrier, queue = context.Barrier(len(jobs)), context.Queue()
+    processes = [context.Process(target=_process_target, args=(queue, index, args, barrier))
+                 for index, args in enumerate(jobs)]
+    for process in processes:
+        process.start()
+    results = [None] * len(jobs)
+    for _ in processes:
+        index, samples = queue.get()
+        results[index] = samples
+    for process in processes:
+        process.join()
+    return results
+
+
+def check_invariants(property_ids):
+    """Return the violated ownership invariants (empty if the run left a consistent state)."""
+    from django.db.models import Sum
+    from realestate.analytics import check_summaries
+    from realestate.ledger import check_ledger
+    from realestate.models import Transaction
+
+    violations = check_ledger() + check_summaries()
+    transactions = Transaction.objects.filter(property_id__in=property_ids)
+    for row in transactions.values('property_id').annotate(total=Sum('percentage')).order_by():
+        if row['total'] > 100:
+            violations.append(f"Property {row['property_id']}: {row['total']}% allocated")
+    for row in transactions.values('property_id', 'user_id').annotate(total=Sum('percentage')).order_by():
+        if row['total'] > 80:
+            violations.append(f"User {row['user_id']} owns {row['total']}% of property {row['property_id']}")
+    return violations
+
+
+class StressResult:
+    def __init__(self, mode, samples, wall, violations):
+        self.mode = mode
+        self.statuses = Counter(status for status, _, _ in samples)
+        self.latencies = sorted(latency for _, latency, _ in samples)
+        self.lock_waits = sorted(wait for _, _, wait in samples)
+        self.wall = wall
+        self.violations = violations
+
+    @property
+    def unexpected_statuses(self):
+        return {status: count for status, count in self.statuses.items() if status not in EXPECTED_STATUSES}
+
+    @property
+    def ok(self):
+        return not self.violations and not self.unexpected_statuses
+
+    @staticmethod
+    def percentile(values, fraction):
+        return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+    def report(self):
+        writes = self.statuses[200] + self.statuses[201]
+        return (f"{self.mode:>12} {len(self.latencies) / self.wall:>8,.1f} {writes / self.wall:>9,.1f} "
+                f"{self.percentile(self.latencies, 0.5) * 1000:>8.1f} {self.percentile(self.latencies, 0.99) * 1000:>8.1f} "
+                f"{sum(self.lock_waits) * 1000:>10.1f} {self.percentile(self.lock_waits, 0.99) * 1000:>8.1f}  "
+                f"{dict(sorted(self.statuses.items()))}")
+
+    REPORT_HEADER = (f"{'mode':>12} {'req/s':>8} {'writes/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+                     f"{'wait ms':>10} {'wait p99':>8}  statuses")
+
+
+def run_stress(workers=8, operations=50, properties=1, patch_ratio=0.3, processes=False, mode=None, seed=0):
+    """Run the workload against the current database and return a ``StressResult``."""
+    from django.conf import settings
+    from django.db import connection
+    from django.test import override_settings
+    from realestate.models import Property, User
+
+    mode = mode or settings.TRANSACTION_CONCURRENCY_MODE
+    tag = f"stress_{time.time_ns()}"
+    owner = User.objects.create(username=f"{tag}_owner", password="!")
+    property_ids = [
+        Property.objects.create(title=f"{tag} {i}", district="Limassol", estimated_value=ESTIMATED_VALUE, user=owner).id
+        for i in range(properties)
+    ]
+    users = User.objects.bulk_create([User(username=f"{tag}_{i}", password="!") for i in range(workers)])
+    jobs = [(index, user.id, property_ids, operations, patch_ratio, seed) for index, user in enumerate(users)]
+
+    with override_settings(TRANSACTION_CONCURRENCY_MODE=mode), sqlite_immediate_transactions(connection), \
+            measure_lock_waits():
+        start = time.perf_counter()
+        results = _run_processes(jobs) if processes else _run_threads(jobs)
+        wall = time.perf_counter() - start
+
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    samples = [sample for result in results for sample in result]
+    return StressResult(mode, samples, wall, check_invariants(property_ids))
@@ -0,0 +1,135 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...analytics import check_summaries
+from ...ledger import check_ledger
+from ...models import Property, Transaction, User
+
+
+class AnalyticsSummaryTests(TestCase):
+    """Summary deltas are applied on commit, so every write runs inside captureOnCommitCallbacks."""
+
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.buyer = User.objects.create_user(username="buyer", password="StrongPass123!")
+        self.admin = User.objects.create_superuser(username="admin", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.house = Property.objects.create(title="House", district="Limassol", estimated_value=200000, user=self.user)
+            self.flat = Property.objects.create(title="Flat", district="Paphos", estimated_value=100000, user=self.user)
+            self.tx1 = self.add_transaction(self.user, self.house, 30, 200000, hours=1)
+            self.tx2 = self.add_transaction(self.buyer, self.house, 20, 150000, hours=2)
+            self.tx3 = self.add_transaction(self.user, self.flat, 50, 100000, hours=3)
+
+    def add_transaction(self, user, prop, percentage, price, hours):
+        return Transaction.objects.create(user=user, property=prop, percentage=percentage, price=price,
+                                          transaction_date=now() - timedelta(hours=hours))
+
+    def assertInSync(self):
+        self.assertEqual(check_summaries(), [])
+        self.assertEqual(check_ledger(), [])
+
+    def test_district_endpoints(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/districts/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        districts = {row["district"]: row for row in response.data}
+        self.assertEqual(len(districts), 6)
+        self.assertEqual(districts["Limassol"], {"district": "Limassol", "property_count": 1, "transaction_count": 2,
+                                                 "volume": "350000.00", "average_price": "175000.00"})
+        self.assertIsNone(districts["Nicosia"]["average_price"])
+        self.assertEqual(self.client.get("/districts/Paphos/").data["volume"], "100000.00")
+
+    def test_portfolio_endpoint(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/users/{self.user.id}/portfolio/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # 30% of 200,000 + 50% of 100,000
+        self.assertEqual(response.data, {"user": self.user.id, "property_count": 2, "value": "110000.00"})
+
+        self.assertEqual(self.client.get(f"/users/{self.buyer.id}/portfolio/").status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(f"/users/{self.buyer.id}/portfolio/").data["value"], "40000.00")
+        self.assertEqual(self.client.get(f"/users/{self.admin.id}/portfolio/").data["value"], "0.00")
+
+    def test_cap_table_endpoint(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/properties/{self.house.id}/cap-table/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["allocated_percentage"], "50.00")
+        self.assertEqual(response.data["available_percentage"], "50.00")
+        self.assertEqual([dict(owner) for owner in response.data["owners"]], [
+            {"user": self.user.id, "percentage": "30.00", "value": "60000.00"},
+            {"user": self.buyer.id, "percentage": "20.00", "value": "40000.00"},
+        ])
+
+    def test_summaries_follow_writes(self):
+        self.assertInSync()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tx1.price, self.tx1.percentage = 210000, 35
+            self.tx1.save()
+        self.assertInSync()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/properties/{self.house.id}/",
+                                         {"estimated_value": 250000, "district": "Nicosia"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertInSync()
+        self.assertEqual(self.client.get("/districts/Nicosia/").data["transaction_count"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rows = [{"property": self.flat.id, "percentage": "5.00", "price": "90000",
+                     "transaction_date": (now() - timedelta(days=2)).isoformat()}]
+            self.client.post("/transactions/bulk/", {"transactions": rows}, format='json')
+            content = f"property_id,estimated_value\n{self.flat.id},120000\n"
+            self.client.post("/properties/revaluations/", {"file": SimpleUploadedFile("values.csv", content.encode())},
+                             format='multipart')
+        self.assertInSync()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tx2.delete()
+        self.assertInSync()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flat.delete()
+        self.assertInSync()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertInSync()
+
+    def test_summaries_follow_api_deletes(self):
+        # The delete endpoints take the rows out of the ledger in one pass instead of through the signals
+        admin = APIClient()
+        admin.force_authenticate(user=self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction(self.buyer, self.flat, 10, 110000, hours=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin.delete(f"/users/{self.buyer.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertInSync()
+        self.assertEqual(self.client.get(f"/properties/{self.house.id}/cap-table/").data["allocated_percentage"], "30.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/properties/{self.house.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertInSync()
+        self.assertEqual(self.client.get("/districts/Limassol/").data["transaction_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin.delete(f"/users/{self.user.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertInSync()
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(admin.get("/districts/Paphos/").data["property_count"], 0)
+
+    def test_rebuild_repairs_summaries(self):
+        Transaction.objects.filter(pk=self.tx3.pk).update(price=Decimal('120000'))
+        self.assertTrue(check_summaries())
+        call_command('rebuild_ownership_ledger')
+        self.assertInSync()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.client import AsyncRequestFactory
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from ..models import Property, Transaction, User
+from ..serializers.user import ClaimsTokenObtainPairSerializer
+from ..views.property import PropertyViewSet
+from ..views.transaction import TransactionViewSet
+from ..views.user import UserViewSet
+
+LIST = {'get': 'list', 'post': 'create'}
+DETAIL = {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+
+
+@override_settings(ASYNC_READ_VIEWS=True)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.other = User.objects.create_user(username="other", password="pass1234")
+        self.property = Property.objects.create(title="Own", district="Limassol", estimated_value=100000, user=self.user)
+        self.foreign = Property.objects.create(title="Foreign", district="Paphos", estimated_value=200000,
+                                               user=self.other)
+        self.transactions = [
+            Transaction.objects.create(user=self.user, property=self.property, percentage=10,
+                                       price=100000 + index * 1000, transaction_date=now())
+            for index in range(3)
+        ]
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(user=self.user)
+        self.token = str(ClaimsTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def call(self, viewset, actions, method, path, headers=None, **kwargs):
+        view = viewset.as_view(actions, basename=viewset.__name__.lower())
+        headers = {"Authorization": f"Bearer {self.token}", **(headers or {})}
+        request = getattr(AsyncRequestFactory(), method)(path, headers=headers, **(
+            {'data': json.dumps(kwargs.pop('data')), 'content_type': 'application/json'} if 'data' in kwargs else {}))
+        response = async_to_sync(view)(request, **kwargs)
+        return response.render() if hasattr(response, 'render') else response
+
+    def test_read_routes_are_async_views(self):
+        self.assertTrue(asyncio.iscoroutinefunction(PropertyViewSet.as_view(LIST)))
+        self.assertTrue(asyncio.iscoroutinefunction(UserViewSet.as_view(DETAIL)))
+        # Extra actions keep the sync view
+        self.assertFalse(asyncio.iscoroutinefunction(TransactionViewSet.as_view({'get': 'stats'})))
+        with override_settings(ASYNC_READ_VIEWS=False):
+            self.assertFalse(asyncio.iscoroutinefunction(PropertyViewSet.as_view(LIST)))
+
+    def test_async_reads_match_the_sync_views(self):
+        cases = [
+            (PropertyViewSet, LIST, "/properties/?page_size=1", {}),
+            (PropertyViewSet, DETAIL, f"/properties/{self.property.id}/", {'pk': str(self.property.id)}),
+            (TransactionViewSet, LIST, f"/transactions/?property_id={self.property.id}&ordering=-price", {}),
+            (TransactionViewSet, DETAIL, f"/transactions/{self.transactions[0].id}/",
+             {'pk': str(self.transactions[0].id)}),
+            (UserViewSet, LIST, "/users/", {}),
+            (UserViewSet, DETAIL, f"/users/{self.other.id}/", {'pk': str(self.other.id)}),
+        ]
+        for viewset, actions, path, kwargs in cases:
+            with self.subTest(path=path):
+                response = self.call(viewset, actions, 'get', path, **kwargs)
+                expected = self.sync_client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content), expected.json())
+                self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_pagination_cursor_follows_through(self):
+        response = self.call(TransactionViewSet, LIST, 'get', "/transactions/?page_size=2")
+        page = json.loads(response.content)
+        self.assertEqual(len(page["results"]), 2)
+        response = self.call(TransactionViewSet, LIST, 'get', page["next"].replace("http://testserver", ""))
+        self.assertEqual(len(json.loads(response.content)["results"]), 1)
+
+    def test_conditional_and_missing_reads(self):
+        path = f"/properties/{self.property.id}/"
+        etag = self.call(PropertyViewSet, DETAIL, 'get', path, pk=str(self.property.id))['ETag']
+        response = self.call(PropertyViewSet, DETAIL, 'get', path, headers={"If-None-Match": etag},
+                             pk=str(self.property.id))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.call(PropertyViewSet, DETAIL, 'get', "/properties/999999/", pk="999999").status_code, 404)
+
+    def test_unauthenticated_reads_are_rejected(self):
+        self.token = "invalid"
+        self.assertEqual(self.call(PropertyViewSet, LIST, 'get', "/properties/").status_code, 401)
+
+    def test_writes_fall_back_to_the_sync_view(self):
+        path = f"/properties/{self.property.id}/"
+        response = self.call(PropertyViewSet, DETAIL, 'patch', path, data={"title": "Renamed"}, pk=str(self.property.id))
+        self.assertEqual(response.status_code, 200)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.title, "Renamed")
+        response = self.call(PropertyViewSet, DETAIL, 'delete', f"/properties/{self.foreign.id}/",
+                             pk=str(self.foreign.id))
+        self.assertEqual(response.status_code, 403)
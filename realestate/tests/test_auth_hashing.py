@@ -0,0 +1,63 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from ..hashers import _get_pool
+from ..models import User
+
+SCRYPT_FIRST = ['realestate.hashers.ScryptPasswordHasher', 'realestate.hashers.PBKDF2PasswordHasher']
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000, PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client = APIClient()
+
+    def login(self, password="StrongPass123!"):
+        return self.client.post("/auth/token/", {"username": "user", "password": password}, format="json")
+
+    def stored_hash(self):
+        return User.objects.get(pk=self.user.pk).password
+
+    def test_login_upgrades_hash_to_new_cost(self):
+        self.assertTrue(self.stored_hash().startswith("pbkdf2_sha256$1000$"))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login("wrong").status_code, 401)
+            self.assertTrue(self.stored_hash().startswith("pbkdf2_sha256$1000$"))
+            self.assertEqual(self.login().status_code, 200)
+            self.assertTrue(self.stored_hash().startswith("pbkdf2_sha256$2000$"))
+
+    @override_settings(PASSWORD_HASHERS=SCRYPT_FIRST)
+    def test_login_upgrades_hash_to_new_algorithm(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(self.stored_hash().startswith("scrypt$"))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_unknown_user(self):
+        response = self.client.post("/auth/token/", {"username": "nobody", "password": "x"}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(PASSWORD_VERIFY_POOL='thread', PASSWORD_VERIFY_WORKERS=1, PASSWORD_VERIFY_TIMEOUT=0.05)
+    def test_thread_pool_answers_503_when_saturated(self):
+        self.assertEqual(self.login().status_code, 200)
+        _, slots = _get_pool()
+        slots.acquire()  # a login in progress
+        try:
+            response = self.login()
+        finally:
+            slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(PASSWORD_VERIFY_POOL='process', PASSWORD_VERIFY_WORKERS=1)
+    def test_process_pool(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+
+    def test_tune_command(self):
+        out, err = StringIO(), StringIO()
+        call_command('tune_password_hasher', '--target-ms', '1', stdout=out, stderr=err)
+        self.assertIn("PASSWORD_HASHER=pbkdf2", out.getvalue())
+        self.assertIn("PASSWORD_PBKDF2_ITERATIONS=100000", out.getvalue())
+        self.assertIn("exceeds the target", err.getvalue())
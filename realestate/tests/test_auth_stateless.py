@@ -0,0 +1,86 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from ..cache import get_cache
+from ..models import Property, Transaction, User
+
+PASSWORD = "StrongPass123!"
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class StatelessTokenAuthTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.user = User.objects.create_user(username="user", password=PASSWORD)
+        self.other = User.objects.create_user(username="other", password=PASSWORD)
+        self.admin = User.objects.create_superuser(username="admin", password=PASSWORD)
+        self.own = Property.objects.create(title="Own", district="Limassol", estimated_value=100000, user=self.user)
+        self.foreign = Property.objects.create(title="Foreign", district="Paphos", estimated_value=100000, user=self.other)
+
+    def client_for(self, user):
+        client = APIClient()
+        response = client.post("/auth/token/", {"username": user.username, "password": PASSWORD}, format="json")
+        self.assertEqual(response.status_code, 200)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def test_requests_do_not_load_the_user(self):
+        client = self.client_for(self.user)
+        self.assertEqual(client.get("/districts/").status_code, 200)
+        with self.assertNumQueries(1):  # the districts only
+            self.assertEqual(client.get("/districts/").status_code, 200)
+
+    def test_owner_and_admin_checks(self):
+        client = self.client_for(self.user)
+        self.assertEqual(client.patch(f"/properties/{self.own.id}/", {"title": "Mine"}, format="json").status_code, 200)
+        self.assertEqual(client.patch(f"/properties/{self.foreign.id}/", {"title": "x"}, format="json").status_code, 403)
+        self.assertEqual(client.patch(f"/users/{self.user.id}/", {"first_name": "Me"}, format="json").status_code, 200)
+        self.assertEqual(client.patch(f"/users/{self.other.id}/", {"first_name": "x"}, format="json").status_code, 403)
+        self.assertEqual(client.get(f"/users/{self.other.id}/portfolio/").status_code, 403)
+        self.assertEqual(client.post("/users/", {"username": "new", "password": "pw"}).status_code, 403)
+
+        response = client.post("/transactions/", {"property": self.foreign.id, "percentage": 10, "price": 100000,
+                                                  "transaction_date": (now() - timedelta(days=1)).isoformat()})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Transaction.objects.get(pk=response.data["id"]).user_id, self.user.id)
+
+        admin = self.client_for(self.admin)
+        self.assertEqual(admin.patch(f"/properties/{self.foreign.id}/", {"title": "y"}, format="json").status_code, 200)
+        self.assertEqual(admin.post("/users/", {"username": "new", "password": "pw"}).status_code, 201)
+
+    def test_deactivation_and_staff_changes_apply_at_once(self):
+        client, admin = self.client_for(self.user), self.client_for(self.admin)
+        self.assertEqual(client.get("/districts/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get("/districts/").status_code, 401)
+
+        self.admin.is_staff = False
+        self.admin.save()
+        self.assertEqual(admin.post("/users/", {"username": "new", "password": "pw"}).status_code, 403)
+
+    def test_password_change_revokes_tokens(self):
+        client = self.client_for(self.user)
+        self.user.set_password("AnotherPass456!")
+        self.user.save()
+        response = client.get("/districts/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"].code, "password_changed")
+
+    def test_changes_bypassing_signals_apply_once_the_state_expires(self):
+        client = self.client_for(self.user)
+        self.assertEqual(client.get("/districts/").status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(client.get("/districts/").status_code, 200)
+        get_cache().clear()  # the JWT_USER_STATE_TTL expiring
+        self.assertEqual(client.get("/districts/").status_code, 401)
+
+    @override_settings(JWT_USER_STATE_TTL=0)
+    def test_without_state_checks_the_claims_are_trusted(self):
+        client = self.client_for(self.admin)
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get("/districts/").status_code, 200)
+        self.admin.delete()
+        self.assertEqual(client.get("/districts/").status_code, 200)
@@ -0,0 +1,119 @@
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from ..analytics import check_summaries
+from ..ledger import check_ledger
+from ..models import DistrictSummary, PortfolioSummary, Property, PropertyAllocation, Transaction, User
+
+
+class ImportRealestateTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.date = (now() - timedelta(days=30)).replace(microsecond=0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, lines):
+        path = self.path / name
+        path.write_text("\n".join(lines) + "\n")
+        return str(path)
+
+    def write_users(self, *ids):
+        return self.write("users.csv", ["id,username,password,email,is_staff"] +
+                          [f"{pk},investor{pk},,investor{pk}@example.com,False" for pk in ids])
+
+    def write_properties(self, *rows):
+        return self.write("properties.csv", ["id,title,district,estimated_value,user_id"] +
+                          [f"{pk},Villa {pk},{district},{value},{owner}" for pk, district, value, owner in rows])
+
+    def write_transactions(self, *rows):
+        return self.write("transactions.ndjson", [json.dumps({
+            "id": pk, "user_id": user_id, "property_id": property_id, "percentage": percentage, "price": price,
+            "transaction_date": (self.date + timedelta(minutes=pk)).isoformat()})
+            for pk, user_id, property_id, percentage, price in rows])
+
+    def run_import(self, **files):
+        stdout = StringIO()
+        arguments = [f"--{name}={path}" for name, path in files.items()]
+        call_command('import_realestate', *arguments, '--chunk-size', '2', stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_files_are_loaded_with_their_ids_and_the_ledger_is_rebuilt(self):
+        output = self.run_import(
+            users=self.write_users(10, 11, 12),
+            properties=self.write_properties((20, "Limassol", 200000, 10), (21, "Paphos", 100000, 11)),
+            transactions=self.write_transactions((30, 11, 20, "40.00", 250000), (31, 12, 20, "35.50", 180000),
+                                                 (32, 10, 21, "80.00", 120000)),
+        )
+        self.assertIn("realestate_transaction: 3 rows", output)
+        self.assertIn("Imported 3 users, 2 properties, 3 transactions", output)
+        self.assertIn("rows/s", output)
+
+        self.assertEqual(list(User.objects.order_by('id').values_list('id', 'username')),
+                         [(10, "investor10"), (11, "investor11"), (12, "investor12")])
+        self.assertFalse(User.objects.get(pk=10).has_usable_password())
+        self.assertEqual(Transaction.objects.get(pk=31).percentage, Decimal("35.50"))
+        self.assertEqual(PropertyAllocation.objects.get(pk=20).total_percentage, Decimal("75.50"))
+        self.assertEqual(DistrictSummary.objects.get(pk="Limassol").transaction_count, 2)
+        self.assertEqual(PortfolioSummary.objects.get(pk=10).property_count, 1)
+        self.assertEqual(check_ledger() + check_summaries(), [])
+        # The sequences continue after the imported ids
+        self.assertGreater(User.objects.create_user(username="next").id, 12)
+        self.assertGreater(Property.objects.create(title="Next", district="Nicosia", estimated_value=100000,
+                                                   user_id=10).id, 21)
+
+    @override_settings(API_CACHE_TIMEOUT=300)
+    def test_transactions_of_existing_properties_reach_the_cached_lists(self):
+        self.run_import(users=self.write_users(1, 2), properties=self.write_properties((5, "Larnaca", 100000, 1)))
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=1))
+        self.assertEqual(client.get("/transactions/?property_id=5").json()["results"], [])
+
+        self.run_import(transactions=self.write_transactions((7, 2, 5, "10.00", 100000)))
+        self.assertEqual([row["id"] for row in client.get("/transactions/?property_id=5").json()["results"]], [7])
+
+    def test_broken_ownership_rules_roll_back_the_whole_import(self):
+        with self.assertRaises(CommandError) as context:
+            self.run_import(
+                users=self.write_users(1, 2, 3),
+                properties=self.write_properties((5, "Larnaca", 100000, 1)),
+                transactions=self.write_transactions((1, 1, 5, "60.00", 100000), (2, 2, 5, "45.00", 100000),
+                                                     (3, 3, 5, "85.00", 100000)),
+            )
+        message = str(context.exception)
+        self.assertRegex(message, r"Property 5: 190(\.00)?% sold")
+        self.assertRegex(message, r"User 3 owns 85(\.00)?% of property 5")
+        self.assertEqual((User.objects.count(), Property.objects.count(), Transaction.objects.count()), (0, 0, 0))
+
+    def test_out_of_band_prices_and_unknown_districts_are_reported(self):
+        with self.assertRaises(CommandError) as context:
+            self.run_import(
+                users=self.write_users(1),
+                properties=self.write_properties((5, "Atlantis", 100000, 1), (6, "Paphos", 100000, 1)),
+                transactions=self.write_transactions((1, 1, 6, "10.00", 160000)),
+            )
+        message = str(context.exception)
+        self.assertIn("Property 5: unknown district 'Atlantis'", message)
+        self.assertIn("Transaction 1: percentage 10.00, price 160000.00", message)
+
+    def test_unparsable_rows_and_missing_references_are_rejected(self):
+        users = self.write_users(1)
+        properties = self.write("properties.csv", ["id,title,district,estimated_value,user_id",
+                                                   "5,Villa,Paphos,100000,1", "6,Villa,Paphos,lots,1"])
+        with self.assertRaisesMessage(CommandError, "properties.csv, line 3: estimated_value"):
+            self.run_import(users=users, properties=properties)
+
+        with self.assertRaises(CommandError):
+            self.run_import(users=users, properties=self.write_properties((5, "Paphos", 100000, 99)))
+        self.assertFalse(User.objects.exists())
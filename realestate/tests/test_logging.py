@@ -0,0 +1,80 @@
+import io
+import json
+import logging
+import os
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from ..log import JSONFormatter, QueuedHandler, RequestContextFilter, log_context
+from ..models import User
+
+
+class LoggingTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.stream = io.StringIO()
+        self.handler = QueuedHandler(self.stream)
+        self.handler.setFormatter(JSONFormatter())
+        self.handler.addFilter(RequestContextFilter())
+        self.logger = logging.getLogger('realestate')
+        self.previous = self.logger.handlers, self.logger.level
+        self.logger.handlers = [self.handler]
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.handlers = self.previous[0]
+        self.logger.setLevel(self.previous[1])
+        self.handler.close()
+
+    def records(self):
+        self.handler.flush()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_written_as_json_with_extra_fields(self):
+        with log_context("req-1"):
+            self.logger.info("[%s] %s ID=%s", "CREATE", "Property", 7, extra={"object_id": 7})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("Failed %s", "write")
+        created, failed = self.records()
+        self.assertEqual(created["message"], "[CREATE] Property ID=7")
+        self.assertEqual((created["level"], created["request_id"], created["object_id"]), ("INFO", "req-1", 7))
+        self.assertEqual(failed["message"], "Failed write")
+        self.assertNotIn("request_id", failed)
+        self.assertIn("ValueError: boom", failed["exception"])
+
+    def test_debug_records_of_unsampled_requests_are_dropped(self):
+        with log_context(sample_rate=0):
+            self.logger.debug("dropped")
+            self.logger.info("kept")
+        with log_context(sample_rate=1):
+            self.logger.debug("sampled")
+        self.logger.debug("outside a request")
+        self.assertEqual([record["message"] for record in self.records()], ["kept", "sampled", "outside a request"])
+
+    def test_full_queue_drops_records_instead_of_blocking(self):
+        handler = QueuedHandler(io.StringIO(), queue_size=1)
+        handler._listener_pid = os.getpid()  # as if the listener were running, but nothing drains the queue
+        for _ in range(3):
+            handler.handle(logging.makeLogRecord({"msg": "record"}))
+        self.assertEqual((handler.queue.qsize(), handler.dropped), (1, 2))
+
+    @override_settings(LOG_DEBUG_SAMPLE_RATE=1.0)
+    def test_requests_log_with_their_request_id(self):
+        user = User.objects.create_user(username="user", password="pass1234")
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post("/properties/", {"title": "Villa", "district": "Limassol",
+                                                "estimated_value": 100000}, format="json")
+        self.assertEqual(response.status_code, 201)
+        request_id = response["X-Request-ID"]
+        property_id = response.json()["id"]
+        response = client.get("/properties/", HTTP_X_REQUEST_ID="client-id.1")
+        self.assertEqual(response["X-Request-ID"], "client-id.1")
+        invalid = client.get("/properties/", HTTP_X_REQUEST_ID="not a valid id")
+        self.assertNotEqual(invalid["X-Request-ID"], "not a valid id")
+
+        created = next(record for record in self.records() if record.get("action") == "create")
+        self.assertEqual(created["request_id"], request_id)
+        self.assertEqual((created["model"], created["object_id"], created["user_id"]), ("Property", property_id, user.id))
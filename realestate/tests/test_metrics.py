@@ -0,0 +1,104 @@
+import re
+import time
+from unittest import mock
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from ..metrics import METRICS
+from ..models import Property, Transaction, User
+from ..serializers.rows import RowEncoder
+
+
+def server_timing(response):
+    return {name: dict(param.split('=', 1) for param in params)
+            for name, *params in (metric.split(';') for metric in response['Server-Timing'].split(', '))}
+
+
+@override_settings(METRICS_TOKEN="scrape-token")
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        for metric in METRICS:
+            metric.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.client.force_authenticate(user=self.user)
+        self.property = Property.objects.create(title="Villa", district="Limassol", estimated_value=500000,
+                                                user=self.user)
+        Transaction.objects.create(user=self.user, property=self.property, percentage=10, price=400000,
+                                   transaction_date=now())
+
+    def scrape(self):
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_server_timing_reports_the_request_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/transactions/?property_id={self.property.id}")
+        self.assertEqual(response.status_code, 200)
+        timing = server_timing(response)
+        self.assertEqual(timing["db"]["desc"], f'"{len(queries)} queries"')
+        self.assertGreater(float(timing["total"]["dur"]), 0)
+        self.assertGreater(float(timing["serialize"]["dur"]), 0)
+        self.assertEqual(float(timing["lock"]["dur"]), 0)
+
+    def test_transaction_create_is_observed_with_its_lock_wait(self):
+        response = self.client.post("/transactions/", {
+            "property": self.property.id, "percentage": 10, "price": 400000, "transaction_date": now().isoformat(),
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(float(server_timing(response)["lock"]["dur"]), 0)
+        self.client.get("/transactions/")
+
+        metrics = self.scrape()
+        labels = 'view="transaction",action="create"'
+        self.assertIn(f'realestate_requests_total{{{labels},status="201"}} 1', metrics)
+        self.assertIn(f'realestate_request_lock_wait_seconds_count{{{labels}}} 1', metrics)
+        self.assertIn(f'realestate_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', metrics)
+        self.assertRegex(metrics, rf'realestate_request_queries_sum{{{labels}}} [1-9]')
+        # Reads take no lock, so they have no lock-wait series
+        self.assertIn('realestate_request_db_seconds_count{view="transaction",action="list"} 1', metrics)
+        self.assertNotIn('realestate_request_lock_wait_seconds_count{view="transaction",action="list"}', metrics)
+
+    @override_settings(TRANSACTION_CONCURRENCY_MODE="optimistic")
+    def test_optimistic_create_records_the_version_claim_as_lock_wait(self):
+        response = self.client.post("/transactions/", {
+            "property": self.property.id, "percentage": 10, "price": 400000, "transaction_date": now().isoformat(),
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        timing = server_timing(response)
+        self.assertGreater(float(timing["lock"]["dur"]), 0)
+        self.assertGreater(float(timing["serialize"]["dur"]), 0)
+        self.assertIn('realestate_request_lock_wait_seconds_count{view="transaction",action="create"} 1',
+                      self.scrape())
+
+    def test_serialize_includes_encoding_the_rows(self):
+        encode = RowEncoder.encode
+
+        def slow_encode(encoder, row):
+            time.sleep(0.02)
+            return encode(encoder, row)
+
+        with mock.patch.object(RowEncoder, "encode", slow_encode):
+            response = self.client.get("/transactions/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(float(server_timing(response)["serialize"]["dur"]), 20)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for _ in range(3):
+            self.client.get("/properties/")
+        buckets = re.findall(r'realestate_request_queries_bucket\{view="property",action="list",le="[^"]+"\} (\d+)',
+                             self.scrape())
+        counts = [int(count) for count in buckets]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 3)
+
+    def test_metrics_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 401)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer ").status_code, 404)
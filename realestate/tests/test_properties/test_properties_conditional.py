@@ -0,0 +1,43 @@
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase
+from ...models import Property, User
+
+
+class PropertyConditionalRequestTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property = Property.objects.create(title="Prop", district="Limassol", estimated_value=100000, user=self.user)
+        self.url = f"/properties/{self.property.id}/"
+
+    def test_retrieve_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertIn("ETag", response)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_modified_after_update(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.patch(self.url, {"title": "Renamed"}, format="json")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], "Renamed")
+
+    def test_update_with_stale_if_match(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.patch(self.url, {"title": "First"}, format="json")
+        response = self.client.patch(self.url, {"title": "Second"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.title, "First")
+
+    def test_update_with_matching_if_match(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.put(self.url, {"title": "New", "district": "Paphos", "estimated_value": 100000},
+                                   format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
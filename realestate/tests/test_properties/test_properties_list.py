@@ -30,5 +30,5 @@ class PropertyListTests(TestCase):
         Property.objects.create(title="Mountain Villa", district="Nicosia", estimated_value=750000, user=self.user)
         response = self.client.get("/properties/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)  # At least one property
-        self.assertIn("title", response.data[0])
\ No newline at end of file
+        self.assertGreaterEqual(len(response.data['results']), 1)  # At least one property
+        self.assertIn("title", response.data['results'][0])
\ No newline at end of file
@@ -0,0 +1,55 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...models import Property, User
+
+
+class PropertyOwnerScopedWriteTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass1234")
+        self.other_user = User.objects.create_user(username="other", email="other@example.com", password="pass1234")
+        self.admin = User.objects.create_user(username="admin", email="admin@example.com", password="pass1234",
+                                              is_staff=True)
+        self.property = Property.objects.create(title="Beach House", district="Limassol",
+                                                estimated_value=500000, user=self.user)
+        self.other_property = Property.objects.create(title="Other's House", district="Nicosia",
+                                                      estimated_value=300000, user=self.other_user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_update_looks_the_property_up_by_owner_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f"/properties/{self.property.id}/", {"title": "Villa"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lookups = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(lookups), 1)
+        self.assertIn('"user_id" =', lookups[0])
+
+    def test_other_users_property_is_rejected_without_loading_it(self):
+        for method in ("patch", "delete"):
+            with self.subTest(method=method), CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(f"/properties/{self.other_property.id}/",
+                                                        {"title": "Hacked"}, format="json")
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+                # The scoped lookup, then EXISTS (a PATCH also opens its transaction)
+                reads = [query['sql'] for query in queries if query['sql'].startswith('SELECT')]
+                self.assertEqual(len(reads), 2)
+                self.assertIn('"user_id" =', reads[0])
+        self.other_property.refresh_from_db()
+        self.assertEqual(self.other_property.title, "Other's House")
+
+    def test_missing_property_is_not_found(self):
+        response = self.client.delete("/properties/999999/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_admin_writes_are_not_scoped(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(f"/properties/{self.other_property.id}/", {"title": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(f"/properties/{self.other_property.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Property.objects.filter(pk=self.other_property.id).exists())
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...ledger import check_ledger
+from ...models import Property, PropertyAllocation, Transaction, User
+
+
+class PropertyRevaluationTests(TestCase):
+
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property = Property.objects.create(title="House", district="Limassol", estimated_value=200000, user=self.user)
+
+    def add_transaction(self, price, minutes=0):
+        return Transaction.objects.create(user=self.user, property=self.property, percentage=10, price=price,
+                                          transaction_date=now() - timedelta(days=1, minutes=minutes))
+
+    def bounds(self):
+        allocation = PropertyAllocation.objects.get(property=self.property)
+        return allocation.min_price, allocation.max_price
+
+    def test_price_band_follows_transaction_writes(self):
+        self.assertEqual(self.bounds(), (None, None))
+        low = self.add_transaction(150000, minutes=1)
+        high = self.add_transaction(250000, minutes=2)
+        self.assertEqual(self.bounds(), (Decimal('150000'), Decimal('250000')))
+
+        high.price = 220000
+        high.save()
+        self.assertEqual(self.bounds(), (Decimal('150000'), Decimal('220000')))
+
+        low.delete()
+        self.assertEqual(self.bounds(), (Decimal('220000'), Decimal('220000')))
+        high.delete()
+        self.assertEqual(self.bounds(), (None, None))
+        self.assertEqual(check_ledger(), [])
+
+    def test_bulk_create_extends_price_band(self):
+        self.add_transaction(200000)
+        rows = [{"property": self.property.id, "percentage": "5.00", "price": str(price),
+                 "transaction_date": (now() - timedelta(hours=index + 1)).isoformat()}
+                for index, price in enumerate([120000, 280000])]
+        response = self.client.post("/transactions/bulk/", {"transactions": rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.bounds(), (Decimal('120000'), Decimal('280000')))
+        self.assertEqual(check_ledger(), [])
+
+    def test_revaluation_checks_band_without_scanning_transactions(self):
+        self.add_transaction(150000, minutes=1)
+        self.add_transaction(250000, minutes=2)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f"/properties/{self.property.id}/", {"estimated_value": 300000}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # band 150k..450k holds both prices
+        self.assertFalse([q['sql'] for q in queries if 'FROM "realestate_transaction"' in q['sql']])
+
+        # 150,000 falls below 50% of 310,000
+        response = self.client.patch(f"/properties/{self.property.id}/", {"estimated_value": 310000}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("estimated_value", response.data)
+        # 250,000 rises above 150% of 160,000
+        response = self.client.patch(f"/properties/{self.property.id}/", {"estimated_value": 160000}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.property.refresh_from_db()
+        self.assertEqual(self.property.estimated_value, Decimal('300000'))
+
+    def test_rebuild_restores_price_band(self):
+        self.add_transaction(180000)
+        PropertyAllocation.objects.filter(property=self.property).update(min_price=None, max_price=None)
+        self.assertEqual(len(check_ledger()), 2)  # min_price and max_price
+        call_command('rebuild_ownership_ledger')
+        self.assertEqual(self.bounds(), (Decimal('180000'), Decimal('180000')))
+        self.assertEqual(check_ledger(), [])
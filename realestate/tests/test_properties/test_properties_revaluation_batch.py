@@ -0,0 +1,85 @@
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...models import Property, Transaction, User
+
+
+class PropertyBatchRevaluationTests(TestCase):
+
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.other = User.objects.create_user(username="other", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.houses = [Property.objects.create(title=f"House {i}", district="Limassol", estimated_value=200000,
+                                               user=self.user) for i in range(3)]
+        self.foreign = Property.objects.create(title="Foreign", district="Paphos", estimated_value=200000, user=self.other)
+        # 250,000 only fits valuations between ~166,667 and 500,000
+        Transaction.objects.create(user=self.user, property=self.houses[2], percentage=10, price=250000,
+                                   transaction_date=now() - timedelta(days=1))
+
+    def upload(self, name, content):
+        return self.client.post("/properties/revaluations/", {"file": SimpleUploadedFile(name, content.encode())},
+                                format='multipart')
+
+    @override_settings(API_CACHE_TIMEOUT=300)
+    def test_csv_upload_applies_valid_rows_and_reports_rejects(self):
+        before = Property.objects.get(pk=self.houses[0].pk).updated_at
+        self.client.get(f"/properties/{self.houses[0].pk}/")  # warm the response cache
+        content = "property_id,estimated_value\n" + "\n".join([
+            f"{self.houses[0].pk},300000",
+            f"{self.houses[1].pk},abc",
+            f"{self.houses[2].pk},150000",
+            f"{self.foreign.pk},300000",
+            "999999,300000",
+            f"{self.houses[0].pk},310000",
+        ]) + "\n"
+        response = self.upload("values.csv", content)
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data["applied"], 1)
+        self.assertEqual(response.data["rejected"], 5)
+        errors = {reject["line"]: reject["error"] for reject in response.data["rejects"]}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6, 7])
+        self.assertIn("estimated_value", errors[3])
+        self.assertIn("50%-150%", errors[4])
+        self.assertIn("permission", errors[5])
+        self.assertIn("does not exist", errors[6])
+        self.assertIn("more than once", errors[7])
+
+        house = Property.objects.get(pk=self.houses[0].pk)
+        self.assertEqual(house.estimated_value, Decimal('300000'))
+        self.assertGreater(house.updated_at, before)
+        self.assertEqual(self.client.get(f"/properties/{house.pk}/").data["estimated_value"], "300000.00")
+        self.assertEqual(Property.objects.get(pk=self.houses[2].pk).estimated_value, Decimal('200000'))
+        self.assertEqual(Property.objects.get(pk=self.foreign.pk).estimated_value, Decimal('200000'))
+
+    def test_upload_needs_a_known_format(self):
+        response = self.upload("values.txt", "property_id,estimated_value\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file_format", response.data)
+
+    def test_command_applies_ndjson_and_writes_rejects_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "values.ndjson"
+            rows = [{"property_id": house.pk, "estimated_value": "180000"} for house in self.houses]
+            path.write_text("\n".join(json.dumps(row) for row in rows) + "\nnot json\n")
+
+            stdout, stderr = StringIO(), StringIO()
+            call_command('revalue_properties', str(path), '--chunk-size', '2', stdout=stdout, stderr=stderr)
+
+            self.assertIn("Revalued 3 properties (1 rejected)", stdout.getvalue())
+            self.assertIn("rows/s", stdout.getvalue())
+            rejects = [json.loads(line) for line in Path(f"{path}.rejects.ndjson").read_text().splitlines()]
+        self.assertEqual([reject["line"] for reject in rejects], [4])
+        self.assertEqual(Property.objects.filter(estimated_value=180000).count(), 3)
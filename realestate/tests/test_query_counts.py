@@ -0,0 +1,210 @@
+import re
+from collections import Counter
+from datetime import timedelta
+from itertools import count
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from ..models import DistrictSummary, Property, Transaction, User
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r"IN \((?:\?, )*\?\)")
+SAVEPOINTS = re.compile(r'SAVEPOINT "\w+"')
+
+
+def normalize(sql):
+    """The statement without its literals, so repeats of one query with different ids compare equal."""
+    return IN_LISTS.sub("IN (...)", LITERALS.sub("?", SAVEPOINTS.sub("SAVEPOINT ?", sql)))
+
+
+def query_report(small, large, volumes):
+    """Which statements ran more often at the larger volume, then every query of that run."""
+    small_counts, large_counts = Counter(map(normalize, small)), Counter(map(normalize, large))
+    grown = [(sql, small_counts[sql], n) for sql, n in large_counts.items() if n != small_counts[sql]]
+    lines = [f"{len(small)} queries with {volumes[0]} seeded rows per table, {len(large)} with {volumes[1]}.",
+             "Statements whose count changed:"]
+    lines += [f"  {before} -> {after}: {sql}" for sql, before, after in grown]
+    lines.append(f"Queries with {volumes[1]} rows:")
+    lines += [f"  {index}. {sql}" for index, sql in enumerate(large, 1)]
+    return "\n".join(lines)
+
+
+@override_settings(API_CACHE_TIMEOUT=0)  # every request reads the database
+class QueryCountTests(TestCase):
+    """
+    Every CRUD action of the user, property and transaction endpoints runs a fixed number of
+    queries: the same with few rows as with many rows behind the request.
+    """
+    VOLUMES = (2, 20)
+
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.sequence = count(1)
+        # As created by the migrations, which flush empties
+        DistrictSummary.objects.bulk_create(DistrictSummary(district=district) for district, _ in Property.DISTRICT_CHOICES)
+        # Users are seeded without a password: hashing one costs as much as the rest of a test
+        self.owner = User.objects.create_user(username="owner")
+        self.admin = User.objects.create_user(username="admin", is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property = Property.objects.create(title="Owned", district="Limassol", estimated_value=100000,
+                                                    user=self.owner)
+            self.transaction = self.buy(self.owner, self.property)
+        self.users, self.properties = [], []
+        self.client = self.client_for(self.owner)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def buy(self, user, property_obj, percentage=1):
+        return Transaction.objects.create(user=user, property=property_obj, percentage=percentage, price=100000,
+                                          transaction_date=now() - timedelta(days=next(self.sequence)))
+
+    def grow(self, rows):
+        """Add ``rows`` users, each owning a property the owner buys into and a share of the owner's property."""
+        districts = [choice for choice, _ in Property.DISTRICT_CHOICES]
+        # The summaries are updated after commit, as they would be outside the test transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(rows):
+                index = next(self.sequence)
+                user = User.objects.create_user(username=f"investor{index}")
+                property_obj = Property.objects.create(title=f"Property {index}",
+                                                       district=districts[index % len(districts)],
+                                                       estimated_value=100000, user=user)
+                self.buy(user, self.property)
+                self.buy(self.owner, property_obj)
+                self.users.append(user)
+                self.properties.append(property_obj)
+
+    def assertConstantQueries(self, request, prepare=None, status=None):
+        """
+        Run ``request(target)`` after seeding each of ``VOLUMES`` (``prepare()`` builds the target
+        once the data is in) and fail with the offending SQL if the query count moved. The queries
+        run after commit (summary updates) are counted with the request's.
+        """
+        runs = []
+        for previous, volume in zip((0, *self.VOLUMES), self.VOLUMES):
+            self.grow(volume - previous)
+            with self.captureOnCommitCallbacks(execute=True):
+                target = prepare() if prepare else None
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                response = request(target)
+            if status is not None:
+                self.assertEqual(response.status_code, status, getattr(response, 'data', response))
+            runs.append([query['sql'] for query in queries.captured_queries])
+        small, large = runs
+        if len(small) != len(large):
+            self.fail("Query count depends on the data volume\n" + query_report(small, large, self.VOLUMES))
+
+    def new_property(self):
+        """A property of the owner with a share bought by every seeded user."""
+        property_obj = Property.objects.create(title="Doomed", district="Paphos", estimated_value=100000,
+                                               user=self.owner)
+        for user in self.users:
+            self.buy(user, property_obj)
+        return property_obj
+
+    # Users
+
+    def test_user_list(self):
+        self.assertConstantQueries(lambda _: self.client.get("/users/"), status=200)
+
+    def test_user_retrieve(self):
+        self.assertConstantQueries(lambda _: self.client.get(f"/users/{self.owner.id}/"), status=200)
+
+    def test_user_create(self):
+        admin = self.client_for(self.admin)
+        self.assertConstantQueries(lambda _: admin.post("/users/", {
+            "username": f"new{next(self.sequence)}", "password": "pass1234"}, format="json"), status=201)
+
+    def test_user_update(self):
+        self.assertConstantQueries(lambda _: self.client.put(f"/users/{self.owner.id}/", {
+            "username": "owner", "password": "pass1234", "first_name": "Owner"}, format="json"), status=200)
+
+    def test_user_partial_update(self):
+        self.assertConstantQueries(lambda _: self.client.patch(f"/users/{self.owner.id}/", {
+            "email": f"owner{next(self.sequence)}@example.com"}, format="json"), status=200)
+
+    def test_user_destroy(self):
+        admin = self.client_for(self.admin)
+
+        def prepare():
+            # An investor with as many properties and transactions as there are seeded users
+            user = User.objects.create_user(username=f"leaving{next(self.sequence)}")
+            for index, _ in enumerate(self.users):
+                property_obj = Property.objects.create(title=f"Leaving {index}", district="Larnaca",
+                                                       estimated_value=100000, user=user)
+                self.buy(user, property_obj)
+            return user
+
+        self.assertConstantQueries(lambda user: admin.delete(f"/users/{user.id}/"), prepare, status=204)
+
+    # Properties
+
+    def test_property_list(self):
+        self.assertConstantQueries(lambda _: self.client.get("/properties/"), status=200)
+
+    def test_property_retrieve(self):
+        self.assertConstantQueries(lambda _: self.client.get(f"/properties/{self.property.id}/"), status=200)
+
+    def test_property_create(self):
+        self.assertConstantQueries(lambda _: self.client.post("/properties/", {
+            "title": "New", "district": "Nicosia", "estimated_value": 100000}, format="json"), status=201)
+
+    def test_property_update(self):
+        self.assertConstantQueries(lambda _: self.client.put(f"/properties/{self.property.id}/", {
+            "title": "Renamed", "district": "Limassol", "estimated_value": 100000 + next(self.sequence)},
+            format="json"), status=200)
+
+    def test_property_partial_update(self):
+        self.assertConstantQueries(lambda _: self.client.patch(f"/properties/{self.property.id}/", {
+            "title": f"Renamed {next(self.sequence)}"}, format="json"), status=200)
+
+    def test_property_revaluation(self):
+        self.assertConstantQueries(lambda _: self.client.patch(f"/properties/{self.property.id}/", {
+            "estimated_value": 100000 + next(self.sequence)}, format="json"), status=200)
+
+    def test_property_destroy(self):
+        self.assertConstantQueries(lambda property_obj: self.client.delete(f"/properties/{property_obj.id}/"),
+                                   self.new_property, status=204)
+
+    # Transactions
+
+    def test_transaction_list(self):
+        self.assertConstantQueries(lambda _: self.client.get("/transactions/"), status=200)
+
+    def test_transaction_list_by_property(self):
+        self.assertConstantQueries(
+            lambda _: self.client.get(f"/transactions/?property_id={self.property.id}&ordering=-price"), status=200)
+
+    def test_transaction_retrieve(self):
+        self.assertConstantQueries(lambda _: self.client.get(f"/transactions/{self.transaction.id}/"), status=200)
+
+    def test_transaction_create(self):
+        self.assertConstantQueries(lambda _: self.client.post("/transactions/", {
+            "property": self.property.id, "percentage": 1, "price": 100000,
+            "transaction_date": (now() - timedelta(days=next(self.sequence))).isoformat()}, format="json"), status=201)
+
+    def test_transaction_update(self):
+        self.assertConstantQueries(lambda _: self.client.put(f"/transactions/{self.transaction.id}/", {
+            "property": self.property.id, "percentage": 1, "price": 100000 + next(self.sequence),
+            "transaction_date": self.transaction.transaction_date.isoformat()}, format="json"), status=200)
+
+    def test_transaction_partial_update(self):
+        self.assertConstantQueries(lambda _: self.client.patch(f"/transactions/{self.transaction.id}/", {
+            "price": 100000 + next(self.sequence)}, format="json"), status=200)
+
+    def test_transaction_destroy(self):
+        self.assertConstantQueries(lambda transaction: self.client.delete(f"/transactions/{transaction.id}/"),
+                                   lambda: self.buy(self.owner, self.property), status=204)
+
+    def test_report_shows_the_repeated_statement(self):
+        small = ['SELECT "a" FROM "t" WHERE "id" = 1']
+        large = ['SELECT "a" FROM "t" WHERE "id" = 1', 'SELECT "a" FROM "t" WHERE "id" = 2']
+        report = query_report(small, large, (2, 20))
+        self.assertIn('1 -> 2: SELECT "a" FROM "t" WHERE "id" = ?', report)
+        self.assertIn('2. SELECT "a" FROM "t" WHERE "id" = 2', report)
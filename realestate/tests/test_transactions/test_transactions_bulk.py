@@ -0,0 +1,82 @@
+from decimal import Decimal
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase
+from ...ledger import check_ledger
+from ...models import Property, PropertyAllocation, Transaction, User
+
+
+class TransactionBulkTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property1 = Property.objects.create(title="Prop1", district="Limassol", estimated_value=100000, user=self.user)
+        self.property2 = Property.objects.create(title="Prop2", district="Nicosia", estimated_value=200000, user=self.user)
+        self.date = now() - timedelta(days=1)
+
+    def row(self, property_obj, percentage, price, minutes=0):
+        return {
+            "property": property_obj.id,
+            "percentage": percentage,
+            "price": price,
+            "transaction_date": (self.date + timedelta(minutes=minutes)).isoformat(),
+        }
+
+    def test_bulk_create_success(self):
+        payload = {"transactions": [
+            self.row(self.property1, 30, 100000),
+            self.row(self.property2, 20, 200000),
+            self.row(self.property1, 40, 100000, minutes=1),
+        ]}
+        response = self.client.post("/transactions/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual([r["status"] for r in response.data["results"]], ["created"] * 3)
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(PropertyAllocation.objects.get(property=self.property1).total_percentage, Decimal("70"))
+        self.assertEqual(check_ledger(), [])
+
+    def test_bulk_rules_are_cumulative(self):
+        payload = {"transactions": [
+            self.row(self.property1, 50, 100000),
+            self.row(self.property1, 40, 100000, minutes=1),  # 90% for one user
+        ]}
+        response = self.client.post("/transactions/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["results"][0]["index"], 1)
+        self.assertIn("percentage", response.data["results"][0]["errors"])
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_bulk_atomic_rejects_whole_batch(self):
+        payload = {"transactions": [
+            self.row(self.property1, 10, 100000),
+            self.row(self.property2, 10, 10000),  # price outside band
+            {"property": 999999, "percentage": 10, "price": 100000, "transaction_date": self.date.isoformat()},
+        ]}
+        response = self.client.post("/transactions/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["failed"], 2)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_bulk_partial_creates_valid_rows(self):
+        payload = {"mode": "partial", "transactions": [
+            self.row(self.property1, 10, 100000),
+            self.row(self.property1, 10, 100000),  # duplicate date in the same batch
+            self.row(self.property2, 10, 10000),
+        ]}
+        response = self.client.post("/transactions/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        statuses = [r["status"] for r in response.data["results"]]
+        self.assertEqual(statuses, ["created", "error", "error"])
+        self.assertIn("non_field_errors", response.data["results"][1]["errors"])
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(check_ledger(), [])
+
+    def test_bulk_requires_rows(self):
+        response = self.client.post("/transactions/bulk/", {"transactions": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
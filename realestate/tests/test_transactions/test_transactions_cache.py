@@ -0,0 +1,83 @@
+from django.core.management import call_command
+from django.utils.timezone import now
+from datetime import timedelta
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase, override_settings
+from ...models import Property, Transaction, User
+
+
+@override_settings(API_CACHE_TIMEOUT=300)
+class TransactionCacheTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property1 = Property.objects.create(title="Prop1", district="Limassol", estimated_value=100000, user=self.user)
+        self.property2 = Property.objects.create(title="Prop2", district="Nicosia", estimated_value=200000, user=self.user)
+        self.tx1 = Transaction.objects.create(user=self.user, property=self.property1, percentage=20, price=50000,
+                                              transaction_date=now() - timedelta(days=1))
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self.get("/transactions/")["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            response = self.get("/transactions/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_query_parameters_are_normalized(self):
+        self.get("/transactions/?min_price=1&max_price=100000")
+        self.assertEqual(self.get("/transactions/?max_price=100000&min_price=1")["X-Cache"], "HIT")
+
+    def test_create_invalidates_list(self):
+        self.get("/transactions/")
+        data = {"property": self.property2.id, "percentage": 10, "price": 200000, "transaction_date": now().isoformat()}
+        self.assertEqual(self.client.post("/transactions/", data, format="json").status_code, status.HTTP_201_CREATED)
+        response = self.get("/transactions/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_property_filtered_list_only_depends_on_that_property(self):
+        self.get(f"/transactions/?property_id={self.property1.id}")
+        Transaction.objects.create(user=self.user, property=self.property2, percentage=10, price=200000,
+                                   transaction_date=now())
+        self.assertEqual(self.get(f"/transactions/?property_id={self.property1.id}")["X-Cache"], "HIT")
+        self.tx1.percentage = 30
+        self.tx1.save()
+        response = self.get(f"/transactions/?property_id={self.property1.id}")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["results"][0]["percentage"], "30.00")
+
+    def test_district_change_invalidates_filtered_list(self):
+        self.assertEqual(len(self.get("/transactions/?district=Paphos").data["results"]), 0)
+        self.client.patch(f"/properties/{self.property1.id}/", {"district": "Paphos"}, format="json")
+        self.assertEqual(len(self.get("/transactions/?district=Paphos").data["results"]), 1)
+
+    def test_cascade_delete_invalidates_list(self):
+        self.get("/transactions/")
+        self.property1.delete()
+        self.assertEqual(len(self.get("/transactions/").data["results"]), 0)
+
+    def test_property_detail_is_cached_and_invalidated(self):
+        url = f"/properties/{self.property1.id}/"
+        self.get(url)
+        self.assertEqual(self.get(url)["X-Cache"], "HIT")
+        self.client.patch(url, {"title": "Renamed"}, format="json")
+        response = self.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["title"], "Renamed")
+
+    def test_missing_property_is_not_cached(self):
+        self.assertEqual(self.client.get("/properties/999999/").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get("/properties/999999/").status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(API_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self):
+        self.get("/transactions/")
+        self.assertNotIn("X-Cache", self.get("/transactions/"))
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase
+from ...models import Property, Transaction, User
+
+
+class TransactionConditionalRequestTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property = Property.objects.create(title="Prop", district="Limassol", estimated_value=100000, user=self.user)
+        self.transaction = Transaction.objects.create(user=self.user, property=self.property, percentage=20,
+                                                      price=50000, transaction_date=now() - timedelta(days=1))
+        self.list_url = f"/transactions/?property_id={self.property.id}"
+        self.detail_url = f"/transactions/{self.transaction.id}/"
+
+    def test_list_not_modified(self):
+        response = self.client.get(self.list_url)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_list_etag_changes_on_write(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        self.client.patch(self.detail_url, {"percentage": 30}, format="json")
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_if_modified_since(self):
+        last_modified = self.client.get(self.list_url)["Last-Modified"]
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_not_modified(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_update_with_matching_if_match(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        response = self.client.patch(self.detail_url, {"percentage": 30}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(self.detail_url)["ETag"], response["ETag"])
+
+    def test_update_with_stale_if_match(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.client.patch(self.detail_url, {"percentage": 30}, format="json")
+        response = self.client.patch(self.detail_url, {"percentage": 40}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.percentage, 30)
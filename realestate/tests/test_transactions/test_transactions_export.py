@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase
+from ...models import Property, Transaction, User
+from ...serializers.transaction import TransactionSerializer
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property1 = Property.objects.create(title="Prop1", district="Limassol", estimated_value=100000, user=self.user)
+        self.property2 = Property.objects.create(title="Prop2", district="Nicosia", estimated_value=200000, user=self.user)
+        self.tx1 = Transaction.objects.create(user=self.user, property=self.property1, percentage=20, price=50000,
+                                              transaction_date=now())
+        self.tx2 = Transaction.objects.create(user=self.user, property=self.property2, percentage=12.5, price=150000,
+                                              transaction_date=now() - timedelta(days=3))
+
+    def content(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode()
+
+    def test_export_ndjson_matches_serializer_output(self):
+        response = self.client.get("/transactions/export/")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        expected = TransactionSerializer(Transaction.objects.order_by('price', 'transaction_date'), many=True).data
+        self.assertEqual(rows, json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        response = self.client.get("/transactions/export/?export_format=csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(self.content(response))))
+        self.assertEqual(rows[0][:3], ["id", "user", "property"])
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.tx1.id), str(self.tx2.id)])
+        self.assertEqual(rows[2][3], "12.50")
+
+    def test_export_applies_filters(self):
+        response = self.client.get("/transactions/export/?district=Nicosia")
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row["id"] for row in rows], [self.tx2.id])
+
+    def test_export_empty_csv_has_header(self):
+        response = self.client.get("/transactions/export/?export_format=csv&district=Paphos")
+        self.assertEqual(self.content(response).strip(), ",".join(TransactionSerializer.Meta.fields))
+
+    def test_export_invalid_format(self):
+        response = self.client.get("/transactions/export/?export_format=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.utils.timezone import now
+from django.test import TestCase
+from ...models import Property, Transaction, User
+from ...views.transaction import TransactionFilter, TransactionViewSet
+
+
+class TransactionIndexUsageTests(TestCase):
+    """EXPLAIN the common TransactionFilter combinations and assert none of them scans the whole table."""
+
+    FILTER_COMBINATIONS = [
+        {},
+        {"property_id": "1"},
+        {"district": "Limassol"},
+        {"min_price": "50000", "max_price": "150000"},
+        {"property_id": "1", "min_price": "50000"},
+        {"date_from": "2024-01-01T00:00:00Z", "date_to": "2024-12-31T00:00:00Z"},
+        {"district": "Nicosia", "min_price": "50000", "max_price": "150000"},
+    ]
+
+    def setUp(self):
+        call_command('flush', '--noinput')
+        user = User.objects.create_user(username="user", password="StrongPass123!")
+        for index in range(20):
+            prop = Property.objects.create(title=f"Prop{index}", district="Limassol", estimated_value=100000, user=user)
+            Transaction.objects.create(user=user, property=prop, percentage=10, price=50000 + index * 1000,
+                                       transaction_date=now() - timedelta(days=index))
+
+    def explain(self, params):
+        queryset = TransactionFilter(params, queryset=Transaction.objects.all()).qs
+        queryset = queryset.order_by(*TransactionViewSet.ordering, 'id')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Tiny test tables make a sequential scan the cheapest plan; ask whether an index path exists
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertNoFullScan(self, plan, params):
+        table = Transaction._meta.db_table
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f"Seq Scan on {table}", plan, f"{params}:\n{plan}")
+        elif connection.vendor == 'sqlite':
+            full_scans = [line for line in plan.splitlines()
+                          if f"SCAN {table}" in line and "INDEX" not in line]
+            self.assertEqual(full_scans, [], f"{params}:\n{plan}")
+
+    def test_filter_combinations_use_indexes(self):
+        for params in self.FILTER_COMBINATIONS:
+            with self.subTest(params=params):
+                self.assertNoFullScan(self.explain(params), params)
@@ -0,0 +1,78 @@
+from io import StringIO
+from decimal import Decimal
+from datetime import timedelta
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase
+from ...models import OwnershipShare, Property, PropertyAllocation, Transaction, User
+
+
+class TransactionLedgerTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.other_user = User.objects.create_user(username="other", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property = Property.objects.create(title="Test Property", district="Limassol", estimated_value=500000, user=self.user)
+        self.transaction = Transaction.objects.create(user=self.user, property=self.property, percentage=40,
+                                                      price=300000, transaction_date=now())
+
+    def allocated(self, property_obj=None):
+        return PropertyAllocation.objects.get(property=property_obj or self.property).total_percentage
+
+    def share(self, user):
+        return OwnershipShare.objects.filter(user=user, property=self.property).values_list('percentage', flat=True).first()
+
+    def test_create_updates_ledger(self):
+        data = {"property": self.property.id, "percentage": 20, "price": 300000, "transaction_date": now().isoformat()}
+        response = self.client.post("/transactions/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.allocated(), Decimal("60"))
+        self.assertEqual(self.share(self.user), Decimal("60"))
+
+    def test_update_applies_delta(self):
+        response = self.client.patch(f"/transactions/{self.transaction.id}/", {"percentage": 25}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.allocated(), Decimal("25"))
+        self.assertEqual(self.share(self.user), Decimal("25"))
+
+    def test_delete_removes_share(self):
+        response = self.client.delete(f"/transactions/{self.transaction.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.allocated(), Decimal("0"))
+        self.assertIsNone(self.share(self.user))
+
+    def test_user_delete_cascades_to_other_properties(self):
+        other_property = Property.objects.create(title="Other", district="Paphos", estimated_value=500000, user=self.user)
+        Transaction.objects.create(user=self.other_user, property=self.property, percentage=30, price=300000,
+                                   transaction_date=now() + timedelta(minutes=1))
+        Transaction.objects.create(user=self.other_user, property=other_property, percentage=10, price=300000,
+                                   transaction_date=now())
+        self.other_user.delete()
+        self.assertEqual(self.allocated(), Decimal("40"))
+        self.assertEqual(self.allocated(other_property), Decimal("0"))
+
+    def test_property_delete_cascades(self):
+        self.property.delete()
+        self.assertFalse(PropertyAllocation.objects.exists())
+        self.assertFalse(OwnershipShare.objects.exists())
+
+    def test_validation_uses_ledger_for_other_users(self):
+        Transaction.objects.create(user=self.other_user, property=self.property, percentage=50, price=300000,
+                                   transaction_date=now())
+        data = {"property": self.property.id, "percentage": 20, "price": 300000, "transaction_date": now().isoformat()}
+        response = self.client.post("/transactions/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("percentage", response.data)
+
+    def test_check_command_detects_and_rebuild_repairs_drift(self):
+        Transaction.objects.filter(id=self.transaction.id).update(percentage=10)  # bypasses signals
+        with self.assertRaises(CommandError):
+            call_command('rebuild_ownership_ledger', '--check', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_ownership_ledger', stdout=StringIO())
+        self.assertEqual(self.allocated(), Decimal("10"))
+        call_command('rebuild_ownership_ledger', '--check', stdout=StringIO())
@@ -1,10 +1,12 @@
 from django.utils.timezone import now
 from ...models import Property, Transaction, User
 from datetime import timedelta
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.core.management import call_command
 from rest_framework.test import APIClient
 from rest_framework import status
+from unittest import mock
+from ...views.transaction import TransactionViewSet
 
 class TransactionListTests(TestCase):
     def setUp(self):
@@ -28,36 +30,51 @@ class TransactionListTests(TestCase):
     def test_list_transactions(self):
         response = self.client.get("/transactions/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
-        returned_ids = {t['id'] for t in response.data}
+        self.assertEqual(len(response.data['results']), 2)
+        returned_ids = {t['id'] for t in response.data['results']}
         self.assertIn(self.tx1.id, returned_ids)
         self.assertIn(self.tx2.id, returned_ids)
 
     def test_filter_by_user(self):
         response = self.client.get(f"/transactions/?user_id={self.user.id}")
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_filter_by_property(self):
         response = self.client.get(f"/transactions/?property_id={self.property1.id}")
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_filter_by_district(self):
         response = self.client.get("/transactions/?district=Limassol")
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_filter_by_price_range(self):
         response = self.client.get("/transactions/?min_price=100000&max_price=200000")
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_filter_by_percentage_range(self):
         response = self.client.get("/transactions/?min_percentage=25&max_percentage=40")
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_filter_by_date_range(self):
         today = now()
-        response = self.client.get(f"/transactions/?date_from={today}&date_to={today}")
-        self.assertEqual(len(response.data), 2)
+        response = self.client.get("/transactions/", {
+            "date_from": (today - timedelta(days=1)).isoformat(),
+            "date_to": (today + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_ordering_by_price(self):
         response = self.client.get("/transactions/?ordering=-price")
-        self.assertGreater(response.data[1]['price'], response.data[0]['price'])
+        self.assertGreater(response.data['results'][1]['price'], response.data['results'][0]['price'])
+
+    @override_settings(API_CACHE_TIMEOUT=0)
+    def test_fast_list_matches_serializer_output(self):
+        Transaction.objects.create(user=self.user, property=self.property1, percentage=12.5, price=75000.5,
+                                   transaction_date=now() - timedelta(days=2))
+        for url in ["/transactions/", "/transactions/?page_size=2", "/transactions/?district=Limassol&ordering=-price"]:
+            with self.subTest(url=url):
+                fast = self.client.get(url)
+                with mock.patch.object(TransactionViewSet, 'fast_list', False):
+                    slow = self.client.get(url)
+                self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                self.assertEqual(fast.content, slow.content)
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.test import TestCase, override_settings
+from ...ledger import check_ledger
+from ...models import Property, PropertyAllocation, Transaction, User
+from ...views.transaction import TransactionViewSet
+
+
+@override_settings(TRANSACTION_CONCURRENCY_MODE='optimistic', TRANSACTION_OPTIMISTIC_RETRIES=3)
+class TransactionOptimisticWriteTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.other_user = User.objects.create_user(username="other", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.property = Property.objects.create(title="Prop", district="Limassol", estimated_value=500000, user=self.user)
+        self.transaction = Transaction.objects.create(user=self.user, property=self.property, percentage=60,
+                                                      price=350000, transaction_date=now() - timedelta(days=1))
+
+    def payload(self, percentage):
+        return {"property": self.property.id, "percentage": percentage, "price": 300000,
+                "transaction_date": now().isoformat()}
+
+    def test_create_claims_version(self):
+        version = PropertyAllocation.objects.get(property=self.property).version
+        response = self.client.post("/transactions/", self.payload(10), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(PropertyAllocation.objects.get(property=self.property).version, version)
+        self.assertEqual(check_ledger(), [])
+
+    def test_rules_are_still_enforced(self):
+        response = self.client.post("/transactions/", self.payload(30), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("percentage", response.data)
+
+    def test_update(self):
+        response = self.client.patch(f"/transactions/{self.transaction.id}/", {"percentage": 70}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PropertyAllocation.objects.get(property=self.property).total_percentage, Decimal("70"))
+
+    def test_conflict_is_retried_against_fresh_state(self):
+        original_claim = TransactionViewSet._claim_property_version
+        calls = []
+
+        def competing_claim(view, property_obj):
+            if not calls:
+                # Another writer commits between our validation and our claim
+                Transaction.objects.create(user=self.other_user, property=self.property, percentage=35,
+                                           price=300000, transaction_date=now())
+            calls.append(property_obj.ownership_version)
+            return original_claim(view, property_obj)
+
+        with mock.patch.object(TransactionViewSet, '_claim_property_version', competing_claim):
+            response = self.client.post("/transactions/", self.payload(10), format="json")
+        # 60 + 10 passed validation on the first attempt; the retry sees 60 + 35 + 10 > 100
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_conflict_retry_succeeds(self):
+        original_claim = TransactionViewSet._claim_property_version
+        calls = []
+
+        def competing_claim(view, property_obj):
+            if not calls:
+                Transaction.objects.create(user=self.other_user, property=self.property, percentage=5,
+                                           price=300000, transaction_date=now())
+            calls.append(property_obj.ownership_version)
+            return original_claim(view, property_obj)
+
+        with mock.patch.object(TransactionViewSet, '_claim_property_version', competing_claim):
+            response = self.client.post("/transactions/", self.payload(10), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(check_ledger(), [])
+
+    def test_persistent_conflicts_return_409(self):
+        with mock.patch.object(TransactionViewSet, '_claim_property_version', return_value=False) as claim:
+            response = self.client.post("/transactions/", self.payload(10), format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(claim.call_count, 3)
+        self.assertEqual(Transaction.objects.count(), 1)
@@ -0,0 +1,45 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...models import Property, Transaction, User
+
+
+class TransactionOwnerScopedWriteTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="owner", email="owner@example.com", password="pass1234")
+        self.other_user = User.objects.create_user(username="other", email="other@example.com", password="pass1234")
+        self.property = Property.objects.create(title="Test Property", district="Limassol",
+                                                estimated_value=500000, user=self.user)
+        self.transaction = Transaction.objects.create(user=self.user, property=self.property, percentage=20,
+                                                      price=350000, transaction_date=now())
+        self.other_transaction = Transaction.objects.create(user=self.other_user, property=self.property,
+                                                            percentage=10, price=300000, transaction_date=now())
+        self.client.force_authenticate(user=self.user)
+
+    def test_write_lookup_filters_on_owner_without_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(f"/transactions/{self.transaction.id}/", {"price": "360000.00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lookup = queries[0]['sql']
+        self.assertIn('FROM "realestate_transaction"', lookup)
+        self.assertIn('"user_id" =', lookup)
+        self.assertNotIn('JOIN', lookup)
+
+    def test_delete_of_own_transaction(self):
+        response = self.client.delete(f"/transactions/{self.transaction.id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Transaction.objects.filter(pk=self.transaction.id).exists())
+
+    def test_other_users_transaction_is_rejected_without_loading_it(self):
+        for method in ("patch", "delete"):
+            with self.subTest(method=method), self.assertNumQueries(2):  # the scoped lookup, then EXISTS
+                response = getattr(self.client, method)(f"/transactions/{self.other_transaction.id}/",
+                                                        {"price": "310000.00"}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Transaction.objects.filter(pk=self.other_transaction.id, price=300000).exists())
@@ -0,0 +1,85 @@
+import json
+from base64 import b64encode
+from datetime import timedelta
+from urllib.parse import parse_qs, urlencode, urlparse
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...models import Property, Transaction, User
+
+
+class TransactionPaginationTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        date = now() - timedelta(days=1)
+        for index in range(7):
+            prop = Property.objects.create(title=f"Prop{index}", district="Limassol", estimated_value=100000, user=self.user)
+            # Repeated prices and dates so the cursor has to use every ordering field
+            Transaction.objects.create(user=self.user, property=prop, percentage=10, price=60000 + (index // 3) * 1000,
+                                       transaction_date=date + timedelta(minutes=index % 2))
+        self.expected_ids = list(
+            Transaction.objects.order_by('price', 'transaction_date', 'id').values_list('id', flat=True)
+        )
+
+    def walk(self, url, direction="next"):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            page_ids = [t['id'] for t in response.data['results']]
+            ids = page_ids + ids if direction == "previous" else ids + page_ids
+            url = response.data[direction]
+        return ids, response
+
+    def test_walk_forward_returns_every_row_once_in_order(self):
+        ids, _ = self.walk("/transactions/?page_size=3")
+        self.assertEqual(ids, self.expected_ids)
+
+    def test_walk_backward_from_last_page(self):
+        response = self.client.get("/transactions/?page_size=3")
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+        last_page = [t['id'] for t in response.data['results']]
+        ids, _ = self.walk(response.data['previous'], direction="previous")
+        self.assertEqual(ids + last_page, self.expected_ids)
+
+    def test_walk_with_client_ordering(self):
+        ids, _ = self.walk("/transactions/?page_size=2&ordering=-price")
+        expected = list(Transaction.objects.order_by('-price', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get("/transactions/?page_size=100000")
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+
+    def test_no_count_or_offset_queries(self):
+        first = self.client.get("/transactions/?page_size=2")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        sql = " ".join(query['sql'].upper() for query in queries.captured_queries)
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/transactions/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_of_another_ordering_is_rejected(self):
+        next_url = self.client.get("/transactions/?page_size=2&ordering=price").data['next']
+        cursor = parse_qs(urlparse(next_url).query)['cursor'][0]
+        response = self.client.get(f"/transactions/?page_size=2&ordering=transaction_date&cursor={cursor}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_cursor_values_are_rejected(self):
+        position = json.dumps({"ordering": ["price", "transaction_date", "id"], "values": ["cheap", "soon", "x"]})
+        cursor = b64encode(urlencode({"p": position}).encode()).decode()
+        response = self.client.get(f"/transactions/?cursor={cursor}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
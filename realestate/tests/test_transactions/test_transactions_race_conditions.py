@@ -1,143 +1,109 @@
+from datetime import timedelta
+from threading import Barrier, Thread
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
 from django.utils.timezone import now
-from threading import Thread
-from ...models import User, Property, Transaction
-import time
 from rest_framework.test import APIClient
-from django.test import TransactionTestCase
-from uuid import uuid4
-from datetime import timedelta
-import pytest
-
-class TransactionRaceConditionTests(TransactionTestCase):
+from ...ledger import check_ledger
+from ...models import User, Property, Transaction
+from ..stress import run_stress, sqlite_immediate_transactions
 
-    """Tried multiple solutions that i thought but i couldn't get it to successfully test race conditions with concurrent requests and threads"""
+MODES = ['pessimistic', 'optimistic']
 
-    @classmethod
-    def setUpTestData(cls):
-        cls.user = User.objects.create(username=f"user_{uuid4().hex[:6]}", email="user2@example.com")
 
-        cls.property = Property.objects.create(title="TestProp", district="Limassol", estimated_value=200000, user=cls.user)
-        # Initial transactions
-        cls.tx1 = Transaction.objects.create(
-            user=cls.user, property=cls.property, percentage=80, price=160000, transaction_date=now()
-        )
-        cls.tx2 = Transaction.objects.create(
-            user=cls.user, property=cls.property, percentage=10, price=20000, transaction_date=now() + timedelta(minutes=1)
-        )
+class TransactionRaceConditionTests(TransactionTestCase):
+    """Concurrent writes from threads, each with its own connection, through the real locking path."""
 
     def setUp(self):
-        self.user = self.__class__.user
-        self.property = self.__class__.property
-        self.tx1 = self.__class__.tx1
-        self.tx2 = self.__class__.tx2
-
-    def get_authenticated_client(self):
-        client = APIClient()
-        client.force_authenticate(user=self.user)
-        return client
-
-    def make_post(self, results, index, user_id, property_id, percentage, price, delay=0):
-        client = self.get_authenticated_client()
-        data = {
-            "user": user_id,
-            "property": property_id,
-            "percentage": percentage,
-            "price": price,
-            "transaction_date": now().isoformat()
-        }
-        time.sleep(delay)
-        response = client.post("/transactions/", data, format='json')
-        results[index] = response.status_code
-
-    def make_patch(self, results, index, tx_id, percentage):
-        client = self.get_authenticated_client()
-        data = {
-            "percentage": percentage
-        }
-        response = client.patch(f"/transactions/{tx_id}/", data, format='json')
-        results[index] = response.status_code
-
-    @pytest.mark.skip(reason="Race condition test not currently working as expected")
-    def test_almost_concurrent_transactions_with_order(self):
-        results = [None, None]
-        valid_price = 50000  # Within 50%-150% of estimated value
-        user_id = self.user.id
-        property_id = self.property.id
-
-        # First thread starts immediately, second thread waits 0.1s
-        t1 = Thread(target=self.make_post, args=(results, 0, user_id, property_id, 10, valid_price, 0))
-        t2 = Thread(target=self.make_post, args=(results, 1, user_id, property_id, 10, valid_price, 0.1))
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
-
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("Concurrent connections need PostgreSQL or a file based SQLite test database.")
+        call_command('flush', '--noinput')
+        self.owner = User.objects.create_user(username="owner", password="StrongPass123!")
+        self.buyer1 = User.objects.create_user(username="buyer1", password="StrongPass123!")
+        self.buyer2 = User.objects.create_user(username="buyer2", password="StrongPass123!")
+        self.transaction_date = now() - timedelta(days=1)
+        self.enterContext(sqlite_immediate_transactions(connection))
+
+    def make_property(self, *allocations):
+        """Create a property with one existing transaction per ``(user, percentage)``."""
+        prop = Property.objects.create(title="TestProp", district="Limassol", estimated_value=200000, user=self.owner)
+        transactions = [
+            Transaction.objects.create(user=user, property=prop, percentage=percentage, price=200000,
+                                       transaction_date=self.transaction_date - timedelta(minutes=index))
+            for index, (user, percentage) in enumerate(allocations)
+        ]
+        return prop, transactions
+
+    def post(self, prop, percentage):
+        return lambda client: client.post("/transactions/", {
+            "property": prop.id, "percentage": percentage, "price": 200000,
+            "transaction_date": self.transaction_date.isoformat(),
+        }, format='json')
+
+    def patch(self, tx, percentage):
+        return lambda client: client.patch(f"/transactions/{tx.id}/", {"percentage": percentage}, format='json')
+
+    def run_concurrently(self, *requests):
+        """Fire ``(user, request)`` pairs from separate threads released together; return their status codes."""
+        barrier, statuses = Barrier(len(requests)), [None] * len(requests)
+
+        def target(index, user, request):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user=user)
+            try:
+                barrier.wait()
+                statuses[index] = request(client).status_code
+            finally:
+                connection.close()
+
+        threads = [Thread(target=target, args=(index, user, request)) for index, (user, request) in enumerate(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def assertConsistent(self, prop):
+        total = Transaction.objects.filter(property=prop).aggregate(total=Sum('percentage'))['total']
+        self.assertLessEqual(total, 100)
+        self.assertEqual(check_ledger(), [])
+
+    def test_concurrent_creates_only_one_fits(self):
+        for mode in MODES:
+            with self.subTest(mode=mode), override_settings(TRANSACTION_CONCURRENCY_MODE=mode):
+                prop, _ = self.make_property((self.owner, 80))
+                statuses = self.run_concurrently((self.buyer1, self.post(prop, 15)),
+                                                 (self.buyer2, self.post(prop, 15)))
+                self.assertEqual(sorted(statuses), [201, 400])
+                self.assertEqual(Transaction.objects.filter(property=prop).count(), 2)
+                self.assertConsistent(prop)
 
-        self.assertEqual(results[0], 201)  # First succeeds
-        self.assertEqual(results[1], 400)  # Second fails (over 100% ownership)
-
-    @pytest.mark.skip(reason="Race condition test not currently working as expected")
-    def test_concurrent_transactions_without_order(self):
-        results = [None, None]
-        valid_price = 50000
-        user_id = self.user.id
-        property_id = self.property.id
-
-        # Two threads simulating concurrent requests
-        t1 = Thread(target=self.make_post, args=(results, 0, user_id, property_id, 10, valid_price, 0))
-        t2 = Thread(target=self.make_post, args=(results, 1, user_id, property_id, 10, valid_price, 0))
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
-
-        # One must succeed, the other must fail due to ownership > 100%
-        self.assertIn(201, results)
-        self.assertIn(400, results)
-
-    @pytest.mark.skip(reason="Race condition test not currently working as expected")
     def test_concurrent_create_and_update(self):
-        """Simulate a create and an update at the same time for the same property."""
-        results = [None, None]
-        valid_price = 50000
-        user_id = self.user.id
-        property_id = self.property.id
-        tx_id = self.tx2.id
-
-        # Create tries to add 10%
-        t1 = Thread(target=self.make_post, args=(results, 0, user_id, property_id, 10, valid_price))
-        # Update bumps existing 10% to 30% (exceeding 100%)
-        t2 = Thread(target=self.make_patch, args=(results, 1, tx_id, 30))
-
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
-
-        # One must succeed, the other must fail
-        self.assertIn(201, results)
-        self.assertIn(400, results)
+        """Each write fits on its own, both together would exceed 100%."""
+        for mode in MODES:
+            with self.subTest(mode=mode), override_settings(TRANSACTION_CONCURRENCY_MODE=mode):
+                prop, (_, tx) = self.make_property((self.owner, 70), (self.buyer1, 10))
+                statuses = self.run_concurrently((self.buyer2, self.post(prop, 15)),
+                                                 (self.buyer1, self.patch(tx, 25)))
+                self.assertIn(sorted(statuses), [[200, 400], [201, 400]])
+                self.assertConsistent(prop)
 
-    @pytest.mark.skip(reason="Race condition test not currently working as expected")
     def test_concurrent_updates(self):
-        """Simulate two updates on different transactions at the same time."""
-        results = [None, None]
-        tx_id_1 = self.tx1.id
-        tx_id_2 = self.tx2.id
-
-
-        # Update tx1: 80 → 90%
-        t1 = Thread(target=self.make_patch, args=(results, 0, tx_id_1, 90))
-        # Update tx2: 10 → 20%
-        t2 = Thread(target=self.make_patch, args=(results, 1, tx_id_2, 20))
-
-        t1.start()
-        t2.start()
-        t1.join()
-        t2.join()
-
-        # One must succeed, the other must fail
-        self.assertIn(200, results)
-        self.assertIn(400, results)
-
-
+        """Two updates of different transactions that only fit one at a time."""
+        for mode in MODES:
+            with self.subTest(mode=mode), override_settings(TRANSACTION_CONCURRENCY_MODE=mode):
+                prop, (_, tx1, tx2) = self.make_property((self.owner, 70), (self.buyer1, 10), (self.buyer2, 10))
+                statuses = self.run_concurrently((self.buyer1, self.patch(tx1, 20)),
+                                                 (self.buyer2, self.patch(tx2, 20)))
+                self.assertEqual(sorted(statuses), [200, 400])
+                self.assertConsistent(prop)
+
+    def test_stress_keeps_ownership_invariants(self):
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                result = run_stress(workers=4, operations=10, properties=2, mode=mode)
+                self.assertEqual(result.violations, [])
+                self.assertEqual(result.unexpected_statuses, {})
+                self.assertEqual(sum(result.statuses.values()), 40)
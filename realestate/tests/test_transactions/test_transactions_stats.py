@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...models import Property, Transaction, User
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@override_settings(API_STATS_CACHE_TIMEOUT=300)
+class TransactionStatsTests(TestCase):
+    RANGE = "date_from=2024-01-01T00:00:00Z&date_to=2024-02-29T23:59:59.999999Z"
+
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="user", password="StrongPass123!")
+        self.buyer = User.objects.create_user(username="buyer", password="StrongPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.house = Property.objects.create(title="House", district="Limassol", estimated_value=100000, user=self.user)
+        self.flat = Property.objects.create(title="Flat", district="Nicosia", estimated_value=200000, user=self.user)
+        # 2024-01-01 is a Monday
+        self.add(self.user, self.house, 20, 50000, utc(2024, 1, 3, 10))
+        self.add(self.buyer, self.house, 10, 150000, utc(2024, 1, 10, 12))
+        self.add(self.user, self.flat, 30, 200000, utc(2024, 2, 5, 9))
+
+    def add(self, user, prop, percentage, price, date):
+        return Transaction.objects.create(user=user, property=prop, percentage=percentage, price=price,
+                                          transaction_date=date)
+
+    def stats(self, params=""):
+        response = self.client.get(f"/transactions/stats/?{params}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_monthly_buckets(self):
+        data = self.stats()
+        self.assertEqual((data["bucket"], data["group_by"]), ("month", None))
+        self.assertEqual(data["results"], [
+            {"bucket": "2024-01-01T00:00:00Z", "count": 2, "volume": "200000.00", "min_price": "50000.00",
+             "max_price": "150000.00", "avg_price": "100000.00", "percentage_sold": "30.00"},
+            {"bucket": "2024-02-01T00:00:00Z", "count": 1, "volume": "200000.00", "min_price": "200000.00",
+             "max_price": "200000.00", "avg_price": "200000.00", "percentage_sold": "30.00"},
+        ])
+
+    def test_weekly_buckets_per_district_and_property(self):
+        rows = self.stats("bucket=week&group_by=district")["results"]
+        self.assertEqual([(row["bucket"], row["district"], row["count"]) for row in rows], [
+            ("2024-01-01T00:00:00Z", "Limassol", 1),
+            ("2024-01-08T00:00:00Z", "Limassol", 1),
+            ("2024-02-05T00:00:00Z", "Nicosia", 1),
+        ])
+        rows = self.stats("bucket=month&group_by=property")["results"]
+        self.assertEqual([(row["property"], row["volume"]) for row in rows],
+                         [(self.house.id, "200000.00"), (self.flat.id, "200000.00")])
+
+    def test_list_filters_apply(self):
+        rows = self.stats(f"bucket=day&district=Limassol&min_price=100000&{self.RANGE}")["results"]
+        self.assertEqual([(row["bucket"], row["volume"]) for row in rows], [("2024-01-10T00:00:00Z", "150000.00")])
+        self.assertEqual(self.stats("user_id=0")["results"], [])
+        response = self.client.get("/transactions/stats/?min_price=abc")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_bucket(self):
+        self.assertEqual(self.client.get("/transactions/stats/?bucket=hour").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/transactions/stats/?bucket=day&date_from=2000-01-01T00:00:00Z&"
+                                   "date_to=2024-01-01T00:00:00Z")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_closed_buckets_are_served_from_rollups(self):
+        weeks = "bucket=week&date_from=2024-01-01T00:00:00Z&date_to=2024-02-11T23:59:59.999999Z"
+        with self.assertNumQueries(1):
+            expected = self.stats(weeks)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.stats(weeks), expected)
+        # Other filters are other rollups
+        with self.assertNumQueries(1):
+            self.stats(f"{weeks}&district=Nicosia")
+        # A bucket the range only partly covers is always aggregated
+        with self.assertNumQueries(1):
+            self.stats("bucket=week&date_from=2024-01-01T00:00:00Z&date_to=2024-02-07T00:00:00Z")
+
+    def test_backdated_write_only_recomputes_its_month(self):
+        params = f"bucket=month&{self.RANGE}"
+        self.stats(params)
+        tx = self.add(self.buyer, self.flat, 5, 180000, utc(2024, 2, 20))
+        with self.assertNumQueries(1):
+            rows = self.stats(params)["results"]
+        self.assertEqual([row["count"] for row in rows], [2, 2])
+
+        tx.transaction_date = utc(2024, 1, 20)
+        tx.save()
+        self.assertEqual([row["count"] for row in self.stats(params)["results"]], [3, 1])
+        tx.delete()
+        self.assertEqual([row["count"] for row in self.stats(params)["results"]], [2, 1])
+
+        rows = [{"property": self.flat.id, "percentage": "5.00", "price": "200000",
+                 "transaction_date": "2024-02-10T00:00:00Z"}]
+        self.client.post("/transactions/bulk/", {"transactions": rows}, format='json')
+        self.assertEqual([row["count"] for row in self.stats(params)["results"]], [2, 2])
+
+    def test_district_move_invalidates_rollups(self):
+        params = f"bucket=month&group_by=district&{self.RANGE}"
+        self.stats(params)
+        self.house.district = "Paphos"
+        self.house.save()
+        self.assertEqual({row["district"] for row in self.stats(params)["results"]}, {"Paphos", "Nicosia"})
+
+    def test_open_bucket_is_recomputed(self):
+        self.add(self.user, self.flat, 10, 200000, now() - timedelta(minutes=1))
+        self.stats("bucket=day")
+        # Bounds aggregate plus the open bucket; the closed ones come from rollups
+        with self.assertNumQueries(2):
+            rows = self.stats("bucket=day")["results"]
+        self.assertEqual(len(rows), 4)
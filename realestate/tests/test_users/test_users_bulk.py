@@ -0,0 +1,115 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from ...models import User
+from ...hashers import get_hash_pool
+from ...provisioning import provision_users
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PASSWORD_HASH_WORKERS=1)
+class UsersBulkTests(TestCase):
+    def setUp(self):
+        call_command('flush', '--noinput')
+        self.admin = User.objects.create_superuser(username="admin", password="pass")
+        self.user = User.objects.create_user(username="taken", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_create_writes_the_user_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/users/", {"username": "newuser", "password": "pass123"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        statements = [query['sql'].split()[0] for query in queries]
+        self.assertEqual(statements.count("INSERT"), 1)
+        self.assertNotIn("UPDATE", statements)
+        self.assertTrue(User.objects.get(username="newuser").check_password("pass123"))
+
+    def test_bulk_endpoint_reports_rejects_per_row(self):
+        users = [
+            {"username": "alice", "password": "secret1", "email": "alice@EXAMPLE.com"},
+            {"username": "taken", "password": "secret2"},
+            {"username": "bob", "password": "secret3"},
+            {"username": "alice", "password": "secret4"},
+            {"username": "carol"},
+            {"username": "bad name!", "password": "secret5"},
+        ]
+        with self.assertNumQueries(4):  # taken usernames, then one INSERT in a savepoint
+            response = self.client.post("/users/bulk/", {"users": users}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 4))
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results],
+                         ["created", "error", "created", "error", "error", "error"])
+        self.assertIn("username", results[1]["errors"])
+        self.assertIn("username", results[3]["errors"])
+        self.assertIn("password", results[4]["errors"])
+        self.assertIn("username", results[5]["errors"])
+
+        alice = User.objects.get(pk=results[0]["id"])
+        self.assertTrue(alice.check_password("secret1"))
+        self.assertEqual(alice.email, "alice@example.com")
+        self.assertTrue(User.objects.get(username="bob").check_password("secret3"))
+        self.assertFalse(User.objects.get(username="taken").check_password("secret2"))
+
+    def test_bulk_endpoint_is_admin_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post("/users/bulk/", {"users": [{"username": "x", "password": "y"}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(BULK_USERS_MAX_BATCH=2)
+    def test_bulk_endpoint_caps_the_batch(self):
+        users = [{"username": f"investor{index}", "password": "secret"} for index in range(3)]
+        response = self.client.post("/users/bulk/", {"users": users}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("provision_users", str(response.data["users"]))
+        self.assertFalse(User.objects.filter(username__startswith="investor").exists())
+
+        response = self.client.post("/users/bulk/", {"users": users[:2]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    # Workers load the configured settings, not the overrides: accept their hashes too
+    @override_settings(PASSWORD_HASHERS=FAST_HASHERS + ["django.contrib.auth.hashers.PBKDF2PasswordHasher"])
+    def test_passwords_are_hashed_in_worker_processes(self):
+        rows = [(index, {"username": f"investor{index}", "password": f"secret{index}"}) for index in range(8)]
+        created, rejects = provision_users(rows, workers=2)
+        self.assertEqual((len(created), rejects), (8, []))
+        for index, user in created:
+            self.assertTrue(User.objects.get(pk=user.pk).check_password(f"secret{index}"))
+        # The pool outlives the batch: the next one reuses its processes
+        pool = get_hash_pool('provisioning', 2)
+        created, _ = provision_users([(index, {"username": f"late{index}", "password": "pw"}) for index in range(8)],
+                                     workers=2)
+        self.assertEqual(len(created), 8)
+        self.assertIs(get_hash_pool('provisioning', 2), pool)
+
+    def test_command_writes_rejects_without_passwords(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "users.csv"
+            path.write_text("username,password,email\nnew1,pw-one,a@example.com\ntaken,pw-two,\nnew2,pw-three,\n")
+            out, err = StringIO(), StringIO()
+            call_command('provision_users', str(path), '--chunk-size', '2', stdout=out, stderr=err)
+            self.assertIn("Created 2 users (1 rejected)", out.getvalue())
+            rejects = (Path(directory) / "users.csv.rejects.csv").read_text()
+        self.assertIn("3,taken,", rejects)
+        self.assertNotIn("pw-two", rejects)
+        self.assertEqual(set(User.objects.filter(username__startswith="new").values_list('username', flat=True)),
+                         {"new1", "new2"})
+
+    def test_ndjson_rows(self):
+        rows = "\n".join([json.dumps({"username": "dave", "password": "pw"}), "not json"]) + "\n"
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "users.ndjson"
+            path.write_text(rows)
+            call_command('provision_users', str(path), stdout=StringIO(), stderr=StringIO())
+            rejects = [json.loads(line) for line in (Path(directory) / "users.ndjson.rejects.ndjson").read_text().splitlines()]
+        self.assertEqual(rejects, [{"line": 2, "username": None, "errors": {"non_field_errors": ["Line is not a JSON object."]}}])
+        self.assertTrue(User.objects.get(username="dave").check_password("pw"))
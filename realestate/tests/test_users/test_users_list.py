@@ -16,7 +16,7 @@ class UsersListTests(TestCase):
     def test_user_can_list_all_users(self):
         response = self.client.get("/users/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 2)
+        self.assertGreaterEqual(len(response.data['results']), 2)
 
     def test_user_can_retrieve_any_user(self):
         response = self.client.get(f"/users/{self.other_user.id}/")
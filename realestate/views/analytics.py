@@ -0,0 +1,32 @@
+from django.http import Http404
+from rest_framework import viewsets, permissions
+from rest_framework.response import Response
+from ..metrics import timed
+from ..models import DistrictSummary, Property
+from ..serializers.analytics import DistrictSummarySerializer
+
+
+class DistrictSummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """Per-district property count, transaction count, volume and average price, read from DistrictSummary."""
+    queryset = DistrictSummary.objects.order_by('district')
+    serializer_class = DistrictSummarySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    lookup_field = 'district'
+
+    def list(self, request, *args, **kwargs):
+        # A district nothing has happened in yet has no summary row
+        summaries = {summary.district: summary for summary in self.get_queryset()}
+        districts = sorted({district for district, _ in Property.DISTRICT_CHOICES} | summaries.keys())
+        rows = [summaries.get(district) or DistrictSummary(district=district) for district in districts]
+        with timed('serialize'):
+            return Response(self.get_serializer(rows, many=True).data)
+
+    def get_object(self):
+        district = self.kwargs[self.lookup_field]
+        summary = self.get_queryset().filter(district=district).first()
+        if summary is None:
+            if district not in dict(Property.DISTRICT_CHOICES):
+                raise Http404
+            summary = DistrictSummary(district=district)
+        return summary
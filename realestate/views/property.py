@@ -1,10 +1,106 @@
-from rest_framework import viewsets, permissions
+import time
+from decimal import Decimal
+from django.db import transaction
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
 from ..permissions import IsOwnerOrAdminOrReadOnly
-from ..models import Property
-from ..serializers.property import PropertySerializer
-from ..mixins import LoggingMixin
+from ..models import Property, PropertyAllocation, OwnershipShare
+from ..serializers.property import PropertySerializer, PropertyRevaluationUploadSerializer
+from ..serializers.analytics import CapTableSerializer
+from ..metrics import timed
+from ..mixins import AsyncReadMixin, LoggingMixin, CachedReadMixin, ConditionalRequestMixin, OwnerScopedWriteMixin
+from ..cache import property_version_name
+from ..deletion import delete_transactions
+from ..imports import read_file
+from ..revaluation import apply_revaluations, lock_for_revaluation
+import logging
 
-class PropertyViewSet(LoggingMixin, viewsets.ModelViewSet):
+logger = logging.getLogger('realestate')
+
+class PropertyViewSet(LoggingMixin, OwnerScopedWriteMixin, AsyncReadMixin, ConditionalRequestMixin, CachedReadMixin,
+                      viewsets.ModelViewSet):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
-    permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdminOrReadOnly]
\ No newline at end of file
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdminOrReadOnly]
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(request, lambda: self.cached_response(
+            request, [property_version_name(kwargs['pk'])],
+            lambda: super(PropertyViewSet, self).retrieve(request, *args, **kwargs)
+        ))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_retrieve(request, lambda: self.acached_response(
+            request, [property_version_name(kwargs['pk'])],
+            lambda: super(PropertyViewSet, self).aretrieve(request, *args, **kwargs)
+        ))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['locked_price_band'] = getattr(self, 'locked_price_band', None)
+        return context
+
+    def update(self, request, *args, **kwargs):
+        # Revaluations are checked against the price band under the property and allocation locks;
+        # only this property is locked, so revaluations of different properties run in parallel
+        with transaction.atomic():
+            if 'estimated_value' in request.data:
+                instance = self.get_object()
+                _, _, *self.locked_price_band = lock_for_revaluation([instance.pk])[instance.pk]
+                logger.debug("Revaluation lock acquired for property %s by user %s", instance.pk, request.user.id,
+                             extra={"property_id": instance.pk, "user_id": request.user.id})
+            return super().update(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # In one pass rather than through the per-row delete signals of the cascade (see realestate.deletion)
+            delete_transactions('property_id', [instance.pk])
+            super().perform_destroy(instance)
+
+    @action(detail=True, methods=['get'], url_path='cap-table')
+    def cap_table(self, request, pk=None):
+        """Owners of the property with their percentage and the value of their share, read from the ledger."""
+        property_obj = self.get_object()
+        allocated = (PropertyAllocation.objects.filter(property=property_obj)
+                     .values_list('total_percentage', flat=True).first() or Decimal('0'))
+        shares = (OwnershipShare.objects.filter(property=property_obj, percentage__gt=0)
+                  .order_by('-percentage', 'user_id').values('user_id', 'percentage'))
+        owners = [{**share, "value": share["percentage"] * property_obj.estimated_value / 100} for share in shares]
+        with timed('serialize'):
+            return Response(CapTableSerializer({
+                "property_id": property_obj.id,
+                "estimated_value": property_obj.estimated_value,
+                "allocated_percentage": allocated,
+                "available_percentage": 100 - allocated,
+                "owners": owners,
+            }).data)
+
+    def get_serializer_class(self):
+        if self.action == 'revaluations':
+            return PropertyRevaluationUploadSerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['post'], url_path='revaluations', parser_classes=[MultiPartParser])
+    def revaluations(self, request):
+        """
+        Revalue many properties from an uploaded CSV or NDJSON file of ``property_id,estimated_value``
+        rows. Valid rows are applied, the others are returned as rejects with their line number.
+        Non-admin users can only revalue their own properties.
+        """
+        upload = self.get_serializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        start = time.perf_counter()
+        applied, rejects = apply_revaluations(
+            read_file(upload.validated_data['file'], upload.validated_data['file_format']), user=request.user
+        )
+        elapsed = time.perf_counter() - start
+        logger.info("[REVALUATION] %s Properties revalued (%s rejected) by User ID=%s", applied, len(rejects),
+                    request.user.id)
+        return Response({
+            "applied": applied,
+            "rejected": len(rejects),
+            "rows_per_second": round((applied + len(rejects)) / elapsed, 1) if elapsed else None,
+            "rejects": rejects,
+        }, status=status.HTTP_207_MULTI_STATUS if rejects else status.HTTP_200_OK)
@@ -1,13 +1,28 @@
+from collections import defaultdict
+from django.conf import settings
 from django.db import transaction
-from rest_framework import viewsets, status, permissions
+from itertools import islice
+from django.db.models import F, Max, Min
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, status, permissions, serializers
+from rest_framework.decorators import action
 from ..permissions import IsOwnerOrAdminOrReadOnly
 from rest_framework.response import Response
 from django_filters import rest_framework as filters
 from rest_framework.filters import OrderingFilter
-from ..models import Transaction, Property
-from ..serializers.transaction import TransactionSerializer
-from rest_framework.exceptions import ValidationError
-from ..mixins import LoggingMixin
+from ..models import Transaction, Property, PropertyAllocation, OwnershipShare
+from ..serializers.transaction import (
+    TransactionSerializer, TransactionBulkSerializer, TransactionBulkItemSerializer, TransactionStatsQuerySerializer,
+    check_ownership_and_price
+)
+from ..metrics import timed
+from ..ledger import apply_ownership_delta, apply_transaction_stats, extend_price_bounds
+from ..serializers.rows import RowEncoder
+from ..exports import export_rows, stream_csv, stream_ndjson
+from rest_framework.exceptions import APIException, ValidationError
+from ..mixins import AsyncReadMixin, LoggingMixin, CachedReadMixin, ConditionalRequestMixin, OwnerScopedWriteMixin
+from ..cache import TRANSACTIONS_VERSION, invalidate_versions, property_version_name, stats_version_name
+from ..stats import compute_stats, iter_buckets
 import logging
 
 logger = logging.getLogger('realestate')
@@ -27,7 +42,18 @@ class TransactionFilter(filters.FilterSet):
         model = Transaction
         fields = []  # Explicitly say "no auto-generated filters"
 
-class TransactionViewSet(LoggingMixin, viewsets.ModelViewSet):
+class ConcurrentWriteConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The property was modified concurrently too many times, please retry."
+    default_code = "conflict"
+
+class PreconditionFailed(Exception):
+    """Carries the 412 response of a failed If-Match check out of the write transaction."""
+    def __init__(self, response):
+        self.response = response
+
+class TransactionViewSet(LoggingMixin, OwnerScopedWriteMixin, AsyncReadMixin, ConditionalRequestMixin, CachedReadMixin,
+                         viewsets.ModelViewSet):
     queryset = Transaction.objects.all().select_related('user', 'property')
     serializer_class = TransactionSerializer
     filter_backends = [filters.DjangoFilterBackend, OrderingFilter]
@@ -35,15 +61,75 @@ class TransactionViewSet(LoggingMixin, viewsets.ModelViewSet):
     ordering_fields = ['price', 'transaction_date']
     ordering = ['price', 'transaction_date']
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdminOrReadOnly]
+    # List responses are encoded straight from values() rows; the output is identical to the serializer's
+    row_encoder = RowEncoder(TransactionSerializer)
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self._get_list_versions(request), lambda: self._list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_retrieve(request, lambda: super(TransactionViewSet, self).retrieve(request, *args, **kwargs))
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(request, self._get_list_versions(request), lambda: self._alist(request))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_retrieve(
+            request, lambda: super(TransactionViewSet, self).aretrieve(request, *args, **kwargs))
+
+    def _get_list_versions(self, request):
+        # A list narrowed to one property only changes when that property or its transactions change
+        property_id = request.query_params.get('property_id', '')
+        if property_id.isdigit():
+            return [property_version_name(int(property_id))]
+        return [TRANSACTIONS_VERSION]
+
+    def _get_list_source(self):
+        """The filtered list queryset and the function encoding its rows."""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.fast_list:
+            def encode(rows):
+                with timed('serialize'):
+                    return [self.row_encoder.encode(row) for row in rows]
+            return self.row_encoder.values(queryset), encode
+
+        def serialize(rows):
+            with timed('serialize'):
+                return self.get_serializer(rows, many=True).data
+        return queryset, serialize
+
+    def _list(self, request, *args, **kwargs):
+        queryset, encode = self._get_list_source()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            # The 304 check runs on the fetched rows, before any of them is encoded
+            return self.conditional_response(request, self.get_page_validators(page),
+                                             lambda: self.get_paginated_response(encode(page)))
+        return self.conditional_response(request, self.get_list_validators(queryset),
+                                         lambda: Response(encode(queryset)))
+
+    async def _alist(self, request):
+        queryset, encode = self._get_list_source()
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return await self.aconditional_response(request, self.get_page_validators(page),
+                                                    lambda: self.get_paginated_response(encode(page)))
+
+        async def build_response():
+            return Response(encode([row async for row in queryset]))
+        return await self.aconditional_response(request, await self.aget_list_validators(queryset), build_response)
 
     def _lock_property(self, property_id, user_id, action="create"):
         """Lock a property row and return it, or raise a ValidationError."""
         try:
-            locked_property = Property.objects.select_for_update().get(pk=property_id)
-            logger.debug(f"Lock acquired for property {property_id} by user {user_id}")
+            with timed('lock'):
+                locked_property = Property.objects.select_for_update().get(pk=property_id)
+            logger.debug("Lock acquired for property %s by user %s", property_id, user_id,
+                         extra={"property_id": property_id, "user_id": user_id})
             return locked_property
         except Property.DoesNotExist:
-            logger.warning(f"Transaction {action} failed for user {user_id}: Property {property_id} not found.")
+            logger.warning("Transaction %s failed for user %s: Property %s not found.", action, user_id, property_id)
             raise ValidationError({"property": "Property does not exist."})
 
     def _validate_and_get_serializer(self, *, data, context, instance=None, partial=False):
@@ -52,47 +138,269 @@ class TransactionViewSet(LoggingMixin, viewsets.ModelViewSet):
         try:
             serializer.is_valid(raise_exception=True)
         except ValidationError as e:
-            logger.warning(f"Transaction validation failed for user {self.request.user.id}: {e.detail}")
+            logger.warning("Transaction validation failed for user %s: %s", self.request.user.id, e.detail)
             raise
         return serializer
 
-    @transaction.atomic
+    def _read_property_version(self, property_id, user_id, action="create"):
+        """Read a property and its ownership version without locking (optimistic mode)."""
+        try:
+            property_obj = Property.objects.annotate(ownership_version=F('allocation__version')).get(pk=property_id)
+        except Property.DoesNotExist:
+            logger.warning("Transaction %s failed for user %s: Property %s not found.", action, user_id, property_id)
+            raise ValidationError({"property": "Property does not exist."})
+        if property_obj.ownership_version is None:
+            PropertyAllocation.objects.get_or_create(property_id=property_obj.id)
+            property_obj.ownership_version = 0
+        return property_obj
+
+    def _claim_property_version(self, property_obj):
+        """Bump the ownership version iff nobody else did since it was read; holds the row until commit."""
+        with timed('lock'):
+            return PropertyAllocation.objects.filter(
+                property_id=property_obj.id, version=property_obj.ownership_version
+            ).update(version=F('version') + 1) == 1
+
+    def _write_with_property(self, property_id, action, validate, save):
+        """
+        Run ``validate(property) -> serializer`` and ``save(serializer) -> response`` under the
+        configured TRANSACTION_CONCURRENCY_MODE.
+
+        ``pessimistic`` holds SELECT ... FOR UPDATE on the property for the whole validation.
+        ``optimistic`` validates against unlocked reads and only then claims the property's
+        ownership version with a conditional UPDATE; if another write got in first, the attempt
+        is rolled back and retried up to TRANSACTION_OPTIMISTIC_RETRIES times (then 409).
+        """
+        user_id = self.request.user.id
+        if settings.TRANSACTION_CONCURRENCY_MODE != 'optimistic':
+            with transaction.atomic():
+                return save(validate(self._lock_property(property_id, user_id, action)))
+
+        retries = settings.TRANSACTION_OPTIMISTIC_RETRIES
+        for attempt in range(1, retries + 1):
+            with transaction.atomic():
+                property_obj = self._read_property_version(property_id, user_id, action)
+                serializer = validate(property_obj)
+                if self._claim_property_version(property_obj):
+                    return save(serializer)
+            logger.info("[OPTIMISTIC] Version conflict on property %s for user %s (attempt %s/%s)",
+                        property_id, user_id, attempt, retries)
+        logger.warning("Transaction %s failed for user %s: property %s kept changing.", action, user_id, property_id)
+        raise ConcurrentWriteConflict()
+
     def create(self, request, *args, **kwargs):
         property_id = request.data.get('property')
         if not property_id:
-            logger.warning(f"Transaction creation failed for user {request.user.id}: Missing property field.")
+            logger.warning("Transaction creation failed for user %s: Missing property field.", request.user.id)
             raise ValidationError({"property": "This field is required."})
 
-        locked_property = self._lock_property(property_id, request.user.id, "creation")
-        serializer = self._validate_and_get_serializer(
-            data=request.data,
-            context={'locked_property': locked_property, 'request': request}
-        )
+        def validate(property_obj):
+            return self._validate_and_get_serializer(
+                data=request.data,
+                context={'locked_property': property_obj, 'request': request}
+            )
+
+        def save(serializer):
+            self.perform_create(serializer)
+            with timed('serialize'):
+                data = serializer.data
+            headers = self.get_success_headers(data)
+            return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        return self._write_with_property(property_id, "creation", validate, save)
 
-    @transaction.atomic
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
 
         #Pre-check: Prevent property change before locking
-        if 'property' in request.data and int(request.data['property']) != instance.property.id:
-            logger.warning(
-                f"User {request.user.id} attempted to change property on transaction {instance.id} "
-                f"(from {instance.property.id} to {request.data['property']})."
-            )
+        if 'property' in request.data and int(request.data['property']) != instance.property_id:
+            logger.warning("User %s attempted to change property on transaction %s (from %s to %s).",
+                           request.user.id, instance.id, instance.property_id, request.data['property'])
             raise ValidationError({"property": "You cannot change the property of a transaction."})
 
-        locked_property = self._lock_property(instance.property.id, request.user.id, "update")
-        serializer = self._validate_and_get_serializer(
-            data=request.data,
-            context={'locked_property': locked_property, 'request': request},
-            instance=instance,
-            partial=partial
+        state = {'instance': instance}
+
+        def validate(property_obj):
+            if state.get('attempted'):  # a retried optimistic attempt must not reuse the stale row
+                state['instance'] = self.get_object()
+            state['attempted'] = True
+            precondition = self.check_write_preconditions(request, state['instance'])
+            if precondition is not None:
+                raise PreconditionFailed(precondition)
+            return self._validate_and_get_serializer(
+                data=request.data,
+                context={'locked_property': property_obj, 'request': request},
+                instance=state['instance'],
+                partial=partial
+            )
+
+        def save(serializer):
+            self.perform_update(serializer)
+            with timed('serialize'):
+                data = serializer.data
+            return self.set_object_validators(Response(data))
+
+        try:
+            return self._write_with_property(instance.property_id, "update", validate, save)
+        except PreconditionFailed as e:
+            return e.response
+
+    EXPORT_FORMATS = {
+        'ndjson': (stream_ndjson, 'application/x-ndjson'),
+        'csv': (stream_csv, 'text/csv'),
+    }
+
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return TransactionBulkSerializer
+        if self.action == 'stats':
+            return TransactionStatsQuerySerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create many transactions for the requesting user in one request.
+
+        Rows are grouped by property, every affected property is locked once (in id order, so
+        concurrent bulk requests cannot deadlock) and the ownership/price rules are checked
+        cumulatively in memory before a single bulk insert. In ``atomic`` mode any invalid row
+        rejects the whole batch; in ``partial`` mode the valid rows are still created.
+        """
+        envelope = self.get_serializer(data=request.data)
+        envelope.is_valid(raise_exception=True)
+        rows = envelope.validated_data['transactions']
+        atomic = envelope.validated_data['mode'] == TransactionBulkSerializer.MODE_ATOMIC
+        user = request.user
+
+        results = [None] * len(rows)
+        parsed = {}
+        for index, row in enumerate(rows):
+            item = TransactionBulkItemSerializer(data=row)
+            if item.is_valid():
+                parsed[index] = item.validated_data
+            else:
+                results[index] = {"index": index, "status": "error", "errors": item.errors}
+
+        with transaction.atomic():
+            property_ids = sorted({data['property_id'] for data in parsed.values()})
+            with timed('lock'):
+                locked_properties = {
+                    prop.id: prop
+                    for prop in Property.objects.select_for_update().filter(id__in=property_ids).order_by('id')
+                }
+            logger.debug("[BULK] Locks acquired for properties %s by user %s", list(locked_properties), user.id,
+                         extra={"property_ids": list(locked_properties), "user_id": user.id})
+
+            allocated = defaultdict(int, PropertyAllocation.objects.filter(
+                property_id__in=locked_properties).values_list('property_id', 'total_percentage'))
+            owned = defaultdict(int, OwnershipShare.objects.filter(
+                user_id=user.id, property_id__in=locked_properties).values_list('property_id', 'percentage'))
+            taken_dates = set(Transaction.objects.filter(
+                user_id=user.id, property_id__in=locked_properties,
+                transaction_date__in={data['transaction_date'] for data in parsed.values()},
+            ).values_list('property_id', 'transaction_date'))
+
+            to_create = []
+            for index, data in parsed.items():
+                property_obj = locked_properties.get(data['property_id'])
+                try:
+                    if property_obj is None:
+                        raise serializers.ValidationError({"property": "Property does not exist."})
+                    key = (property_obj.id, data['transaction_date'])
+                    if key in taken_dates:
+                        raise serializers.ValidationError(
+                            {"non_field_errors": ["The fields user, property, transaction_date must make a unique set."]}
+                        )
+                    check_ownership_and_price(property_obj, data['percentage'], data['price'],
+                                              allocated[property_obj.id], owned[property_obj.id])
+                except serializers.ValidationError as e:
+                    results[index] = {"index": index, "status": "error", "errors": e.detail}
+                    continue
+                taken_dates.add(key)
+                allocated[property_obj.id] += data['percentage']
+                owned[property_obj.id] += data['percentage']
+                to_create.append((index, Transaction(user_id=user.id, **data)))
+
+            failed = len(rows) - len(to_create)
+            if failed and atomic:
+                logger.warning("[BULK] Rejected %s transactions for user %s: %s invalid rows.", len(rows), user.id, failed)
+                return Response({"created": 0, "failed": failed, "results": [r for r in results if r]},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            created = Transaction.objects.bulk_create([tx for _, tx in to_create], batch_size=1000)
+            deltas, prices = defaultdict(int), defaultdict(list)
+            for tx in created:
+                deltas[tx.property_id] += tx.percentage
+                prices[tx.property_id].append(tx.price)
+            for property_id, delta in deltas.items():
+                apply_ownership_delta(property_id, user.id, delta)
+                apply_transaction_stats(property_id, len(prices[property_id]), sum(prices[property_id]))
+                extend_price_bounds(property_id, min(prices[property_id]), max(prices[property_id]))
+            # bulk_create sends no post_save signals
+            invalidate_versions(TRANSACTIONS_VERSION, *(property_version_name(pk) for pk in deltas),
+                                *{stats_version_name(tx.transaction_date) for tx in created})
+
+        for (index, _), tx in zip(to_create, created):
+            results[index] = {"index": index, "status": "created", "id": tx.id}
+        logger.info("[BULK CREATE] %s Transactions (%s failed) by User ID=%s", len(created), failed, user.id)
+        return Response({"created": len(created), "failed": failed, "results": results},
+                        status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], url_path='export', pagination_class=None)
+    def export(self, request):
+        """
+        Stream every transaction matching the TransactionFilter parameters as NDJSON (default) or
+        CSV (``?export_format=csv``). Rows come from a server-side cursor and are encoded without
+        serializer instances, so memory use does not grow with the result size.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in self.EXPORT_FORMATS:
+            raise ValidationError({"export_format": f"Must be one of: {', '.join(self.EXPORT_FORMATS)}."})
+        encoder, content_type = self.EXPORT_FORMATS[export_format]
+
+        queryset = self.filter_queryset(self.get_queryset())
+        logger.info("[EXPORT] Transactions as %s by User ID=%s", export_format, request.user.id)
+        response = StreamingHttpResponse(
+            encoder(export_rows(self.row_encoder, queryset), self.row_encoder.names), content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+        return response
+
+    MAX_STATS_BUCKETS = 5000
+    STATS_PARAMS = ('bucket', 'group_by', 'date_from', 'date_to', 'ordering', 'format')
+
+    @action(detail=False, methods=['get'], url_path='stats', pagination_class=None)
+    def stats(self, request):
+        """
+        Count, volume, min/max/average price and percentage sold of the transactions matching the
+        TransactionFilter parameters per ``?bucket=day|week|month`` (default month), optionally
+        split per ``?group_by=district|property``. Buckets without transactions are left out.
+        Grouping runs in the database and closed buckets are served from cached rollups
+        (see realestate.stats).
+        """
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        size, group_by = query.validated_data['bucket'], query.validated_data.get('group_by')
+
+        queryset = self.filter_queryset(self.get_queryset())
+        filterset = self.filterset_class(request.query_params, queryset=queryset)
+        filterset.is_valid()  # already validated by filter_queryset
+        date_from, date_to = (filterset.form.cleaned_data.get(name) for name in ('date_from', 'date_to'))
+        first, last = date_from, date_to
+        if first is None or last is None:
+            bounds = queryset.order_by().aggregate(first=Min('transaction_date'), last=Max('transaction_date'))
+            first, last = first or bounds['first'], last or bounds['last']
+        buckets = [] if first is None or last is None or first > last else list(
+            islice(iter_buckets(first, last, size), self.MAX_STATS_BUCKETS + 1)
         )
+        if len(buckets) > self.MAX_STATS_BUCKETS:
+            raise ValidationError({"bucket": f"The range spans more than {self.MAX_STATS_BUCKETS} buckets, "
+                                             f"use a larger bucket or a narrower date range."})
 
-        self.perform_update(serializer)
-        return Response(serializer.data)
\ No newline at end of file
+        filter_params = [(name, value) for name, values in request.query_params.lists() for value in values
+                         if name not in self.STATS_PARAMS]
+        results = compute_stats(queryset, buckets, size, group_by, date_from, date_to, filter_params)
+        logger.info("[STATS] %s %s buckets by User ID=%s", len(buckets), size, request.user.id)
+        return Response({"bucket": size, "group_by": group_by, "results": results})
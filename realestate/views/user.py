@@ -1,10 +1,21 @@
-from rest_framework import viewsets
-from ..models import User
-from ..serializers.user import UserSerializer
-from ..permissions import IsAdminOrReadOnly, IsOwnerOrAdminOrReadOnly
-from ..mixins import LoggingMixin
+from django.db import transaction
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from ..metrics import timed
+from ..models import User, PortfolioSummary, Property
+from ..serializers.user import UserSerializer, UserBulkSerializer
+from ..serializers.analytics import PortfolioSummarySerializer
+from ..permissions import IsAdminOrReadOnly, IsOwnerOrAdminOrReadOnly, IsSelfOrAdmin
+from ..mixins import AsyncReadMixin, LoggingMixin, OwnerScopedWriteMixin
+from ..provisioning import provision_users
+from ..deletion import delete_properties, delete_transactions
+import logging
 
-class UserViewSet(LoggingMixin, viewsets.ModelViewSet):
+logger = logging.getLogger('realestate')
+
+class UserViewSet(LoggingMixin, OwnerScopedWriteMixin, AsyncReadMixin, viewsets.ModelViewSet):
+    owner_field = 'pk'
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -12,4 +23,47 @@ class UserViewSet(LoggingMixin, viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ["retrieve", "update", "partial_update"]:
             return [IsOwnerOrAdminOrReadOnly()]
-        return [permission() for permission in self.permission_classes]
\ No newline at end of file
+        if self.action == "portfolio":
+            return [permissions.IsAuthenticated(), IsSelfOrAdmin()]
+        return [permission() for permission in self.permission_classes]
+
+    def get_serializer_class(self):
+        if self.action == "bulk":
+            return UserBulkSerializer
+        return super().get_serializer_class()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # In one pass rather than through the per-row delete signals of the cascade (see realestate.deletion)
+            delete_transactions('user_id', [instance.pk])
+            delete_properties(Property.objects.filter(user_id=instance.pk))
+            super().perform_destroy(instance)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create up to BULK_USERS_MAX_BATCH users in one request (admins only). Passwords are hashed
+        in worker processes and the users inserted together; rows with invalid data or a username
+        that is taken (or repeated in the batch) are reported per row without aborting the others.
+        """
+        envelope = self.get_serializer(data=request.data)
+        envelope.is_valid(raise_exception=True)
+        rows = envelope.validated_data['users']
+        created, rejects = provision_users(enumerate(rows))
+
+        results = [None] * len(rows)
+        for index, user in created:
+            results[index] = {"index": index, "status": "created", "id": user.id}
+        for index, _, errors in rejects:
+            results[index] = {"index": index, "status": "error", "errors": errors}
+        logger.info("[BULK CREATE] %s Users (%s failed) by User ID=%s", len(created), len(rejects), request.user.id)
+        return Response({"created": len(created), "failed": len(rejects), "results": results},
+                        status=status.HTTP_207_MULTI_STATUS if rejects else status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def portfolio(self, request, pk=None):
+        """Number of properties owned and SUM(share x estimated value), read from PortfolioSummary."""
+        user = self.get_object()
+        summary = PortfolioSummary.objects.filter(user=user).first() or PortfolioSummary(user=user)
+        with timed('serialize'):
+            return Response(PortfolioSummarySerializer(summary).data)